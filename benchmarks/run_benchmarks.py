@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matplotlib.pyplot as plt
+from synthetic import generate_dataset
+
+
+def _max_rss_mb():
+    # === ru_maxrss is in KiB on Linux and in bytes on macOS ===
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+class StageTimer:
+    """Wall time, peak traced allocation and process max RSS of each named benchmark stage"""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            result = {"seconds": round(seconds, 4), "max_rss_mb": round(_max_rss_mb(), 1)}
+            if self.trace_memory:
+                result["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                tracemalloc.stop()
+            self.stages[name] = result
+            print(f"  {name:<32} {seconds:8.3f} s")
+
+
+def run_pipeline(dataset, states, out_dir, timer, workers=1):
+    from ingest import (
+        build_state_table, load_state_districts, state_climate_monthly, state_with_paths
+    )
+    from analysis_store import write_analysis_store
+    from ndvi import process_ndvi_folder
+    from raster_catalog import CATALOG_FILE, RasterCatalog
+    from zonal import clear_label_cache
+    import plot_graphs
+    import visualize_mh
+    import visualize_mp
+
+    specs = [
+        state_with_paths(code, dataset[code]["shape_file"], dataset[code]["rain_csv"], dataset[code]["temp_csv"],
+                         os.path.join(out_dir, f"analysis_{code}"))
+        for code in states
+    ]
+    store_dir = os.path.join(out_dir, "analysis")
+    clear_label_cache()
+
+    with timer.stage("ingest.load_districts"):
+        districts_gdf = load_state_districts(specs)
+    # === Start from no catalog, so a reused --data_dir pays for the same first scan as a fresh one ===
+    catalog_path = os.path.join(dataset["ndvi"], CATALOG_FILE)
+    if os.path.exists(catalog_path):
+        os.remove(catalog_path)
+    with timer.stage("ingest.catalog_scan"):
+        RasterCatalog.scan(dataset["ndvi"])
+    with timer.stage("ingest.ndvi_reduce"):
+        ndvi_df = process_ndvi_folder(districts_gdf, dataset["ndvi"], workers=workers, extra_columns=["state"])
+    for spec in specs:
+        with timer.stage(f"ingest.climate_monthly.{spec.code}"):
+            climate = state_climate_monthly(spec)
+        with timer.stage(f"ingest.merge.{spec.code}"):
+            state_ndvi = ndvi_df[ndvi_df["state"] == spec.code].drop(columns=["state"])
+            merged = build_state_table(spec, state_ndvi, climate=climate)
+        with timer.stage(f"ingest.write_store.{spec.code}"):
+            write_analysis_store(merged, store_dir, spec.code)
+
+    # === Analysis and map rendering on the first state's output ===
+    first = specs[0]
+    plt.show = lambda *args, **kwargs: plt.close("all")
+    for name in ["ndvi_vs_temp_n_rainfall", "ndvi_conc_temp_n_rainfall", "temp_n_rainfall"]:
+        with timer.stage(f"plot.{name}"):
+            getattr(plot_graphs, name)(store_dir, states=[first.code])
+
+    # === Maps of every state that has a visualize script ===
+    map_scripts = {"MH": visualize_mh, "MP": visualize_mp}
+    for spec in specs:
+        if spec.code in map_scripts:
+            with timer.stage(f"map.{map_scripts[spec.code].__name__}"):
+                map_scripts[spec.code].draw_ndvi_map(
+                    spec.shape_file, store_dir, os.path.join(out_dir, f"maps_{spec.code}"), workers=workers
+                )
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(current, baseline_path, threshold):
+    """Print per-stage time ratios against a previous result file; returns the regressed stages"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != current["scale"]:
+        print("Warning: baseline was recorded at a different scale")
+
+    regressions = []
+    print(f"\n{'stage':<32} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for name, result in current["stages"].items():
+        old = baseline["stages"].get(name)
+        if old is None:
+            print(f"{name:<32} {'-':>11} {result['seconds']:>10.3f}")
+            continue
+        ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<32} {old['seconds']:>11.3f} {result['seconds']:>10.3f} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time each pipeline stage on synthetic data')
+    parser.add_argument('--states', nargs='+', default=["MH"], help='Synthetic state codes (MH, MP, ...)')
+    parser.add_argument('--districts', type=int, default=36, help='Districts per state')
+    parser.add_argument('--years', type=int, default=2, help='Number of years of data')
+    parser.add_argument('--fortnights', type=int, default=24, help='NDVI rasters per year (1-24)')
+    parser.add_argument('--raster_size', type=int, default=1024, help='NDVI raster height in pixels')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used for the NDVI reduction')
+    parser.add_argument('--data_dir', type=str, default=None, help='Keep the synthetic inputs here; reused when generated at the same scale (default: temp folder)')
+    parser.add_argument('--no_tracemalloc', action='store_true', help='Do not trace allocations (lower overhead, RSS only)')
+    parser.add_argument('--output', type=str, default="benchmark_results.json", help='JSON result file')
+    parser.add_argument('--compare', type=str, default=None, help='Previous result file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    scale = {
+        "states": args.states, "districts": args.districts, "years": args.years,
+        "fortnights": args.fortnights, "raster_size": args.raster_size, "workers": args.workers,
+    }
+    years = list(range(2016, 2016 + args.years))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or os.path.join(tmp, "data")
+        timer = StageTimer(trace_memory=not args.no_tracemalloc)
+
+        print("Generating (or reusing) synthetic data ...")
+        with timer.stage("setup.generate"):
+            dataset = generate_dataset(
+                data_dir, states=args.states, districts=args.districts, years=years,
+                fortnights=args.fortnights, raster_size=args.raster_size
+            )
+        print("Running pipeline ...")
+        run_pipeline(dataset, args.states, os.path.join(tmp, "out"), timer, workers=args.workers)
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "scale": scale,
+        "stages": timer.stages,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        sys.exit(1 if compare(result, args.compare, args.threshold) else 0)
@@ -0,0 +1,123 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import rasterio
+from affine import Affine
+from shapely.geometry import box
+
+# === Synthetic states are laid out side by side, starting at this corner (lon, lat) ===
+ORIGIN = (72.0, 22.0)
+STATE_NAMES = {"MH": "MAHARASHTRA", "MP": "MADHYA PRADESH"}
+MANIFEST_FILE = "dataset.json"
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+
+def district_grid(n_districts, x0, y0, width, height):
+    """Split a state rectangle into a near-square grid of n_districts boxes"""
+    cols = int(np.ceil(np.sqrt(n_districts)))
+    rows = int(np.ceil(n_districts / cols))
+    dx, dy = width / cols, height / rows
+    return [
+        box(x0 + (i % cols) * dx, y0 - (i // cols + 1) * dy, x0 + (i % cols + 1) * dx, y0 - (i // cols) * dy)
+        for i in range(n_districts)
+    ]
+
+
+def write_districts(folder, code, n_districts, x0):
+    """District geojson for one synthetic state, 4 x 4 degrees wide"""
+    geoms = district_grid(n_districts, x0, ORIGIN[1], 4.0, 4.0)
+    gdf = gpd.GeoDataFrame(
+        {"dtname": [f"{code}D{i:03d}" for i in range(n_districts)], "stname": STATE_NAMES.get(code, code)},
+        geometry=geoms, crs="EPSG:4326"
+    )
+    path = os.path.join(folder, f"{code}_DISTRICTS.geojson")
+    gdf.to_file(path, driver="GeoJSON")
+    return path
+
+
+def write_ndvi_stack(folder, years, fortnights, raster_size, n_states, seed=0):
+    """
+    uint8 NDVI GeoTIFFs named like the extractor output, covering all synthetic states plus a margin
+
+    Args:
+        fortnights: Number of fortnights per year (1-24)
+        raster_size: Raster height in pixels (width scales with the number of states)
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    height = raster_size
+    width = raster_size * n_states + raster_size // 4
+    pixel = 5.0 / raster_size
+    transform = Affine(pixel, 0, ORIGIN[0] - 0.5, 0, -pixel, ORIGIN[1] + 0.5)
+    profile = dict(
+        driver="GTiff", height=height, width=width, count=1, dtype="uint8", crs="EPSG:4326",
+        transform=transform, nodata=255, tiled=True, blockxsize=256, blockysize=256, compress="deflate"
+    )
+    paths = []
+    for year in years:
+        for k in range(fortnights):
+            month, half = MONTHS[k // 2], k % 2
+            name = f"NDVI_{month}_{year}_{'01to15' if half == 0 else '16to30'}.tif"
+            data = rng.integers(0, 255, size=(height, width), dtype=np.uint8)
+            path = os.path.join(folder, name)
+            with rasterio.open(path, "w", **profile) as dst:
+                dst.write(data, 1)
+            paths.append(path)
+    return paths
+
+
+def write_climate_csvs(folder, code, districts, years, seed=0):
+    """Daily precipitation and temperature CSVs in the layout of data/raw/*.csv"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(f"{min(years)}-01-01", f"{max(years)}-12-31").strftime("%Y-%m-%d")
+    n = len(dates) * len(districts)
+    daily = pd.DataFrame({"date": np.tile(dates, len(districts)), "District": np.repeat(districts, len(dates))})
+
+    rain_csv = os.path.join(folder, f"{code}_precipitation.csv")
+    daily.assign(rainfall_mm=rng.gamma(0.5, 8.0, n)).to_csv(rain_csv, index=False)
+
+    mean = 27 + 6 * np.sin(np.linspace(0, 2 * np.pi * len(years), n)) + rng.normal(0, 1, n)
+    temp_csv = os.path.join(folder, f"{code}_temperature.csv")
+    daily.assign(min=mean - 6, max=mean + 6, mean=mean).to_csv(temp_csv, index=False)
+    return rain_csv, temp_csv
+
+
+def generate_dataset(folder, states=("MH",), districts=36, years=(2016,), fortnights=24, raster_size=1024, seed=0):
+    """
+    Generate a complete synthetic input tree, or reuse the one already in the folder
+
+    A dataset.json manifest records the parameters a folder was generated with; when they
+    match and every file it lists still exists, the folder is reused as is.
+
+    Returns:
+        dict with "ndvi" (folder) and per state code a dict of shape_file / rain_csv / temp_csv
+    """
+    params = {
+        "states": list(states), "districts": districts, "years": list(years),
+        "fortnights": fortnights, "raster_size": raster_size, "seed": seed,
+    }
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is not None and manifest["params"] == params:
+        dataset = manifest["dataset"]
+        paths = manifest["rasters"] + [path for code in states for path in dataset[code].values()]
+        if all(os.path.exists(path) for path in paths):
+            return dataset
+
+    os.makedirs(folder, exist_ok=True)
+    dataset = {"ndvi": os.path.join(folder, "tif_files")}
+    for i, code in enumerate(states):
+        shape_file = write_districts(folder, code, districts, ORIGIN[0] + 4.0 * i)
+        names = [f"{code}D{j:03d}" for j in range(districts)]
+        rain_csv, temp_csv = write_climate_csvs(folder, code, names, years, seed=seed + i)
+        dataset[code] = {"shape_file": shape_file, "rain_csv": rain_csv, "temp_csv": temp_csv}
+    rasters = write_ndvi_stack(dataset["ndvi"], years, fortnights, raster_size, len(states), seed=seed)
+    with open(manifest_path, "w") as f:
+        json.dump({"params": params, "dataset": dataset, "rasters": rasters}, f)
+    return dataset
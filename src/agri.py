@@ -0,0 +1,69 @@
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+from instrumentation import span
+
+
+# === Subcommand -> (module, help); a module is only imported when its subcommand runs ===
+COMMANDS = {
+    "download": ("scrapper", "Download the OCM2 NDVI tiles"),
+    "extract": ("extractor", "Extract and rename the NDVI rasters from the downloads"),
+    "catalog": ("raster_catalog", "Catalog the NDVI rasters and report skipped, duplicate and missing fortnights"),
+    "climate": ("climate_data", "Convert the raw climate CSVs to the Parquet dataset"),
+    "stack": ("ndvi_stack", "Clip the NDVI rasters to the states' extent into one memory-mapped stack"),
+    "ingest": ("ingest", "Ingest one or more states (NDVI + climate) into the analysis store"),
+    "hotspots": ("hotspots", "Extract connected low-NDVI patches inside every district"),
+    "plot": ("plot_graphs", "Plot NDVI against temperature and rainfall"),
+    "serve": ("server", "Serve queries and ingestion jobs over a local HTTP API"),
+    "map": (None, "Draw the yearly NDVI map of a state (--state MH|MP, then the visualize_<state>.py options)"),
+}
+MAP_MODULES = {"MH": "visualize_mh", "MP": "visualize_mp"}
+
+
+def import_command(module_name):
+    """Import a subcommand's module, returning (module, seconds the import took)"""
+    start = time.perf_counter()
+    with span("agri.import", module=module_name):
+        module = importlib.import_module(module_name)
+    return module, time.perf_counter() - start
+
+
+def main(argv=None):
+    """
+    Single entry point of the pipeline scripts: agri <command> [options of the command's script]
+
+    Only the standard library is loaded until a command is chosen; the command's options
+    are parsed by the script it runs, so `agri <command> --help` lists them.
+    """
+    parser = argparse.ArgumentParser(
+        prog="agri", description="NDVI / climate pipeline",
+        epilog="Options after the command are those of its script, see agri <command> --help"
+    )
+    parser.add_argument("--import_time", action="store_true", help="Print the startup and import time to stderr")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (_, description) in COMMANDS.items():
+        subparsers.add_parser(name, help=description, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    module_name = COMMANDS[args.command][0]
+    if args.command == "map":
+        state = argparse.ArgumentParser(prog="agri map", add_help=False)
+        state.add_argument("--state", choices=list(MAP_MODULES), default="MH")
+        state_args, rest = state.parse_known_args(rest)
+        module_name = MAP_MODULES[state_args.state]
+
+    module, import_seconds = import_command(module_name)
+    if args.import_time:
+        print(
+            f"agri {args.command}: startup {(time.perf_counter() - _START - import_seconds) * 1000:.0f} ms, "
+            f"import {module_name} {import_seconds * 1000:.0f} ms", file=sys.stderr
+        )
+    return module.main(rest, prog=f"agri {args.command}")  # usage and errors of the script name the subcommand
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# === Analysis store layout: <store>/state=<state code>/year=<year>/part-0.parquet ===
+PARTITIONING = ds.partitioning(pa.schema([("state", pa.string()), ("year", pa.int16())]), flavor="hive")
+CSV_PREFIX = "climate_"
+
+
+def is_analysis_store(path):
+    """True for a Parquet analysis store, False for a folder of per-year climate_<year>.csv files"""
+    return os.path.isdir(path) and any(entry.startswith("state=") for entry in os.listdir(path))
+
+
+def write_analysis_store(merged, store_dir, state):
+    """
+    Replace one state's partitions of the analysis store with the merged ingestion table
+
+    Args:
+        merged: build_state_table() output (one row per district-month)
+        store_dir: Root folder of the analysis store
+        state: State code used as the partition value (e.g. "MH")
+    """
+    state_dir = os.path.join(store_dir, f"state={state}")
+    if os.path.exists(state_dir):
+        shutil.rmtree(state_dir)
+
+    # === state and year live in the folder names, not in the files ===
+    merged = merged.drop(columns=["state"], errors="ignore")
+    for year, yearly_df in merged.groupby("year", sort=True, observed=True):
+        year_dir = os.path.join(state_dir, f"year={year}")
+        os.makedirs(year_dir, exist_ok=True)
+        table = pa.Table.from_pandas(yearly_df.drop(columns=["year"]), preserve_index=False)
+        pq.write_table(table, os.path.join(year_dir, "part-0.parquet"))
+
+
+def _load_store(store_dir, columns, states, years, districts):
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING)
+    filter_expr = None
+    for field, values in [("state", states), ("year", years), ("district", districts)]:
+        if values is None:
+            continue
+        values = [int(v) for v in values] if field == "year" else list(values)
+        condition = ds.field(field).isin(values)
+        filter_expr = condition if filter_expr is None else filter_expr & condition
+    return dataset.to_table(columns=columns, filter=filter_expr).to_pandas()
+
+
+def _load_csv_folder(folder, columns, years, districts):
+    frames = []
+    files = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+    if not any(file.startswith(CSV_PREFIX) and file.endswith(".csv") for file in files):
+        raise FileNotFoundError(
+            f"No analysis data at {folder}: run the ingestion first (python src/agri.py ingest) "
+            "or pass the store/CSV folder it wrote"
+        )
+    for file in files:
+        if not (file.startswith(CSV_PREFIX) and file.endswith(".csv")):
+            continue
+        if years is not None and file[len(CSV_PREFIX):-len(".csv")] not in {str(y) for y in years}:
+            continue
+        usecols = None
+        if columns is not None:
+            usecols = lambda name: name in columns or name in ("year", "district")
+        frames.append(pd.read_csv(os.path.join(folder, file), usecols=usecols))
+    df = pd.concat(frames, ignore_index=True)
+    if years is not None:
+        df = df[df["year"].isin(years)]
+    if districts is not None:
+        df = df[df["district"].isin(districts)]
+    return df[columns] if columns is not None else df
+
+
+def source_signature(source):
+    """(relative path, size, mtime_ns) of every data file of a store or CSV folder; changes whenever the data does"""
+    signature = []
+    for root, _, files in os.walk(source):
+        for file in files:
+            if file.endswith(".parquet") or (file.startswith(CSV_PREFIX) and file.endswith(".csv")):
+                stat = os.stat(os.path.join(root, file))
+                signature.append((os.path.relpath(os.path.join(root, file), source), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(signature))
+
+
+def load_analysis(source, columns=None, states=None, years=None, districts=None):
+    """
+    Load the ingestion output with column selection and row filters
+
+    Args:
+        source: Analysis store folder, or a folder of per-year climate_<year>.csv files
+        columns: Columns to load (None = all)
+        states: State codes to keep (store only; a CSV folder holds a single state)
+        years: Years to keep
+        districts: Normalized (lower-case) district names to keep
+
+    Returns:
+        DataFrame of the selected rows and columns, reset index
+
+    Raises:
+        FileNotFoundError: source is neither a store nor a folder of climate_<year>.csv files
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+    if is_analysis_store(source):
+        df = _load_store(source, columns, states, years, districts)
+    else:
+        df = _load_csv_folder(source, columns, years, districts)
+    return df.reset_index(drop=True)
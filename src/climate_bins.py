@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+# === Columns the NDVI climate bins can be split by ===
+BIN_FACETS = ("state", "season", "year")
+
+
+def bin_width(value):
+    """Bin size parsed from a string (or number); ValueError unless it is finite and positive"""
+    width = float(value)
+    if not np.isfinite(width) or width <= 0:
+        raise ValueError(f"Bin size must be a positive number, got {value!r}")
+    return width
+
+
+def bin_edges(values, width):
+    """Edges of width-wide bins covering values, starting at a multiple of width"""
+    low = np.floor(np.min(values) / width) * width
+    n_bins = int(np.floor((np.max(values) - low) / width)) + 1
+    return low + width * np.arange(n_bins + 1)
+
+
+def bin_ndvi(df, temp_width=1.0, rain_width=10.0, facet=None, value="mean_ndvi", temp="mean_temp",
+             rain="mean_rainfall(mm)"):
+    """
+    Mean NDVI of each temperature x rainfall cell, optionally per state, season or year
+
+    Rows are assigned to [low, high) bins with np.digitize and reduced with one sum and one
+    count np.bincount over the flat (facet, temperature, rainfall) grid; only non-empty
+    cells are returned.
+
+    Args:
+        df: Analysis table with the value, temperature and rainfall columns (and the facet)
+        temp_width: Temperature bin size (deg C)
+        rain_width: Rainfall bin size (mm)
+        facet: Optional column of BIN_FACETS to bin each value of separately
+
+    Returns:
+        DataFrame with (facet,) temp_low, temp_high, rain_low, rain_high, count and the mean
+        value column, one row per non-empty cell, sorted by (facet,) temperature and rainfall
+    """
+    temp_width, rain_width = bin_width(temp_width), bin_width(rain_width)
+    if facet is not None and facet not in BIN_FACETS:
+        raise ValueError(f"Unknown facet {facet!r}, expected one of {list(BIN_FACETS)}")
+    df = df.dropna(subset=[value, temp, rain] + ([facet] if facet else []))
+    columns = ([facet] if facet else []) + ["temp_low", "temp_high", "rain_low", "rain_high", "count", value]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    t = df[temp].to_numpy(dtype=np.float64)
+    r = df[rain].to_numpy(dtype=np.float64)
+    t_edges, r_edges = bin_edges(t, temp_width), bin_edges(r, rain_width)
+    n_t, n_r = len(t_edges) - 1, len(r_edges) - 1
+    t_idx = np.clip(np.digitize(t, t_edges) - 1, 0, n_t - 1)
+    r_idx = np.clip(np.digitize(r, r_edges) - 1, 0, n_r - 1)
+
+    if facet:
+        codes, labels = pd.factorize(df[facet], sort=True)
+    else:
+        codes, labels = np.zeros(len(df), dtype=np.intp), [None]
+
+    # === One flat index per row, so the sum/count grid is two bincounts ===
+    flat = (codes * n_t + t_idx) * n_r + r_idx
+    size = len(labels) * n_t * n_r
+    count = np.bincount(flat, minlength=size)
+    total = np.bincount(flat, weights=df[value].to_numpy(dtype=np.float64), minlength=size)
+
+    cells = np.flatnonzero(count)
+    f_idx, rest = np.divmod(cells, n_t * n_r)
+    t_cell, r_cell = np.divmod(rest, n_r)
+    out = {}
+    if facet:
+        out[facet] = np.asarray(labels)[f_idx]
+    out["temp_low"] = t_edges[t_cell]
+    out["temp_high"] = t_edges[t_cell + 1]
+    out["rain_low"] = r_edges[r_cell]
+    out["rain_high"] = r_edges[r_cell + 1]
+    out["count"] = count[cells]
+    out[value] = total[cells] / count[cells]
+    return pd.DataFrame(out, columns=columns)
+
+
+def top_cells(bins, k=5, min_count=1, facet=None, value="mean_ndvi"):
+    """
+    The k cells with the highest mean value (per facet value when bins are faceted)
+
+    Args:
+        bins: bin_ndvi() output
+        min_count: Ignore cells with fewer rows than this
+        facet: The facet the bins were computed with
+    """
+    bins = bins[bins["count"] >= min_count].sort_values(value, ascending=False, kind="stable")
+    top = bins.groupby(facet, sort=True).head(k) if facet else bins.head(k)
+    return top.sort_values([facet, value], ascending=[True, False], kind="stable") if facet else top
+
+
+def cell_label(low, high, unit=""):
+    """Bin label like [25, 26) or [10, 20) mm"""
+    label = f"[{low:g}, {high:g})"
+    return f"{label} {unit}" if unit else label
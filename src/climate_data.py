@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from config import Configuration
+
+
+# === Hive partitioning of the Parquet copy: <dataset>/state=<state>/year=<year>/part-0.parquet ===
+PARTITIONING = ds.partitioning(pa.schema([("state", pa.string()), ("year", pa.int16())]), flavor="hive")
+SOURCE_MANIFEST = "_source.json"
+# === Daily rows per chunk when streaming a climate table ===
+CHUNK_ROWS = 500_000
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"csv": os.path.abspath(csv_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _compact(df):
+    """Add month/year and downcast a daily climate frame (categorical District, float32 values)"""
+    df["District"] = df["District"].astype("category")
+    df["month"] = df["date"].dt.month.astype("int8")
+    df["year"] = df["date"].dt.year.astype("int16")
+    for column in df.columns:
+        if column not in ("date", "month", "year") and df[column].dtype == np.float64:
+            df[column] = df[column].astype("float32")
+    return df
+
+
+def _map_categories(districts, func):
+    """Apply a name -> name function once per category instead of once per row"""
+    districts = districts.astype("category")
+    names = [func(c) for c in districts.cat.categories]
+    categories = sorted(set(names))
+    lookup = np.append(pd.Index(categories).get_indexer(names), -1)
+    codes = lookup[districts.cat.codes.to_numpy()]  # code -1 (missing) maps to -1
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=districts.index, name=districts.name)
+
+
+def rename_districts(districts, rename_map):
+    """
+    Apply a CSV -> geojson district rename map to a (categorical) District column
+
+    Renames happen on the categories, not on every daily row.
+    """
+    return _map_categories(districts, lambda name: rename_map.get(name, name))
+
+
+def normalize_districts(districts):
+    """Categorical, stripped and lower-cased district names (the join key between all sources)"""
+    return _map_categories(districts, lambda name: name.strip().lower())
+
+
+def read_climate_csv(csv_path, columns=None):
+    """
+    Parse a raw daily climate CSV into the compact frame layout
+
+    Args:
+        csv_path: CSV with a "date" and a "District" column plus value columns
+        columns: Optional value columns to keep (date and District are always read)
+    """
+    usecols = None if columns is None else list(dict.fromkeys(["date", "District", *columns]))
+    df = pd.read_csv(csv_path, usecols=usecols, dtype={"District": "category"})
+    df["date"] = pd.to_datetime(df["date"], format="ISO8601")
+    return _compact(df)
+
+
+def parquet_is_fresh(csv_path, dataset_dir, state):
+    manifest = os.path.join(dataset_dir, f"state={state}", SOURCE_MANIFEST)
+    if not os.path.exists(manifest):
+        return False
+    with open(manifest) as f:
+        recorded = json.load(f)
+    current = _source_signature(csv_path)
+    return recorded.get("size") == current["size"] and recorded.get("mtime_ns") == current["mtime_ns"]
+
+
+def convert_climate_csv(csv_path, dataset_dir, state):
+    """
+    Write a daily climate CSV once to a Parquet dataset partitioned by state and year
+
+    Args:
+        csv_path: Raw daily CSV (e.g. data/raw/MH_precipitation.csv)
+        dataset_dir: Root of the Parquet dataset for this variable
+        state: Partition label of the state (e.g. "MH")
+    """
+    df = read_climate_csv(csv_path)
+    state_dir = os.path.join(dataset_dir, f"state={state}")
+    if os.path.exists(state_dir):
+        shutil.rmtree(state_dir)
+
+    for year, yearly_df in df.groupby("year", sort=True, observed=True):
+        year_dir = os.path.join(state_dir, f"year={year}")
+        os.makedirs(year_dir, exist_ok=True)
+        table = pa.Table.from_pandas(yearly_df.drop(columns=["year"]), preserve_index=False)
+        pq.write_table(table, os.path.join(year_dir, "part-0.parquet"))
+
+    # === The manifest is written last, so an interrupted conversion is seen as stale ===
+    with open(os.path.join(state_dir, SOURCE_MANIFEST), "w") as f:
+        json.dump(_source_signature(csv_path), f)
+
+
+def _parquet_query(dataset_dir, state, columns=None, years=None):
+    dataset = ds.dataset(dataset_dir, format="parquet", partitioning=PARTITIONING)
+    filter_expr = ds.field("state") == state
+    if years is not None:
+        filter_expr &= ds.field("year").isin([int(y) for y in years])
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(["date", "District", *columns, "month", "year"]))
+    return dataset, read_columns, filter_expr
+
+
+def _from_arrow(table):
+    """Arrow table/batch of the Parquet dataset -> compact daily frame"""
+    df = table.to_pandas()
+    df = df.drop(columns=["state"], errors="ignore")
+    df["date"] = pd.to_datetime(df["date"])
+    df["District"] = df["District"].astype("category")
+    df["month"] = df["month"].astype("int8")
+    df["year"] = df["year"].astype("int16")
+    return df
+
+
+def read_climate_parquet(dataset_dir, state, columns=None, years=None):
+    """
+    Read one state's daily climate data from the Parquet dataset with column and predicate pushdown
+    """
+    dataset, read_columns, filter_expr = _parquet_query(dataset_dir, state, columns, years)
+    return _from_arrow(dataset.to_table(columns=read_columns, filter=filter_expr))
+
+
+def load_climate_table(csv_path, dataset_dir=None, state=None, columns=None, years=None):
+    """
+    Load daily climate data, from the Parquet copy when it is up to date and from the CSV otherwise
+
+    Args:
+        csv_path: Raw daily CSV
+        dataset_dir: Root of the Parquet dataset for this variable (None = always use the CSV)
+        state: Partition label of the state in the dataset
+        columns: Optional value columns to load (date, District, month and year are always returned)
+        years: Optional list of years to keep
+
+    Returns:
+        DataFrame with date, District (categorical), the value columns (float32), month (int8), year (int16)
+    """
+    if dataset_dir is not None and state is not None and parquet_is_fresh(csv_path, dataset_dir, state):
+        return read_climate_parquet(dataset_dir, state, columns=columns, years=years)
+
+    df = read_climate_csv(csv_path, columns=columns)
+    if years is not None:
+        df = df[df["year"].isin(years)].reset_index(drop=True)
+    return df
+
+
+def iter_climate_chunks(csv_path, dataset_dir=None, state=None, columns=None, years=None, chunksize=CHUNK_ROWS):
+    """
+    Stream daily climate data in compact frames of at most `chunksize` rows
+
+    Same sources and arguments as load_climate_table(), but the full daily table is never held
+    in memory: the CSV is parsed chunk by chunk, the Parquet copy is read batch by batch.
+    """
+    if dataset_dir is not None and state is not None and parquet_is_fresh(csv_path, dataset_dir, state):
+        dataset, read_columns, filter_expr = _parquet_query(dataset_dir, state, columns, years)
+        for batch in dataset.to_batches(columns=read_columns, filter=filter_expr, batch_size=chunksize):
+            if batch.num_rows:
+                yield _from_arrow(batch)
+        return
+
+    usecols = None if columns is None else list(dict.fromkeys(["date", "District", *columns]))
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype={"District": "category"}, chunksize=chunksize):
+        chunk["date"] = pd.to_datetime(chunk["date"], format="ISO8601")
+        chunk = _compact(chunk)
+        if years is not None:
+            chunk = chunk[chunk["year"].isin(years)]
+        if len(chunk):
+            yield chunk
+
+
+def climate_datasets(cfg):
+    """(csv, dataset_dir, state) for every raw climate CSV in the configuration"""
+    precipitation = os.path.join(cfg.climate_parquet_folder, "precipitation")
+    temperature = os.path.join(cfg.climate_parquet_folder, "temperature")
+    return [
+        (cfg.rain_df_mh, precipitation, "MH"),
+        (cfg.temp_df_mh, temperature, "MH"),
+        (cfg.rain_df_mp, precipitation, "MP"),
+        (cfg.temp_df_mp, temperature, "MP"),
+    ]
+
+
+def main(argv=None, prog=None):
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Convert the raw climate CSVs to a partitioned Parquet dataset')
+    parser.add_argument('--force', action='store_true', help='Convert even if the Parquet copy is up to date')
+    args = parser.parse_args(argv)
+
+    for csv_path, dataset_dir, state in climate_datasets(cfg):
+        if not args.force and parquet_is_fresh(csv_path, dataset_dir, state):
+            print(f"Up to date: {csv_path}")
+            continue
+        convert_climate_csv(csv_path, dataset_dir, state)
+        print(f"Converted: {csv_path} -> {dataset_dir}/state={state}")
+
+
+if __name__ == "__main__":
+    main()
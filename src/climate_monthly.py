@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from climate_data import CHUNK_ROWS, iter_climate_chunks
+
+
+KEYS = ["District", "year", "month"]
+
+# === Every output statistic is rebuilt from mergeable partials: how partials of two chunks combine ===
+PARTIALS = {"mean": ("sum", "count"), "sum": ("sum",), "count": ("count",), "min": ("min",), "max": ("max",)}
+COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+class MonthlyAccumulator:
+    """
+    Running per-(District, year, month) statistics of daily climate chunks
+
+    Only the partials (sums, counts, minima, maxima) per district-month are kept, so memory
+    grows with the number of district-months and not with the number of daily rows.
+
+    Args:
+        aggregations: {output column: (daily column, statistic)}, statistic one of
+            mean, sum, count, min, max (like pandas named aggregation)
+    """
+
+    def __init__(self, aggregations):
+        self.aggregations = aggregations
+        self.partials = list(dict.fromkeys(
+            (column, partial) for column, stat in aggregations.values() for partial in PARTIALS[stat]
+        ))
+        self.state = None
+
+    def update(self, chunk):
+        """Fold one daily chunk (District, year, month and the value columns) into the running partials"""
+        grouped = chunk.groupby(KEYS, observed=True)
+        part = pd.DataFrame({
+            (column, partial): getattr(grouped[column], partial)().astype(np.float64)
+            for column, partial in self.partials
+        })
+        part.index = part.index.set_levels(part.index.levels[0].astype(str), level="District")
+        if self.state is not None:
+            part = pd.concat([self.state, part])
+            part = part.groupby(level=KEYS).agg({key: COMBINE[key[1]] for key in self.partials})
+        self.state = part
+
+    def result(self):
+        """DataFrame with District (categorical), year (int16), month (int8) and one column per aggregation"""
+        state = self.state
+        if state is None:
+            state = pd.DataFrame(
+                {key: pd.Series(dtype=np.float64) for key in self.partials},
+                index=pd.MultiIndex.from_arrays([[], [], []], names=KEYS)
+            )
+        state = state.sort_index()
+        columns = {}
+        for name, (column, stat) in self.aggregations.items():
+            if stat == "mean":
+                count = state[(column, "count")]
+                columns[name] = (state[(column, "sum")] / count.where(count > 0)).to_numpy()
+            else:
+                columns[name] = state[(column, stat)].to_numpy()
+        index = state.index.to_frame(index=False)
+        return pd.DataFrame({
+            "District": index["District"].astype("category"),
+            "year": index["year"].astype("int16"),
+            "month": index["month"].astype("int8"),
+            **columns,
+        })
+
+
+def stream_monthly(csv_path, aggregations, dataset_dir=None, state=None, prepare=None, chunksize=CHUNK_ROWS):
+    """
+    Aggregate a daily climate table to district-months without loading it whole
+
+    Args:
+        csv_path: Raw daily CSV (the Parquet copy in dataset_dir is read instead while it is up to date)
+        aggregations: {output column: (daily column, statistic)}, see MonthlyAccumulator
+        dataset_dir: Root of the Parquet dataset for this variable
+        state: Partition label of the state in the dataset
+        prepare: Optional function applied to every chunk before it is aggregated
+            (e.g. renaming districts or deriving columns)
+        chunksize: Daily rows per chunk
+
+    Returns:
+        DataFrame with District, year, month and the aggregated columns
+    """
+    columns = list(dict.fromkeys(column for column, _ in aggregations.values()))
+    accumulator = MonthlyAccumulator(aggregations)
+    for chunk in iter_climate_chunks(csv_path, dataset_dir, state, chunksize=chunksize):
+        if prepare is not None:
+            chunk = prepare(chunk)
+        accumulator.update(chunk[KEYS + columns])
+    return accumulator.result()
+
+
+def temperature_aggregations(degree_day_base=None, heat_threshold=None):
+    """
+    Monthly temperature statistics as {output column: (daily column, statistic)}
+
+    Args:
+        degree_day_base: Base temperature (deg C) of the optional degree_days column
+        heat_threshold: Daily maximum (deg C) from which a day counts in the optional heat_stress_days column
+    """
+    aggregations = {"min_temp": ("min", "min"), "max_temp": ("max", "max"), "mean_temp": ("mean", "mean")}
+    if degree_day_base is not None:
+        aggregations["degree_days"] = ("degree_day", "sum")
+    if heat_threshold is not None:
+        aggregations["heat_stress_days"] = ("heat_stress_day", "sum")
+    return aggregations
+
+
+def add_temperature_indices(df, degree_day_base=None, heat_threshold=None):
+    """Daily degree_day / heat_stress_day columns used by temperature_aggregations()"""
+    if degree_day_base is not None:
+        df["degree_day"] = np.clip(df["mean"] - degree_day_base, 0, None)
+    if heat_threshold is not None:
+        df["heat_stress_day"] = (df["max"] >= heat_threshold).astype(np.float32)
+    return df
+
+
+def monthly_temperature(temp_df, keys, degree_day_base=None, heat_threshold=None):
+    """
+    Mean, min-of-min and max-of-max temperature (plus optional indices) per group in one pass
+
+    Args:
+        temp_df: Daily temperature frame with min, max and mean columns
+        keys: Group keys, e.g. ["district", "season", "month", "year"]
+
+    Returns:
+        One row per group with the keys and the temperature_aggregations() columns
+    """
+    temp_df = add_temperature_indices(temp_df, degree_day_base, heat_threshold)
+    aggregations = temperature_aggregations(degree_day_base, heat_threshold)
+    return temp_df.groupby(keys, observed=True).agg(**aggregations).reset_index()
@@ -8,6 +8,13 @@ class Configuration:
     temp_df_mh = "data/raw/MH_temperature.csv"
     rain_df_mp = "data/raw/MP_precipitation.csv"
     temp_df_mp = "data/raw/MP_temperature.csv"
+    climate_parquet_folder = "data/parquet"
     ndvi_folder = "data/tif_files"
+    ndvi_cache_folder = "data/cache/ndvi"
+    ndvi_stack_folder = "data/stack"
+    geometry_cache_folder = "data/cache/geometry"
+    analysis_store = "data/analysis"
+    ndvi_cube_folder = "data/cube"
+    hotspots_file = "data/hotspots.parquet"
     output_folder_mh = "analysis_MH"
-    outut_folder_mp = "analysis_MP"
+    output_folder_mp = "analysis_MP"
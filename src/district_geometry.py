@@ -0,0 +1,96 @@
+import hashlib
+import os
+
+
+# === Simplification levels kept in the cache, as a fraction of the districts' larger extent ===
+# === "exact" is used for zonal statistics, "map" (about one pixel of a 2000 px map) and "overview" for plotting ===
+SIMPLIFY_LEVELS = {"exact": 0, "map": 1 / 2000, "overview": 1 / 500}
+
+
+def _cache_path(shape_file, cache_dir):
+    """<stem>-<path hash>-<size/mtime hash>.parquet: one GeoJSON's entries share everything up to the last hash"""
+    stat = os.stat(shape_file)
+    source = hashlib.sha1(os.path.abspath(shape_file).encode()).hexdigest()
+    version = hashlib.sha1(f"{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()
+    stem = os.path.splitext(os.path.basename(shape_file))[0].replace(" ", "_")
+    return os.path.join(cache_dir, f"{stem}-{source[:8]}-{version[:12]}.parquet")
+
+
+def _remove_stale_entries(path):
+    """Delete the cache entries of earlier versions of the GeoJSON cached at path"""
+    folder, name = os.path.split(path)
+    prefix = name[:name.rindex("-") + 1]
+    for entry in os.listdir(folder):
+        if entry.startswith(prefix) and entry.endswith(".parquet") and entry != name:
+            try:
+                os.remove(os.path.join(folder, entry))
+            except OSError:
+                pass  # already removed by a concurrent run
+
+
+def prepare_geometry(shape_file):
+    """
+    Read a district GeoJSON once and add normalized keys and every simplification level
+
+    Returns:
+        GeoDataFrame with dtname, district (stripped lower-case dtname), stname (stripped
+        upper-case), geometry (exact) and one geometry_<level> column per simplified level
+    """
+    import geopandas as gpd  # deferred: importing the map and ingestion scripts (e.g. for --help) stays fast
+
+    gdf = gpd.read_file(shape_file)
+    gdf.columns = gdf.columns.str.strip().str.lower()
+    if "stname" not in gdf.columns:
+        gdf["stname"] = None
+    gdf = gdf[["dtname", "stname", "geometry"]].copy()
+    gdf["district"] = gdf["dtname"].str.strip().str.lower()
+    gdf["stname"] = gdf["stname"].str.strip().str.upper()
+
+    minx, miny, maxx, maxy = gdf.total_bounds
+    extent = max(maxx - minx, maxy - miny)
+    for level, fraction in SIMPLIFY_LEVELS.items():
+        if fraction:
+            gdf[f"geometry_{level}"] = gdf.geometry.simplify(extent * fraction, preserve_topology=True)
+    return gdf[["dtname", "district", "stname", "geometry", *[f"geometry_{l}" for l, f in SIMPLIFY_LEVELS.items() if f]]]
+
+
+def load_districts(shape_file, level="exact", cache_dir=None):
+    """
+    District outlines with normalized keys at one simplification level
+
+    With a cache_dir the prepared table is stored once as GeoParquet (keyed on the GeoJSON's
+    path, size and mtime) and later runs read it instead of parsing the GeoJSON; writing
+    the entry of a changed GeoJSON removes the entries of its earlier versions.
+
+    Args:
+        shape_file: District GeoJSON
+        level: One of SIMPLIFY_LEVELS ("exact" for zonal statistics, "map" / "overview" for plots)
+        cache_dir: Folder of the GeoParquet cache (None = always read the GeoJSON)
+
+    Returns:
+        GeoDataFrame with dtname, district, stname and geometry (at the requested level)
+    """
+    if level not in SIMPLIFY_LEVELS:
+        raise ValueError(f"Unknown simplification level {level!r}, expected one of {list(SIMPLIFY_LEVELS)}")
+    column = "geometry" if level == "exact" else f"geometry_{level}"
+
+    if cache_dir is None:
+        gdf = prepare_geometry(shape_file)
+    else:
+        path = _cache_path(shape_file, cache_dir)
+        if os.path.exists(path):
+            import geopandas as gpd  # deferred, see prepare_geometry
+
+            gdf = gpd.read_parquet(path, columns=["dtname", "district", "stname", column])
+        else:
+            gdf = prepare_geometry(shape_file)
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            gdf.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+            _remove_stale_entries(path)
+
+    gdf = gdf[["dtname", "district", "stname", column]].set_geometry(column)
+    if column != "geometry":
+        gdf = gdf.rename_geometry("geometry")
+    return gdf
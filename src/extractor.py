@@ -1,120 +1,260 @@
 import os
+import json
 import shutil
-import glob
+import zipfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def extract_tif_files(source_dir=".", target_dir="extracted_tifs"):
+TIF_EXTENSIONS = (".tif", ".tiff")
+COPY_BUFFER = 1 << 20
+VSIZIP_INDEX = "vsizip_index.json"
+
+
+def parse_source_name(name):
+    """
+    Extract (time_range, month, year) from a download name like 01to15+apr_2019 or 01to15_apr2019
+
+    Returns:
+        (time_range, month, year) or None if the name cannot be parsed
+    """
+    # Handle both + and _ separators
+    parts = name.replace('+', '_').split('_')
+    if len(parts) < 2:
+        return None
+
+    time_range = parts[0]  # 01to15
+    if len(parts) >= 3:
+        month = parts[1]       # apr
+        year = parts[2]        # 2019
+    else:
+        # If only 2 parts, second part might be month+year
+        month_year = parts[1]
+        # Try to extract year (last 4 digits)
+        if len(month_year) > 4 and month_year[-4:].isdigit():
+            year = month_year[-4:]
+            month = month_year[:-4]
+        else:
+            month = month_year
+            year = "unknown"
+    return time_range, month, year
+
+
+def canonical_tif_name(source_name, original_name):
+    """New file name of a raster: NDVI_month_year_timerange.tif, or <source>_<original> if unparseable"""
+    extension = os.path.splitext(original_name)[1]
+    parsed = parse_source_name(source_name)
+    if parsed is None:
+        return f"{source_name}_{os.path.basename(original_name)}"
+    time_range, month, year = parsed
+    return f"NDVI_{month}_{year}_{time_range}{extension}"
+
+
+def is_tif(name):
+    return name.lower().endswith(TIF_EXTENSIONS)
+
+
+def scan_sources(source_dir):
+    """
+    One os.scandir walk of the source folder
+
+    Returns:
+        (directories, archives): {top-level directory name: [tif paths found below it]} and the
+        list of .zip files directly in the source folder, both sorted
+    """
+    directories, archives = {}, []
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                directories[entry.name] = []
+            elif entry.is_file() and entry.name.lower().endswith(".zip"):
+                archives.append(entry.path)
+
+    for dir_name, tif_files in directories.items():
+        stack = [os.path.join(source_dir, dir_name)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    elif entry.is_file() and is_tif(entry.name):
+                        tif_files.append(entry.path)
+        tif_files.sort()
+    return dict(sorted(directories.items())), sorted(archives)
+
+
+class NamePlanner:
+    """
+    Assigns target file names, adding _1, _2, ... on collisions, without touching the disk per name
+
+    Suffixes are only added for names already taken in this run (or by /vsizip/ index
+    entries). A file left in the target folder by an earlier run is the same raster when
+    the source has its size and is not newer, and is reported as already extracted;
+    otherwise the source is a new version of it (e.g. a re-downloaded tile) and replaces it.
+    """
+
+    def __init__(self, target_dir):
+        self.existing = {}
+        with os.scandir(target_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    self.existing[entry.name] = (stat.st_size, stat.st_mtime)
+        self.reserved = set()
+        self.lock = threading.Lock()
+
+    def reserve(self, name, size=None, mtime=None):
+        """
+        Returns (name, already_present); size=None never matches nor replaces an existing file
+        """
+        with self.lock:
+            base, ext = os.path.splitext(name)
+            candidate, counter = name, 1
+            while candidate in self.reserved or candidate in self.existing:
+                existing = self.existing.get(candidate)
+                if candidate not in self.reserved and size is not None and existing is not None:
+                    self.reserved.add(candidate)
+                    same = existing[0] == size and (mtime is None or mtime <= existing[1])
+                    return candidate, same
+                candidate = f"{base}_{counter}{ext}"
+                counter += 1
+            self.reserved.add(candidate)
+            return candidate, False
+
+
+def link_or_copy(source, target):
+    """Hard-link a raster into the target folder, copying only across file systems"""
+    tmp = f"{target}.tmp"
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, target)
+
+
+def stream_zip_member(archive, member, target):
+    """Stream one archive member to disk in 1 MB chunks (no intermediate unzipped folder)"""
+    tmp = f"{target}.tmp"
+    with archive.open(member) as src, open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER)
+    os.replace(tmp, target)
+
+
+def vsizip_path(archive_path, member_name):
+    """GDAL path that reads a raster in place from inside a zip archive"""
+    return f"/vsizip/{os.path.abspath(archive_path)}/{member_name}"
+
+
+def _process_archive(archive_path, jobs, target_dir, mode):
+    done = {}
+    if mode == "vsizip":
+        for member, name in jobs:
+            done[name] = vsizip_path(archive_path, member.filename)
+        return done
+    with zipfile.ZipFile(archive_path) as archive:
+        for member, name in jobs:
+            stream_zip_member(archive, member, os.path.join(target_dir, name))
+            done[name] = os.path.join(target_dir, name)
+    return done
+
+
+def extract_tif_files(source_dir=".", target_dir="extracted_tifs", workers=4, mode="extract"):
     """
-    Extract TIF files from all subdirectories and rename them
-    
+    Extract TIF files from all downloaded zip archives and unzipped subdirectories and rename them
+
     Args:
-        source_dir: Directory containing the folders with TIF files
+        source_dir: Directory containing the .zip downloads and/or folders with TIF files
         target_dir: Directory where extracted TIF files will be saved
+        workers: Number of archives processed in parallel
+        mode: "extract" streams zip members into target_dir; "vsizip" leaves them in the
+            archives and records /vsizip/ paths in target_dir/vsizip_index.json instead
     """
-    
+    if mode not in ("extract", "vsizip"):
+        raise ValueError(f"Unknown mode: {mode}")
+
     # Create target directory if it doesn't exist
-    Path(target_dir).mkdir(exist_ok=True)
-    
-    # Get all directories in the source directory
-    all_items = os.listdir(source_dir)
-    directories = [item for item in all_items if os.path.isdir(os.path.join(source_dir, item))]
-    
-    print(f"Found {len(directories)} directories to process:")
-    for d in directories:
-        print(f"  {d}")
-    
-    if not directories:
-        print("No directories found!")
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+
+    directories, archives = scan_sources(source_dir)
+    print(f"Found {len(directories)} directories and {len(archives)} zip archives to process")
+    if not directories and not archives:
+        print("No directories or archives found!")
         return
-    
-    extracted_count = 0
-    
-    for dir_name in directories:
-        dir_path = os.path.join(source_dir, dir_name)
-        print(f"\nProcessing directory: {dir_name}")
-        
-        # Find TIF files in the directory (including subdirectories)
-        tif_extensions = ["*.tif", "*.tiff", "*.TIF", "*.TIFF"]
-        all_tif_files = []
-        
-        for ext in tif_extensions:
-            tif_pattern = os.path.join(dir_path, "**", ext)
-            tif_files = glob.glob(tif_pattern, recursive=True)
-            all_tif_files.extend(tif_files)
-        
-        print(f"  Found {len(all_tif_files)} TIF files")
-        
-        if all_tif_files:
-            for tif_file in all_tif_files:
-                # Extract parts from directory name
-                # Handle both + and _ separators
-                dir_name_clean = dir_name.replace('+', '_')
-                parts = dir_name_clean.split('_')
-                
-                print(f"    Processing: {os.path.basename(tif_file)}")
-                
-                if len(parts) >= 2:
-                    time_range = parts[0]  # 01to15
-                    
-                    # Try to extract month and year
-                    if len(parts) >= 3:
-                        month = parts[1]       # apr
-                        year = parts[2]        # 2019
-                    else:
-                        # If only 2 parts, second part might be month+year
-                        month_year = parts[1]
-                        # Try to extract year (last 4 digits)
-                        if len(month_year) > 4 and month_year[-4:].isdigit():
-                            year = month_year[-4:]
-                            month = month_year[:-4]
-                        else:
-                            month = month_year
-                            year = "unknown"
-                    
-                    # Create new filename
-                    original_name = os.path.basename(tif_file)
-                    extension = os.path.splitext(original_name)[1]
-                    
-                    # New naming format: NDVI_month_year_timerange.tif
-                    new_filename = f"NDVI_{month}_{year}_{time_range}{extension}"
-                    
-                    # Full path for new file
-                    new_file_path = os.path.join(target_dir, new_filename)
-                    
-                    # Handle duplicate filenames
-                    counter = 1
-                    base_new_file_path = new_file_path
-                    while os.path.exists(new_file_path):
-                        name_part = os.path.splitext(base_new_file_path)[0]
-                        ext_part = os.path.splitext(base_new_file_path)[1]
-                        new_file_path = f"{name_part}_{counter}{ext_part}"
-                        counter += 1
-                    
-                    # Copy the file
-                    try:
-                        shutil.copy2(tif_file, new_file_path)
-                        print(f"      -> {os.path.basename(new_file_path)}")
-                        extracted_count += 1
-                    except Exception as e:
-                        print(f"      Error: {e}")
-                else:
-                    # If we can't parse the directory name, just use it as is
-                    original_name = os.path.basename(tif_file)
-                    extension = os.path.splitext(original_name)[1]
-                    new_filename = f"{dir_name}_{original_name}"
-                    new_file_path = os.path.join(target_dir, new_filename)
-                    
-                    try:
-                        shutil.copy2(tif_file, new_file_path)
-                        print(f"      -> {new_filename}")
-                        extracted_count += 1
-                    except Exception as e:
-                        print(f"      Error: {e}")
-        else:
-            print(f"    No TIF files found")
-    
-    print(f"\nExtraction complete! Total files extracted: {extracted_count}")
+
+    # === Plan all target names up front (sorted, so duplicate suffixes are deterministic) ===
+    planner = NamePlanner(target_dir)
+    index_path = os.path.join(target_dir, VSIZIP_INDEX)
+    vsizip_index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            vsizip_index = json.load(f)
+    indexed_paths = set(vsizip_index.values())
+    for name in vsizip_index:
+        planner.existing.setdefault(name, None)
+
+    link_jobs, archive_jobs, skipped = [], {}, 0
+    for dir_name, tif_files in directories.items():
+        for tif_file in tif_files:
+            stat = os.stat(tif_file)
+            name, present = planner.reserve(canonical_tif_name(dir_name, tif_file), stat.st_size, stat.st_mtime)
+            if present:
+                skipped += 1
+            else:
+                link_jobs.append((tif_file, os.path.join(target_dir, name)))
+
+    for archive_path in archives:
+        stem = os.path.splitext(os.path.basename(archive_path))[0]
+        archive_mtime = os.path.getmtime(archive_path)
+        with zipfile.ZipFile(archive_path) as archive:
+            members = sorted((m for m in archive.infolist() if not m.is_dir() and is_tif(m.filename)), key=lambda m: m.filename)
+        jobs = []
+        for member in members:
+            name = canonical_tif_name(stem, member.filename)
+            if mode == "vsizip":
+                if vsizip_path(archive_path, member.filename) in indexed_paths:
+                    skipped += 1
+                    continue
+                name, _ = planner.reserve(name)
+                jobs.append((member, name))
+                continue
+            name, present = planner.reserve(name, member.file_size, archive_mtime)
+            if present:
+                skipped += 1
+            else:
+                jobs.append((member, name))
+        if jobs:
+            archive_jobs[archive_path] = jobs
+
+    # === Link loose rasters, stream (or index) archive members in parallel across archives ===
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for _ in pool.map(lambda job: link_or_copy(*job), link_jobs):
+            pass
+        results = pool.map(lambda item: _process_archive(item[0], item[1], target_dir, mode), archive_jobs.items())
+        from_archives = {}
+        for done in results:
+            from_archives.update(done)
+
+    if mode == "vsizip":
+        vsizip_index.update(from_archives)
+        with open(index_path, "w") as f:
+            json.dump(vsizip_index, f, indent=1, sort_keys=True)
+
+    print(f"\nExtraction complete! Linked {len(link_jobs)} files, {'indexed' if mode == 'vsizip' else 'extracted'} "
+          f"{len(from_archives)} archive members, {skipped} already present")
     print(f"Files saved to: {os.path.abspath(target_dir)}")
 
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Extract NDVI rasters from downloaded archives')
+    parser.add_argument('--source', type=str, default="data/downloads", help='Folder with the downloaded .zip files and/or unzipped folders')
+    parser.add_argument('--target', type=str, default="data/tif_files", help='Folder for the renamed NDVI rasters')
+    parser.add_argument('--workers', type=int, default=4, help='Number of archives processed in parallel')
+    parser.add_argument('--mode', choices=["extract", "vsizip"], default="extract", help='"vsizip" reads rasters in place from the archives instead of extracting them')
+    args = parser.parse_args(argv)
+
+    extract_tif_files(source_dir=args.source, target_dir=args.target, workers=args.workers, mode=args.mode)
+
+
 if __name__ == "__main__":
-    extract_tif_files(source_dir="data/ndvi_files", target_dir="data/tif_files")
+    main()
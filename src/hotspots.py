@@ -0,0 +1,234 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import rasterio
+import shapely
+from rasterio.crs import CRS
+from scipy import ndimage
+from config import Configuration
+from instrumentation import span
+from ndvi import DEFAULT_STRESS_THRESHOLD, NDVI_SCALE, ndvi_rasters
+from ndvi_stack import NdviStack, is_ndvi_stack
+from raster_windows import bounds_window
+from zonal import geometry_key, rasterize_zones
+
+
+# === Pixels touching at edges or corners belong to the same patch ===
+CONNECTIVITY = np.ones((3, 3), dtype=bool)
+KM_PER_DEGREE = 111.32
+HOTSPOT_COLUMNS = [
+    "pixels", "area_km2", "centroid_x", "centroid_y", "minx", "miny", "maxx", "maxy", "mean_ndvi", "min_ndvi"
+]
+
+
+def _pixel_area_km2(transform, crs, n_rows):
+    """Area of one pixel of every row: degrees scaled by the row's latitude for geographic CRSs, else metres"""
+    area = abs(transform.a * transform.e)
+    if crs is not None and CRS.from_user_input(crs).is_geographic:
+        lat = transform.f + transform.e * (np.arange(n_rows) + 0.5)
+        return area * KM_PER_DEGREE ** 2 * np.cos(np.radians(lat))
+    return np.full(n_rows, area / 1e6)
+
+
+def find_hotspots(data, labels, transform, crs=None, threshold=DEFAULT_STRESS_THRESHOLD, nodata=None, min_pixels=1):
+    """
+    Connected low-NDVI patches of one raster, split at district boundaries
+
+    Each district's bounding box is labelled with scipy.ndimage.label (8-connectivity);
+    area, centroid, bounding box and NDVI of all patches then come from one set of
+    bincounts over the patch id grid.
+
+    Args:
+        data: 2-D NDVI array (0-255)
+        labels: Zone label grid from rasterize_zones (0 = outside every district)
+        transform: Affine transform of the grid
+        crs: CRS of the grid (areas are in km2, geographic CRSs are scaled by latitude)
+        threshold: NDVI (0-1) below which a pixel is part of a patch
+        nodata: Pixel value to ignore
+        min_pixels: Drop patches smaller than this
+
+    Returns:
+        DataFrame with zone (1-based district label) and HOTSPOT_COLUMNS, one row per patch
+    """
+    low = (labels > 0) & (data < threshold * NDVI_SCALE)
+    if nodata is not None:
+        low &= data != nodata
+
+    patch_ids = np.zeros(data.shape, dtype=np.int32)
+    zones = []
+    for zone, box in enumerate(ndimage.find_objects(labels), start=1):
+        if box is None:
+            continue
+        mask = low[box] & (labels[box] == zone)
+        sub_ids, n = ndimage.label(mask, structure=CONNECTIVITY)
+        if n:
+            patch_ids[box][mask] = sub_ids[mask] + len(zones)
+            zones.extend([zone] * n)
+    n_patches = len(zones)
+    if n_patches == 0:
+        return pd.DataFrame(columns=["zone"] + HOTSPOT_COLUMNS)
+
+    rows, cols = np.nonzero(patch_ids)
+    ids = patch_ids[rows, cols]
+    values = data[rows, cols].astype(np.float64)
+    size = n_patches + 1
+    pixels = np.bincount(ids, minlength=size)[1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centre_col = np.bincount(ids, weights=cols, minlength=size)[1:] / pixels + 0.5
+        centre_row = np.bincount(ids, weights=rows, minlength=size)[1:] / pixels + 0.5
+        mean_value = np.bincount(ids, weights=values, minlength=size)[1:] / pixels
+    min_value = np.full(size, np.inf)
+    np.minimum.at(min_value, ids, values)
+    area = np.bincount(ids, weights=_pixel_area_km2(transform, crs, data.shape[0])[rows], minlength=size)[1:]
+
+    # === Pixel bounding box of every patch ===
+    row_min = np.full(size, data.shape[0])
+    np.minimum.at(row_min, ids, rows)
+    row_max = np.zeros(size, dtype=np.intp)
+    np.maximum.at(row_max, ids, rows)
+    col_min = np.full(size, data.shape[1])
+    np.minimum.at(col_min, ids, cols)
+    col_max = np.zeros(size, dtype=np.intp)
+    np.maximum.at(col_max, ids, cols)
+    x0, y0 = transform * (col_min[1:], row_min[1:])
+    x1, y1 = transform * (col_max[1:] + 1, row_max[1:] + 1)
+    centroid_x, centroid_y = transform * (centre_col, centre_row)
+
+    df = pd.DataFrame({
+        "zone": np.array(zones, dtype=np.int32),
+        "pixels": pixels,
+        "area_km2": area,
+        "centroid_x": centroid_x,
+        "centroid_y": centroid_y,
+        "minx": np.minimum(x0, x1),
+        "miny": np.minimum(y0, y1),
+        "maxx": np.maximum(x0, x1),
+        "maxy": np.maximum(y0, y1),
+        "mean_ndvi": mean_value / NDVI_SCALE,
+        "min_ndvi": min_value[1:] / NDVI_SCALE,
+    })
+    return df[df["pixels"] >= min_pixels].reset_index(drop=True)
+
+
+def raster_hotspots(path, geometries, geom_key=None, threshold=DEFAULT_STRESS_THRESHOLD, min_pixels=1, stack=None):
+    """
+    find_hotspots() over the window of one raster that covers the districts
+
+    The pixels come from the NDVI stack when it holds the current version of the raster and
+    was clipped to bounds covering the districts.
+    """
+    bounds = tuple(shapely.total_bounds(geometries))
+    layer = stack.layer(path, bounds) if stack is not None else None
+    with span("hotspots.raster", file=os.path.basename(path), stack=layer is not None) as trace:
+        if layer is not None:
+            window = bounds_window(stack, bounds)
+            if window is None:
+                return find_hotspots(np.zeros((0, 0), np.uint8), np.zeros((0, 0), np.uint16), stack.transform)
+            transform, crs, nodata = stack.window_transform(window), stack.crs, stack.layer_nodata(layer)
+            data = stack.read(layer, window)
+        else:
+            with rasterio.open(path) as src:
+                window = bounds_window(src, bounds)
+                if window is None:
+                    return find_hotspots(np.zeros((0, 0), np.uint8), np.zeros((0, 0), np.uint16), src.transform)
+                transform, crs, nodata = src.window_transform(window), src.crs, src.nodata
+                data = src.read(1, window=window)
+        labels = rasterize_zones(geometries, transform, data.shape, crs=crs, geom_key=geom_key)
+        patches = find_hotspots(data, labels, transform, crs, threshold, nodata, min_pixels)
+        trace.set(pixels=data.size, rows=len(patches))
+    return patches
+
+
+def hotspot_table(gdf, ndvi_folder, threshold=DEFAULT_STRESS_THRESHOLD, min_pixels=1, stack_dir=None):
+    """
+    Low-NDVI patches of every raster in a folder
+
+    Args:
+        gdf: District GeoDataFrame with dtname (and optionally state) columns
+        ndvi_folder: Folder with NDVI_<month>_<year>_<range>.tif files
+        threshold: NDVI (0-1) below which a pixel is part of a patch
+        min_pixels: Drop patches smaller than this
+        stack_dir: NDVI stack to read the rasters it holds from (see ndvi_stack.py)
+
+    Returns:
+        DataFrame with (state,) district, month, fortnight, year and HOTSPOT_COLUMNS
+    """
+    geometries = list(gdf.geometry)
+    geom_key = geometry_key(geometries)
+    stack = NdviStack(stack_dir) if is_ndvi_stack(stack_dir) else None
+    district = pd.Categorical(gdf["dtname"].str.strip().str.lower().to_numpy())
+    key_columns = (["state"] if "state" in gdf.columns else []) + ["district"]
+
+    frames = []
+    for path, (month, year, fortnight) in ndvi_rasters(ndvi_folder):
+        patches = raster_hotspots(path, geometries, geom_key, threshold, min_pixels, stack)
+        zone = patches.pop("zone").to_numpy(dtype=np.intp) - 1
+        keys = {"district": district[zone]}
+        if "state" in gdf.columns:
+            keys["state"] = gdf["state"].to_numpy()[zone]
+        frames.append(pd.DataFrame({
+            **{c: keys[c] for c in key_columns},
+            "month": np.int8(month), "fortnight": np.int8(fortnight), "year": np.int16(year),
+            **{c: patches[c].to_numpy() for c in HOTSPOT_COLUMNS},
+        }, index=patches.index))
+    if not frames:
+        return pd.DataFrame(columns=key_columns + ["month", "fortnight", "year"] + HOTSPOT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+class HotspotIndex:
+    """
+    STRtree over the bounding boxes of a hotspot table for point and bounding-box queries
+
+    Args:
+        hotspots: hotspot_table() output, or the path of its Parquet file
+    """
+
+    def __init__(self, hotspots):
+        self.table = pd.read_parquet(hotspots) if isinstance(hotspots, str) else hotspots.reset_index(drop=True)
+        self.boxes = shapely.box(self.table["minx"], self.table["miny"], self.table["maxx"], self.table["maxy"])
+        self.tree = shapely.STRtree(self.boxes)
+
+    def _rows(self, geometry, year=None, month=None):
+        rows = self.table.iloc[np.sort(self.tree.query(geometry, predicate="intersects"))]
+        if year is not None:
+            rows = rows[rows["year"] == year]
+        if month is not None:
+            rows = rows[rows["month"] == month]
+        return rows
+
+    def at_point(self, x, y, year=None, month=None):
+        """Patches whose bounding box contains the point, optionally of one year / month"""
+        return self._rows(shapely.Point(x, y), year, month)
+
+    def in_bbox(self, minx, miny, maxx, maxy, year=None, month=None):
+        """Patches whose bounding box intersects the box, optionally of one year / month"""
+        return self._rows(shapely.box(minx, miny, maxx, maxy), year, month)
+
+
+def main(argv=None, prog=None):
+    # === Imported here: ingest is only needed to resolve the state registry ===
+    from ingest import STATE_REGISTRY, load_state_districts
+
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Extract connected low-NDVI patches (hotspots) inside every district')
+    parser.add_argument('--states', nargs='+', default=list(STATE_REGISTRY), choices=list(STATE_REGISTRY), help='State codes to search')
+    parser.add_argument('--ndvi', type=str, default=cfg.ndvi_folder, help='Path to folder with NDVI files')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_STRESS_THRESHOLD, help='NDVI below which a pixel is part of a hotspot')
+    parser.add_argument('--min_pixels', type=int, default=4, help='Drop patches smaller than this many pixels')
+    parser.add_argument('--output', type=str, default=cfg.hotspots_file, help='Parquet file of the hotspot table')
+    parser.add_argument('--stack_dir', type=str, default=cfg.ndvi_stack_folder, help='Memory-mapped NDVI stack built by ndvi_stack.py (used when present)')
+    parser.add_argument('--geometry_cache', type=str, default=cfg.geometry_cache_folder, help='Folder of the prepared district geometry cache')
+    args = parser.parse_args(argv)
+
+    districts = load_state_districts([STATE_REGISTRY[code] for code in args.states], args.geometry_cache)
+    table = hotspot_table(districts, args.ndvi, args.threshold, args.min_pixels, args.stack_dir)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    table.to_parquet(args.output, index=False)
+    print(f"{len(table)} hotspots written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import os
+from dataclasses import dataclass, field, replace
+import geopandas as gpd
+import pandas as pd
+from analysis_store import write_analysis_store
+from config import Configuration
+from district_geometry import load_districts
+from climate_data import load_climate_table, normalize_districts, rename_districts
+from climate_monthly import add_temperature_indices, monthly_temperature, stream_monthly, temperature_aggregations
+from instrumentation import enable, print_summary, span, trace_path
+from ndvi import DEFAULT_STATS, DEFAULT_STRESS_THRESHOLD, process_ndvi_folder
+from ndvi_cube import update_ndvi_cube
+from seasons import crops_column, season_of
+
+
+@dataclass
+class StateSpec:
+    """Everything that differs between the states' ingestion runs"""
+    code: str
+    name: str
+    shape_file: str
+    rain_csv: str
+    temp_csv: str
+    output_folder: str
+    district_rename_map: dict = field(default_factory=dict)
+    crops: dict = field(default_factory=dict)
+
+
+_cfg = Configuration()
+
+# === State registry: adding a state is one more entry here ===
+STATE_REGISTRY = {
+    "MH": StateSpec(
+        code="MH",
+        name="Maharashtra",
+        shape_file=_cfg.district_shp_file_mh,
+        rain_csv=_cfg.rain_df_mh,
+        temp_csv=_cfg.temp_df_mh,
+        output_folder=_cfg.output_folder_mh,
+        # === The following are the names mismatch between the csv files and the geojson file ===
+        district_rename_map={
+            "BEED": "BID",
+            "BULDHANA": "BULDANA",
+            "NASIK": "NASHIK",
+            "AHMEDNAGAR": "AHMADNAGAR",
+            "RAIGAD": "RAIGARH",
+            "GARHCHIROLI": "GADCHIROLI",
+            "GONDIA": "GONDIYA"
+        },
+        crops={
+            "Kharif": ["CO", "SB"],
+            "Rabi": ["WH", "GM"]
+        }
+    ),
+    "MP": StateSpec(
+        code="MP",
+        name="Madhya Pradesh",
+        shape_file=_cfg.district_shp_file_mp,
+        rain_csv=_cfg.rain_df_mp,
+        temp_csv=_cfg.temp_df_mp,
+        output_folder=_cfg.output_folder_mp,
+        district_rename_map={
+            "NARSINGPUR": "NARSIMHAPUR"
+        },
+        crops={
+            "Kharif": ["PA", "SB"],
+            "Rabi": ["WH", "GM"]
+        }
+    ),
+}
+
+
+def load_state_districts(states, geometry_cache=None):
+    """
+    Union GeoDataFrame of the districts of all requested states, with a "state" column (state code)
+
+    Args:
+        geometry_cache: Folder of the prepared district geometry cache (None = read the GeoJSON files)
+    """
+    frames = []
+    for spec in states:
+        with span("ingest.load_districts", state=spec.code) as trace:
+            gdf = load_districts(spec.shape_file, "exact", geometry_cache)
+            gdf["state"] = spec.code
+            frames.append(gdf[["dtname", "state", "geometry"]])
+            trace.set(rows=len(gdf))
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+
+
+def state_climate_monthly(spec, parquet_dir=None, streaming=False, degree_day_base=None, heat_threshold=None):
+    """
+    Monthly temperature and rainfall tables of one state, keyed on normalized district names
+
+    Args:
+        streaming: Aggregate the daily tables chunk by chunk (memory proportional to the
+            number of district-months instead of the number of daily rows)
+        degree_day_base: Add monthly degree days above this base temperature (deg C)
+        heat_threshold: Add the monthly count of days with a maximum at or above this temperature (deg C)
+    """
+    if streaming:
+        return _stream_state_climate_monthly(spec, parquet_dir, degree_day_base, heat_threshold)
+
+    # === Load Climate Data (Provided from case study), from the Parquet copy when it is up to date ===
+    with span("climate.load", state=spec.code, table="precipitation") as trace:
+        rain_df = load_climate_table(spec.rain_csv, os.path.join(parquet_dir, "precipitation") if parquet_dir else None, spec.code)
+        trace.set(rows=len(rain_df))
+    with span("climate.load", state=spec.code, table="temperature") as trace:
+        temp_df = load_climate_table(spec.temp_csv, os.path.join(parquet_dir, "temperature") if parquet_dir else None, spec.code)
+        trace.set(rows=len(temp_df))
+
+    with span("climate.monthly", state=spec.code):
+        # === Replace the names in csv files with names from geojson file, then standardize (they are capital in GIS file and small in csv files) ===
+        for df in [rain_df, temp_df]:
+            df["district"] = normalize_districts(rename_districts(df["District"], spec.district_rename_map))
+            df["season"] = season_of(df["month"])
+
+        temp_monthly = monthly_temperature(temp_df, ["district", "season", "month", "year"], degree_day_base, heat_threshold)
+        rainfall_monthly = rain_df.groupby(["district", "season", "month", "year"], observed=True).agg(rainfall_mm=("rainfall_mm", "mean")).reset_index()
+    return temp_monthly, rainfall_monthly
+
+
+def _stream_state_climate_monthly(spec, parquet_dir=None, degree_day_base=None, heat_threshold=None):
+    def prepare(chunk):
+        chunk["District"] = normalize_districts(rename_districts(chunk["District"], spec.district_rename_map))
+        if "mean" in chunk:
+            chunk = add_temperature_indices(chunk, degree_day_base, heat_threshold)
+        return chunk
+
+    tables = {}
+    for table, csv_path, aggregations in [
+        ("precipitation", spec.rain_csv, {"rainfall_mm": ("rainfall_mm", "mean")}),
+        ("temperature", spec.temp_csv, temperature_aggregations(degree_day_base, heat_threshold)),
+    ]:
+        with span("climate.stream", state=spec.code, table=table) as trace:
+            dataset_dir = os.path.join(parquet_dir, table) if parquet_dir else None
+            monthly = stream_monthly(csv_path, aggregations, dataset_dir, spec.code, prepare=prepare)
+            monthly = monthly.rename(columns={"District": "district"})
+            monthly.insert(1, "season", season_of(monthly["month"]))
+            tables[table] = monthly[["district", "season", "month", "year", *aggregations]]
+            trace.set(rows=len(monthly))
+    return tables["temperature"], tables["precipitation"]
+
+
+def build_state_table(spec, ndvi_df, parquet_dir=None, climate=None):
+    """
+    Merge one state's NDVI rows with its monthly climate data into the analysis table
+
+    Args:
+        climate: Precomputed state_climate_monthly() result; loaded here when None
+    """
+    temp_monthly, rainfall_monthly = state_climate_monthly(spec, parquet_dir) if climate is None else climate
+
+    with span("ingest.merge", state=spec.code) as trace:
+        ndvi_df = ndvi_df.copy()
+        ndvi_df["district"] = normalize_districts(ndvi_df["district"])
+        ndvi_df["season"] = season_of(ndvi_df["month"])
+
+        # === Calculate monthly mean NDVI (and any further NDVI statistic, averaged over the month's rasters) for each district ===
+        ndvi_columns = [c for c in ndvi_df.columns if c not in ("district", "season", "month", "year")]
+        ndvi_monthly = ndvi_df.groupby(["district", "season", "month", "year"], observed=True)[ndvi_columns].mean().reset_index()
+
+        # === Merge the dataframes on common keys ===
+        merged = pd.merge(ndvi_monthly, temp_monthly, on=["district", "season", "month", "year"], how="left")
+        merged = pd.merge(merged, rainfall_monthly, on=["district", "season", "month", "year"], how="left")
+        merged = merged.rename(columns={"rainfall_mm": "mean_rainfall(mm)"})
+
+        merged["state"] = spec.name
+        merged["crops"] = crops_column(merged["season"], spec.crops)
+        trace.set(rows=len(merged))
+    return merged
+
+
+def write_yearly_csvs(merged, output_folder):
+    # === Save separate CSVs for each year ===
+    os.makedirs(output_folder, exist_ok=True)
+
+    with span("ingest.write_csv", folder=output_folder) as trace:
+        for year, yearly_df in merged.groupby("year", sort=True, observed=True):
+            yearly_df.to_csv(f"{output_folder}/climate_{year}.csv", index=False)
+        trace.set(rows=len(merged))
+
+
+def ingest_states(states, ndvi, workers=1, cache_dir=None, parquet_dir=None, streaming=False,
+                  degree_day_base=None, heat_threshold=None, store_dir=Configuration.analysis_store, write_csv=False, geometry_cache=None,
+                  ndvi_stats=DEFAULT_STATS, stress_threshold=DEFAULT_STRESS_THRESHOLD, cube_dir=Configuration.ndvi_cube_folder,
+                  stack_dir=None):
+    """
+    Ingest any set of states with a single pass over the NDVI rasters
+
+    Every raster is decoded once and reduced against the union of all requested states'
+    districts; the per-state climate merge and CSV output then run on that one result.
+
+    Args:
+        states: List of StateSpec (see STATE_REGISTRY)
+        ndvi: Folder with NDVI_<month>_<year>_<range>.tif files
+        workers: Number of processes used to reduce NDVI rasters
+        cache_dir: Folder of the per-raster NDVI result cache (None disables it)
+        parquet_dir: Folder of the Parquet copy of the climate CSVs (None = read the CSVs)
+        streaming: Aggregate the daily climate tables chunk by chunk instead of loading them whole
+        degree_day_base: Add a monthly degree_days column above this base temperature (deg C)
+        heat_threshold: Add a monthly heat_stress_days column (days with a maximum at or above this, deg C)
+        store_dir: Analysis store (Parquet partitioned by state/year) to write the output to (None = not written)
+        write_csv: Also write the per-year climate_<year>.csv files to each state's output folder
+        geometry_cache: Folder of the prepared district geometry cache (None = read the GeoJSON files)
+        ndvi_stats: NDVI statistics computed in the single pass over each raster (mean, median,
+            std, p<NN>, valid_fraction, stress_share); each one becomes an output column
+        stress_threshold: NDVI (0-1) below which a pixel counts towards stress_share
+        cube_dir: Folder of the fortnight-resolution NDVI cube; the ingested states replace their
+            own districts, other states are kept (see ndvi_cube; None = not written)
+        stack_dir: Memory-mapped NDVI stack (see ndvi_stack.py) to read the rasters it holds from
+    """
+    districts_gdf = load_state_districts(states, geometry_cache)
+
+    # === Process NDVI Files (each raster is reduced to one mean per district, optionally in parallel) ===
+    ndvi_df = process_ndvi_folder(
+        districts_gdf, ndvi, workers=workers, cache_dir=cache_dir, extra_columns=["state"],
+        stats=ndvi_stats, stress_threshold=stress_threshold, fortnight=cube_dir is not None,
+        stack_dir=stack_dir
+    )
+    if cube_dir is not None:
+        with span("ingest.write_cube", folder=cube_dir) as trace:
+            update_ndvi_cube(ndvi_df, cube_dir)
+            trace.set(rows=len(ndvi_df))
+        ndvi_df = ndvi_df.drop(columns=["fortnight"])
+
+    for spec in states:
+        state_ndvi = ndvi_df[ndvi_df["state"] == spec.code].drop(columns=["state"])
+        climate = state_climate_monthly(spec, parquet_dir, streaming, degree_day_base, heat_threshold)
+        merged = build_state_table(spec, state_ndvi, climate=climate)
+        if store_dir is not None:
+            with span("ingest.write_store", state=spec.code) as trace:
+                write_analysis_store(merged, store_dir, spec.code)
+                trace.set(rows=len(merged))
+        if write_csv:
+            write_yearly_csvs(merged, spec.output_folder)
+
+
+def state_with_paths(code, shp_file=None, rain_df=None, temp_df=None, output=None):
+    """Registry entry of a state with individual paths overridden"""
+    spec = STATE_REGISTRY[code]
+    overrides = {"shape_file": shp_file, "rain_csv": rain_df, "temp_csv": temp_df, "output_folder": output}
+    return replace(spec, **{k: v for k, v in overrides.items() if v is not None})
+
+
+def main(argv=None, prog=None):
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Data ingestion pipeline for one or more states in one pass over the NDVI rasters')
+    parser.add_argument('--states', nargs='+', default=list(STATE_REGISTRY), choices=list(STATE_REGISTRY), help='State codes to ingest')
+    parser.add_argument('--ndvi', type=str, default=cfg.ndvi_folder, help='Path to folder with NDVI files')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used to reduce NDVI rasters')
+    parser.add_argument('--cache_dir', type=str, default=cfg.ndvi_cache_folder, help='Folder of the per-raster NDVI result cache')
+    parser.add_argument('--no_cache', action='store_true', help='Reprocess every NDVI raster and do not touch the cache')
+    parser.add_argument('--parquet_dir', type=str, default=cfg.climate_parquet_folder, help='Folder of the Parquet copy of the climate CSVs (used when up to date)')
+    parser.add_argument('--streaming', action='store_true', help='Aggregate the daily climate tables chunk by chunk (low memory)')
+    parser.add_argument('--degree_day_base', type=float, default=None, help='Add monthly degree days above this base temperature (deg C)')
+    parser.add_argument('--heat_threshold', type=float, default=None, help='Add the monthly count of days with a maximum at or above this temperature (deg C)')
+    parser.add_argument('--store_dir', type=str, default=cfg.analysis_store, help='Analysis store (Parquet partitioned by state/year) read by the plots and maps')
+    parser.add_argument('--csv', action='store_true', help="Also write per-year CSV files to each state's output folder")
+    parser.add_argument('--geometry_cache', type=str, default=cfg.geometry_cache_folder, help='Folder of the prepared district geometry cache')
+    parser.add_argument('--ndvi_stats', nargs='+', default=list(DEFAULT_STATS), help='NDVI statistics per district: mean median std p<NN> valid_fraction stress_share')
+    parser.add_argument('--stress_threshold', type=float, default=DEFAULT_STRESS_THRESHOLD, help='NDVI below which a pixel counts towards stress_share')
+    parser.add_argument('--cube_dir', type=str, default=cfg.ndvi_cube_folder, help='Folder of the fortnight-resolution NDVI cube (see ndvi_cube.py)')
+    parser.add_argument('--no_cube', action='store_true', help='Do not write the NDVI cube')
+    parser.add_argument('--stack_dir', type=str, default=cfg.ndvi_stack_folder, help='Memory-mapped NDVI stack built by ndvi_stack.py (used when present)')
+    parser.add_argument('--trace', type=str, default=None, help='Write a JSON-lines timing/memory trace here and print a per-stage summary (or set AGRI_TRACE)')
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        enable(args.trace)
+    ingest_states(
+        [STATE_REGISTRY[code] for code in args.states], ndvi=args.ndvi, workers=args.workers,
+        cache_dir=None if args.no_cache else args.cache_dir, parquet_dir=args.parquet_dir,
+        streaming=args.streaming, degree_day_base=args.degree_day_base, heat_threshold=args.heat_threshold,
+        store_dir=args.store_dir, write_csv=args.csv, geometry_cache=args.geometry_cache,
+        ndvi_stats=args.ndvi_stats, stress_threshold=args.stress_threshold,
+        cube_dir=None if args.no_cube else args.cube_dir, stack_dir=args.stack_dir
+    )
+    if trace_path():
+        print_summary(trace_path())
+
+
+if __name__ == "__main__":
+    main()
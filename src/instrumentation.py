@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import uuid
+
+# === Set AGRI_TRACE=<file.jsonl> (or pass --trace) to record spans; unset means tracing is off ===
+TRACE_ENV = "AGRI_TRACE"
+# === Id of the current run, inherited by worker processes so their spans count towards it ===
+TRACE_RUN_ENV = "AGRI_TRACE_RUN"
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    # === ru_maxrss is in KiB on Linux and in bytes on macOS ===
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+class _NullSpan:
+    """Shared do-nothing span returned while tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, fields):
+        self.tracer = tracer
+        self.fields = {"name": name, **fields}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.fields["start"] = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fields["seconds"] = time.perf_counter() - self.start
+        self.fields["max_rss_mb"] = round(max_rss_mb(), 1)
+        self.fields["pid"] = os.getpid()
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.tracer.emit(self.fields)
+        return False
+
+    def set(self, **fields):
+        """Attach measurements (bytes decoded, pixel counts, ...) to the span"""
+        self.fields.update(fields)
+
+
+class Tracer:
+    """
+    Appends one JSON line per finished span; safe to share between threads and forked workers
+
+    Every line carries the run id, so a trace file reused by several runs is summarized per run.
+    """
+
+    def __init__(self, path, run):
+        self.path = path
+        self.run = run
+        self.lock = threading.Lock()
+
+    def emit(self, fields):
+        line = json.dumps({**fields, "run": self.run}, default=str) + "\n"
+        with self.lock:
+            # === O_APPEND single writes keep lines from several processes intact ===
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+def _start_run(run=None):
+    """Set (and export to worker processes) the id of the current run"""
+    os.environ[TRACE_RUN_ENV] = run or uuid.uuid4().hex[:12]
+    return os.environ[TRACE_RUN_ENV]
+
+
+_tracer = Tracer(os.environ[TRACE_ENV], _start_run(os.environ.get(TRACE_RUN_ENV))) if os.environ.get(TRACE_ENV) else None
+
+
+def enable(path):
+    """Turn tracing on, as a new run, for this process and every worker process started after this call"""
+    global _tracer
+    os.environ[TRACE_ENV] = path
+    _tracer = Tracer(path, _start_run())
+
+
+def trace_path():
+    """Path of the active trace file, or None while tracing is off"""
+    return _tracer.path if _tracer is not None else None
+
+
+def span(name, **fields):
+    """
+    Context manager timing a named pipeline stage
+
+    Example:
+        with span("climate.load_csv", state="MH") as s:
+            ...
+            s.set(rows=len(df))
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, fields)
+
+
+def read_trace(path, run=None):
+    """Spans of a JSON-lines trace, optionally only those of one run"""
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return events if run is None else [event for event in events if event.get("run") == run]
+
+
+def summarize(events):
+    """Per span name: count, total/mean/max seconds, max RSS and summed numeric measurements"""
+    summary = {}
+    for event in events:
+        row = summary.setdefault(event["name"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "max_rss_mb": 0.0})
+        row["count"] += 1
+        row["seconds"] += event.get("seconds", 0.0)
+        row["max_seconds"] = max(row["max_seconds"], event.get("seconds", 0.0))
+        row["max_rss_mb"] = max(row["max_rss_mb"], event.get("max_rss_mb", 0.0))
+        for key in ("bytes_decoded", "pixels", "valid_pixels", "rows"):
+            if key in event:
+                row[key] = row.get(key, 0) + event[key]
+    return summary
+
+
+def print_summary(path, run=None):
+    """
+    Print the summary table of a JSON-lines trace
+
+    Args:
+        run: Only summarize this run (default: the active run when path is the active trace)
+    """
+    if run is None and _tracer is not None and _tracer.path == path:
+        run = _tracer.run
+    summary = summarize(read_trace(path, run))
+    print(f"\n{'stage':<28} {'count':>6} {'total s':>9} {'mean s':>8} {'max s':>8} {'max RSS MB':>11} {'MB decoded':>10} {'Mpixels':>8}")
+    for name, row in summary.items():
+        mb_decoded = f"{row['bytes_decoded'] / 2**20:10.1f}" if "bytes_decoded" in row else f"{'':10}"
+        mpixels = f"{row['pixels'] / 1e6:8.1f}" if "pixels" in row else f"{'':8}"
+        print(f"{name:<28} {row['count']:>6} {row['seconds']:>9.3f} {row['seconds'] / row['count']:>8.3f} "
+              f"{row['max_seconds']:>8.3f} {row['max_rss_mb']:>11.1f} {mb_decoded} {mpixels}")
+    print(f"Trace written to {path}")
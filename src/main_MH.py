@@ -1,146 +1,53 @@
-import geopandas as gpd
-import pandas as pd
-import numpy as np
-import rasterio
-# import rasterstats
-from rasterstats import zonal_stats
-import os
-from datetime import datetime
-from tqdm import tqdm
 import argparse
 from config import Configuration
+from ingest import ingest_states, state_with_paths
+from ndvi import DEFAULT_STATS, DEFAULT_STRESS_THRESHOLD
+from instrumentation import enable, print_summary, trace_path
 
 
-# === Crop Mapping ===
-crop_map = {
-    "Maharashtra": {
-        "Kharif": ["CO", "SB"],
-        "Rabi": ["WH", "GM"]
-    }
-}
+def mh_data_ingestion(shp_file, rain_df, temp_df, ndvi, output, workers=1, cache_dir=None, parquet_dir=None, streaming=False,
+                      degree_day_base=None, heat_threshold=None, store_dir=Configuration.analysis_store, write_csv=False,
+                      geometry_cache=None, ndvi_stats=DEFAULT_STATS, stress_threshold=DEFAULT_STRESS_THRESHOLD, cube_dir=None, stack_dir=None):
+    # === Maharashtra run of the state-agnostic engine (see ingest.py, which can also ingest MH and MP in one pass) ===
+    state = state_with_paths("MH", shp_file=shp_file, rain_df=rain_df, temp_df=temp_df, output=output)
+    ingest_states([state], ndvi, workers=workers, cache_dir=cache_dir, parquet_dir=parquet_dir, streaming=streaming,
+                  degree_day_base=degree_day_base, heat_threshold=heat_threshold, store_dir=store_dir, write_csv=write_csv,
+                  geometry_cache=geometry_cache, ndvi_stats=ndvi_stats, stress_threshold=stress_threshold, cube_dir=cube_dir, stack_dir=stack_dir)
 
-# === Seasonal Mapping for Maharashtra ===
-def get_season(month):
-    if month in [6, 7, 8, 9, 10]:
-        return "Kharif"
-    elif month in [11, 12, 1, 2, 3, 4]:
-        return "Rabi"
-    else:
-        return "Other"
 
-def assign_crops(state, season):
-    return crop_map.get(state, {}).get(season, [])
-
-def mh_data_ingestion(shp_file, rain_df, temp_df, ndvi, output):
-
-    # === Load District geojson file of Maharashtra ===
-    maha_gdf = gpd.read_file(shp_file)
-
-    # === Load Climate Data (Provided from case study) ===
-    rain_df = pd.read_csv(rain_df, parse_dates=["date"])
-    temp_df = pd.read_csv(temp_df, parse_dates=["date"])
-
-    # === The following are the names mismatch between the csv files and the geojson file ===
-    district_rename_map = {
-        "BEED": "BID",
-        "BULDHANA": "BULDANA",
-        "NASIK": "NASHIK",
-        "AHMEDNAGAR": "AHMADNAGAR",
-        "RAIGAD": "RAIGARH",
-        "GARHCHIROLI": "GADCHIROLI",
-        "GONDIA": "GONDIYA"
-    }
-
-    # === Replace the names in csv files with names from geojson file ===
-    rain_df["District"] = rain_df["District"].replace(district_rename_map)
-    temp_df["District"] = temp_df["District"].replace(district_rename_map)
-
-    # === Creating new columns to support findings ===
-    for df in [rain_df, temp_df]:
-        df["month"] = df["date"].dt.month
-        df["season"] = df["month"].apply(get_season)
-        df["year"] = df["date"].dt.year
-
-    # === Process NDVI Files ===
-    # ndvi_folder = "test_tif"
-    ndvi_folder = ndvi
-    ndvi_stats_list = []
-
-    # === Looping through NDVI files and extracting data ===
-    for file in tqdm(os.listdir(ndvi_folder), desc="Processing NDVI files"):
-        if file.endswith(".tif"):
-            try:
-                parts = file.split("_")
-                month = parts[1].lower()[:3]
-                year = int(parts[2])
-                month_num = datetime.strptime(month, "%b").month
-                season = get_season(month_num)
-            except:
-                continue
-
-            ndvi_path = os.path.join(ndvi_folder, file)
-            with rasterio.open(ndvi_path) as src:
-                ndvi_data = src.read(1).astype("float32")
-                ndvi_data[ndvi_data == src.nodata] = np.nan
-                ndvi_data = (ndvi_data / 255.0)
-
-                stats = zonal_stats(
-                    maha_gdf, ndvi_data, affine=src.transform,
-                    stats=["mean"], geojson_out=True
-                )
-
-                for feature, stat in zip(maha_gdf.iterrows(), stats):
-                    district_name = feature[1]["dtname"]
-                    ndvi_stats_list.append({
-                        "district": district_name,
-                        "season": season,
-                        "month": month_num,
-                        "year": year,
-                        "mean_ndvi": stat["properties"]["mean"]
-                    })
-
-    ndvi_df = pd.DataFrame(ndvi_stats_list)
-
-    # === Standardize district names across all DataFrames (they are capital in GIS file and small in csv files) ===
-    ndvi_df["district"] = ndvi_df["district"].str.strip().str.lower()
-    temp_df["district"] = temp_df["District"].str.strip().str.lower()
-    rain_df["district"] = rain_df["District"].str.strip().str.lower()
-
-    # === Calculate monthly mean NDVI for each district and get mean temp and rainfall_mm values===
-    ndvi_monthly = ndvi_df.groupby(["district", "season", "month", "year"]).agg(mean_ndvi=("mean_ndvi", "mean")).reset_index()
-    temp_monthly = temp_df.groupby(["district", "season", "month", "year", "min", "max"]).agg(mean_temp=("mean", "mean")).reset_index()
-    rainfall_monthly = rain_df.groupby(["district", "season", "month", "year"]).agg(rainfall_mm=("rainfall_mm", "mean")).reset_index()
-
-    # === Merge the dataframes on common keys ===
-    merged = pd.merge(ndvi_monthly, temp_monthly, on=["district", "season", "month", "year"], how="left")
-    merged = pd.merge(merged, rainfall_monthly, on=["district", "season", "month", "year"], how="left")
-    merged = merged.rename(columns={"min": "min_temp", "max": "max_temp", "rainfall_mm": "mean_rainfall(mm)"})
-
-    merged["state"] = "Maharashtra"
-    merged["crops"] = merged.apply(lambda row: assign_crops(row["state"], row["season"]), axis=1)
-
-    # === Save separate CSVs for each year ===
-    output_folder = output
-    os.makedirs(output_folder, exist_ok=True)
-
-    for year in merged["year"].unique():
-        yearly_df = merged[merged["year"] == year]
-        yearly_df.to_csv(f"{output_folder}/climate_{year}.csv", index=False)
-
-
-if __name__=="__main__":
+def main(argv=None, prog=None):
     cfg = Configuration()
 
-    parser = argparse.ArgumentParser(description='Data ingestion pipeline')
+    parser = argparse.ArgumentParser(prog=prog, description='Data ingestion pipeline')
     parser.add_argument('--shape_file', type=str, default=cfg.district_shp_file_mh, help='Path to district Shape file for the state')
     parser.add_argument('--rain_df', type=str, default=cfg.rain_df_mh, help='Path to rain csv file of state')
     parser.add_argument('--temp_df', type=str, default=cfg.temp_df_mh, help='Path to temperature csv file of state')
     parser.add_argument('--ndvi', type=str, default=cfg.ndvi_folder, help='Path to folder with NDVI files')
-    parser.add_argument('--output', type=str, default=cfg.output_folder_mh, help='Path of output folder to save csv files')
-    args = parser.parse_args()
-
-    mh_data_ingestion(shp_file=args.shape_file, rain_df=args.rain_df, temp_df=args.temp_df, ndvi=args.ndvi, output=args.output)
-
-# # === Save or visualize ===
-# climate_crop_df.to_csv("climate_crop_analysis_maharashtra.csv", index=False)
-# print(climate_crop_df.head())
+    parser.add_argument('--output', type=str, default=cfg.output_folder_mh, help='Path of output folder to save csv files (with --csv)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used to reduce NDVI rasters')
+    parser.add_argument('--cache_dir', type=str, default=cfg.ndvi_cache_folder, help='Folder of the per-raster NDVI result cache')
+    parser.add_argument('--no_cache', action='store_true', help='Reprocess every NDVI raster and do not touch the cache')
+    parser.add_argument('--parquet_dir', type=str, default=cfg.climate_parquet_folder, help='Folder of the Parquet copy of the climate CSVs (used when up to date)')
+    parser.add_argument('--streaming', action='store_true', help='Aggregate the daily climate tables chunk by chunk (low memory)')
+    parser.add_argument('--degree_day_base', type=float, default=None, help='Add monthly degree days above this base temperature (deg C)')
+    parser.add_argument('--heat_threshold', type=float, default=None, help='Add the monthly count of days with a maximum at or above this temperature (deg C)')
+    parser.add_argument('--store_dir', type=str, default=cfg.analysis_store, help='Analysis store (Parquet partitioned by state/year) read by the plots and maps')
+    parser.add_argument('--csv', action='store_true', help='Also write per-year CSV files to the output folder')
+    parser.add_argument('--geometry_cache', type=str, default=cfg.geometry_cache_folder, help='Folder of the prepared district geometry cache')
+    parser.add_argument('--ndvi_stats', nargs='+', default=list(DEFAULT_STATS), help='NDVI statistics per district: mean median std p<NN> valid_fraction stress_share')
+    parser.add_argument('--stress_threshold', type=float, default=DEFAULT_STRESS_THRESHOLD, help='NDVI below which a pixel counts towards stress_share')
+    parser.add_argument('--cube_dir', type=str, default=None, help='Write the fortnight-resolution NDVI cube of this state to this folder (see ndvi_cube.py)')
+    parser.add_argument('--stack_dir', type=str, default=cfg.ndvi_stack_folder, help='Memory-mapped NDVI stack built by ndvi_stack.py (used when present)')
+    parser.add_argument('--trace', type=str, default=None, help='Write a JSON-lines timing/memory trace here and print a per-stage summary (or set AGRI_TRACE)')
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        enable(args.trace)
+
+    mh_data_ingestion(shp_file=args.shape_file, rain_df=args.rain_df, temp_df=args.temp_df, ndvi=args.ndvi, output=args.output, workers=args.workers, cache_dir=None if args.no_cache else args.cache_dir, parquet_dir=args.parquet_dir, streaming=args.streaming, degree_day_base=args.degree_day_base, heat_threshold=args.heat_threshold, store_dir=args.store_dir, write_csv=args.csv, geometry_cache=args.geometry_cache, ndvi_stats=args.ndvi_stats, stress_threshold=args.stress_threshold, cube_dir=args.cube_dir, stack_dir=args.stack_dir)
+    if trace_path():
+        print_summary(trace_path())
+
+
+if __name__ == "__main__":
+    main()
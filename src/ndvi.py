@@ -0,0 +1,310 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import rasterio
+import shapely
+from tqdm import tqdm
+from instrumentation import span
+from ndvi_cache import NdviResultCache
+from ndvi_stack import NdviStack, is_ndvi_stack, write_ndvi_stack
+from raster_catalog import RasterCatalog, parse_ndvi_filename, parse_ndvi_period
+from raster_windows import bounds_window, iter_block_windows
+from zonal import ZonalAccumulator, geometry_key, rasterize_zones
+
+
+# === NDVI values are stored as 0-255 bytes in the OCM2 tiles ===
+NDVI_SCALE = 255.0
+# === Per-district statistics: mean, median, std, p<NN> (percentile), valid_fraction, stress_share ===
+DEFAULT_STATS = ("mean",)
+# === stress_share = share of valid pixels with NDVI (0-1) below this ===
+DEFAULT_STRESS_THRESHOLD = 0.2
+# === Pixels of a stack layer reduced at a time (about the size of a 256 x 256 GeoTIFF tile, cache friendly) ===
+STACK_BLOCK_PIXELS = 1 << 17
+
+
+def _percentile(stat):
+    """q of a "p<q>" statistic name (e.g. p10 -> 10.0), None for other names"""
+    if stat.startswith("p"):
+        try:
+            q = float(stat[1:])
+        except ValueError:
+            return None
+        return q if 0 <= q <= 100 else None
+    return None
+
+
+def validate_stats(stats):
+    for stat in stats:
+        if stat not in ("mean", "median", "std", "valid_fraction", "stress_share") and _percentile(stat) is None:
+            raise ValueError(f"Unknown NDVI statistic {stat!r}")
+    return tuple(stats)
+
+
+def stat_column(stat):
+    """Output column of a statistic: mean -> mean_ndvi, p90 -> p90_ndvi, valid_fraction / stress_share unchanged"""
+    return stat if stat in ("valid_fraction", "stress_share") else f"{stat}_ndvi"
+
+
+def district_ndvi_stats(path, geometries, geom_key=None, bounds=None, stats=DEFAULT_STATS, stress_threshold=DEFAULT_STRESS_THRESHOLD):
+    """
+    Several NDVI statistics of every district for one raster, all from a single read
+
+    Only the window covering the districts is read, block by block along the file's tiling;
+    nodata masking and the 0-255 scaling are folded into the reduction, so no full-size
+    float copy of the tile is ever made. Median and percentiles come from a 256-bin
+    per-district histogram (one bin per byte value, so they are exact).
+
+    Args:
+        path: Path of the NDVI GeoTIFF
+        geometries: List of district geometries
+        geom_key: Precomputed geometry_key(geometries)
+        bounds: Precomputed (minx, miny, maxx, maxy) of the geometries
+        stats: Statistic names (see DEFAULT_STATS)
+        stress_threshold: NDVI (0-1) below which a pixel counts towards stress_share
+
+    Returns:
+        float64 array of shape (len(stats), n_districts); NaN where a district has no valid pixels
+    """
+    if bounds is None:
+        bounds = tuple(shapely.total_bounds(geometries))
+
+    accumulator = _stats_accumulator(len(geometries), stats)
+    bytes_decoded, decode_s, reduce_s = 0, 0.0, 0.0
+    with span("ndvi.raster", file=os.path.basename(path)) as trace, rasterio.open(path) as src:
+        window = bounds_window(src, bounds)
+        if window is not None:
+            labels = rasterize_zones(
+                geometries, src.window_transform(window), (int(window.height), int(window.width)),
+                crs=src.crs, geom_key=geom_key
+            )
+            for block, row_off, col_off in iter_block_windows(src, window):
+                start = time.perf_counter()
+                data = src.read(1, window=block)
+                decoded = time.perf_counter()
+                block_labels = labels[row_off:row_off + data.shape[0], col_off:col_off + data.shape[1]]
+                accumulator.update(data, block_labels, nodata=src.nodata)
+                decode_s += decoded - start
+                reduce_s += time.perf_counter() - decoded
+                bytes_decoded += data.nbytes
+        result = accumulator.result()
+        trace.set(
+            bytes_decoded=bytes_decoded, pixels=bytes_decoded // np.dtype(src.dtypes[0]).itemsize,
+            valid_pixels=int(result["count"].sum()), decode_s=round(decode_s, 6), reduce_s=round(reduce_s, 6)
+        )
+
+    return _stats_rows(accumulator, result, stats, stress_threshold)
+
+
+def _stats_accumulator(n_districts, stats):
+    """ZonalAccumulator tracking just what the requested statistics need"""
+    needs_histogram = any(stat == "median" or stat == "stress_share" or _percentile(stat) is not None for stat in stats)
+    return ZonalAccumulator(
+        n_districts, extended=any(stat in ("std", "valid_fraction") for stat in stats),
+        histogram_bins=256 if needs_histogram else None, histogram_range=(0, 256)
+    )
+
+
+def _stats_rows(accumulator, result, stats, stress_threshold):
+    rows = []
+    for stat in stats:
+        if stat in ("mean", "std"):
+            rows.append(result[stat] / NDVI_SCALE)
+        elif stat == "valid_fraction":
+            rows.append(result["valid_fraction"])
+        elif stat == "stress_share":
+            rows.append(accumulator.share_below(stress_threshold * NDVI_SCALE))
+        else:
+            rows.append(accumulator.percentile(50.0 if stat == "median" else _percentile(stat)) / NDVI_SCALE)
+    return np.vstack(rows)
+
+
+def stack_ndvi_stats(stack, layer, geometries, geom_key=None, bounds=None, stats=DEFAULT_STATS,
+                     stress_threshold=DEFAULT_STRESS_THRESHOLD):
+    """
+    district_ndvi_stats() of one layer of an NdviStack
+
+    The pixels are a view of the memory-mapped stack, so nothing is decoded or copied, and
+    the label grid is rasterized once for all layers (same grid). On rasters that share the
+    stack's grid the result equals district_ndvi_stats() of the source file.
+    """
+    if bounds is None:
+        bounds = tuple(shapely.total_bounds(geometries))
+
+    accumulator = _stats_accumulator(len(geometries), stats)
+    with span("ndvi.stack", layer=layer) as trace:
+        window = bounds_window(stack, bounds)
+        if window is not None:
+            labels = rasterize_zones(
+                geometries, stack.window_transform(window), (int(window.height), int(window.width)),
+                crs=stack.crs, geom_key=geom_key
+            )
+            data = stack.read(layer, window)
+            # === Row blocks keep the reduction's temporary masks small and in cache ===
+            step = max(1, STACK_BLOCK_PIXELS // data.shape[1])
+            for row in range(0, data.shape[0], step):
+                accumulator.update(data[row:row + step], labels[row:row + step], nodata=stack.layer_nodata(layer))
+            trace.set(pixels=data.size)
+        result = accumulator.result()
+        trace.set(valid_pixels=int(result["count"].sum()))
+    return _stats_rows(accumulator, result, stats, stress_threshold)
+
+
+def district_ndvi_means(path, geometries, geom_key=None, bounds=None):
+    """
+    Mean NDVI (0-1) of every district for one raster, as a float64 array (NaN = no valid pixels)
+    """
+    return district_ndvi_stats(path, geometries, geom_key, bounds)[0]
+
+
+# === Per-process state: district geometries are shipped to each worker only once ===
+_worker_geometries = None
+_worker_geom_key = None
+_worker_bounds = None
+_worker_stats = DEFAULT_STATS
+_worker_stress_threshold = DEFAULT_STRESS_THRESHOLD
+_worker_stack = None
+
+
+def _init_worker(geometries, geom_key, bounds, stats=DEFAULT_STATS, stress_threshold=DEFAULT_STRESS_THRESHOLD, stack_dir=None):
+    global _worker_geometries, _worker_geom_key, _worker_bounds, _worker_stats, _worker_stress_threshold, _worker_stack
+    _worker_geometries = geometries
+    _worker_geom_key = geom_key
+    _worker_bounds = bounds
+    _worker_stats = stats
+    _worker_stress_threshold = stress_threshold
+    _worker_stack = NdviStack(stack_dir) if stack_dir is not None else None
+
+
+def _raster_stats(path, geometries, geom_key, bounds, stats, stress_threshold, stack=None):
+    """Statistics of one raster, from the NDVI stack when it holds the current version of the file and covers the districts"""
+    layer = stack.layer(path, bounds) if stack is not None else None
+    if layer is not None:
+        return stack_ndvi_stats(stack, layer, geometries, geom_key, bounds, stats, stress_threshold)
+    return district_ndvi_stats(path, geometries, geom_key, bounds, stats, stress_threshold)
+
+
+def _worker_stats_of(path):
+    return _raster_stats(
+        path, _worker_geometries, _worker_geom_key, _worker_bounds, _worker_stats, _worker_stress_threshold, _worker_stack
+    )
+
+
+def ndvi_rasters(ndvi_folder):
+    """(path, (month, year, fortnight)) of every NDVI raster in a folder, in file name order (see RasterCatalog.rasters)"""
+    return RasterCatalog.scan(ndvi_folder).rasters()
+
+
+def build_ndvi_stack(ndvi_folder, stack_dir, bounds):
+    """
+    Clip every NDVI raster of a folder to bounds and store them as an NdviStack in time order
+
+    Args:
+        ndvi_folder: Folder with NDVI_<month>_<year>_<range>.tif files
+        stack_dir: Folder of the stack
+        bounds: (minx, miny, maxx, maxy) to keep, e.g. the total bounds of the states' districts
+    """
+    rasters = sorted(ndvi_rasters(ndvi_folder), key=lambda r: (r[1][1], r[1][0], r[1][2], os.path.basename(r[0])))
+    with span("ndvi.build_stack", rasters=len(rasters)):
+        return write_ndvi_stack(rasters, stack_dir, bounds)
+
+
+def process_ndvi_folder(gdf, ndvi_folder, workers=1, cache_dir=None, extra_columns=(), stats=DEFAULT_STATS,
+                        stress_threshold=DEFAULT_STRESS_THRESHOLD, fortnight=False, stack_dir=None):
+    """
+    Reduce every NDVI raster in a folder to per-district statistics
+
+    Args:
+        gdf: District GeoDataFrame (must have a "dtname" column)
+        ndvi_folder: Folder with NDVI_<month>_<year>_<range>.tif files
+        workers: Number of processes; 1 runs serially in this process
+        cache_dir: Folder of the per-raster result cache; only rasters that are new or
+            changed since the last run are reduced (rasters are keyed by name and the
+            checksum of the raster catalog, see raster_catalog.py). None disables the cache.
+        extra_columns: Further gdf columns to carry into the result (e.g. "state")
+        stats: Statistics computed in the single pass over each raster (see DEFAULT_STATS)
+        stress_threshold: NDVI (0-1) below which a pixel counts towards stress_share
+        fortnight: Add a fortnight column (1 or 2, from the file's day range) after month
+        stack_dir: NDVI stack (see build_ndvi_stack); rasters it holds unchanged are reduced
+            from the memory-mapped stack instead of being decoded. Ignored when the folder
+            does not hold a stack or the stack was clipped to bounds that miss some districts.
+
+    Returns:
+        DataFrame with district, month, (fortnight,) year and one column per statistic (stat_column(),
+        e.g. mean_ndvi, p90_ndvi, stress_share), one row per district per file.
+        Files are processed in sorted order, so the result is identical for any worker count.
+    """
+    stats = validate_stats(stats)
+    catalog = RasterCatalog.scan(ndvi_folder)
+    for line in catalog.report():
+        print(f"NDVI catalog: {line}")
+    rasters = catalog.rasters()
+    files = [path for path, _ in rasters]
+    periods = [period for _, period in rasters]
+
+    geometries = list(gdf.geometry)
+    geom_key = geometry_key(geometries)
+    bounds = tuple(shapely.total_bounds(geometries))
+    n_districts = len(geometries)
+
+    stat_values = np.full((len(files), len(stats), n_districts), np.nan)
+
+    # === Reuse cached results, only new or changed rasters are reduced ===
+    # === (results of other statistic sets live in their own cache variant) ===
+    variant = None if stats == DEFAULT_STATS else f"{'|'.join(stats)}|{stress_threshold}"
+    stack = NdviStack(stack_dir) if is_ndvi_stack(stack_dir) else None
+    if stack is not None and not stack.covers(bounds):
+        print(f"NDVI stack {stack_dir} does not cover the districts, the rasters are read from their files")
+        stack = None
+    from_stack = [stack is not None and stack.layer(path, bounds) is not None for path in files]
+    caches = [None, None]
+    if cache_dir:
+        # === Results read from the stack are kept apart, keyed on its grid, so they never stand in for file reads ===
+        caches[0] = NdviResultCache(cache_dir, geom_key, variant=variant)
+        if stack is not None:
+            caches[1] = NdviResultCache(cache_dir, geom_key, variant=f"{variant or 'mean'}|stack {stack.key}")
+    pending = []
+    for i, path in enumerate(files):
+        cache = caches[from_stack[i]]
+        cached = cache.get(path, catalog.entry(path)["checksum"]) if cache is not None else None
+        if cached is not None and cached.size == len(stats) * n_districts:
+            stat_values[i] = cached.reshape(len(stats), n_districts)
+        else:
+            pending.append(i)
+    if cache_dir:
+        print(f"NDVI cache: {len(files) - len(pending)} cached, {len(pending)} to process")
+
+    def store(i, rows):
+        stat_values[i] = rows
+        cache = caches[from_stack[i]]
+        if cache is not None:
+            # === Written as each result arrives, so an interrupted run keeps the rasters it finished ===
+            # === (the default mean-only entries keep their original 1-D layout) ===
+            cache.put(files[i], rows[0] if variant is None else rows, catalog.entry(files[i])["checksum"])
+
+    pending_files = [files[i] for i in pending]
+    with span("ndvi.reduce", rasters=len(files), cached=len(files) - len(pending), workers=workers, stack=stack is not None):
+        if workers > 1 and len(pending_files) > 1:
+            initargs = (geometries, geom_key, bounds, stats, stress_threshold, stack.folder if stack is not None else None)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                results = pool.map(_worker_stats_of, pending_files, chunksize=max(1, len(pending_files) // (workers * 4)))
+                for i, rows in zip(pending, tqdm(results, total=len(pending_files), desc="Processing NDVI files")):
+                    store(i, rows)
+        else:
+            for i, path in zip(pending, tqdm(pending_files, desc="Processing NDVI files")):
+                store(i, _raster_stats(path, geometries, geom_key, bounds, stats, stress_threshold, stack))
+
+    months = np.array([p[0] for p in periods], dtype=np.int8)
+    years = np.array([p[1] for p in periods], dtype=np.int16)
+    columns = {}
+    for name, column in [("district", "dtname"), *[(c, c) for c in extra_columns]]:
+        values = pd.Categorical(gdf[column].to_numpy())
+        columns[name] = pd.Categorical.from_codes(np.tile(values.codes, len(files)), categories=values.categories)
+    columns["month"] = np.repeat(months, n_districts)
+    if fortnight:
+        columns["fortnight"] = np.repeat(np.array([p[2] for p in periods], dtype=np.int8), n_districts)
+    columns["year"] = np.repeat(years, n_districts)
+    for k, stat in enumerate(stats):
+        columns[stat_column(stat)] = stat_values[:, k, :].ravel()
+    return pd.DataFrame(columns)
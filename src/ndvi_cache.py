@@ -0,0 +1,64 @@
+import hashlib
+import os
+import numpy as np
+
+
+def vsizip_parts(path):
+    """(archive, member) of a /vsizip/<archive.zip>/<member> path; the extension may be in any case (.ZIP)"""
+    inner = "/" + path[len("/vsizip"):].lstrip("/")
+    end = inner.lower().index(".zip/") + len(".zip")
+    return inner[:end], inner[end + 1:]
+
+
+def source_file(path):
+    """File on disk behind a raster path (the archive for /vsizip/<archive.zip>/<member> paths)"""
+    if path.startswith("/vsizip/"):
+        return vsizip_parts(path)[0]
+    return path
+
+
+class NdviResultCache:
+    """
+    On-disk cache of per-district zonal results, one small .npy file per raster
+
+    Entries are addressed by the raster's identity (its name and the content checksum of the
+    raster catalog, see raster_catalog.py) and by the hash of the district geometries, so
+    changed rasters or changed district boundaries are simply cache misses.
+
+    Args:
+        cache_dir: Root folder of the cache
+        geom_key: geometry_key() of the district geometries the results belong to
+        variant: Optional description of what is cached (e.g. the statistic set); each variant
+            gets its own folder next to the default one
+    """
+
+    def __init__(self, cache_dir, geom_key, variant=None):
+        folder = geom_key[:16]
+        if variant is not None:
+            folder = f"{folder}-{hashlib.sha1(variant.encode()).hexdigest()[:8]}"
+        self.folder = os.path.join(cache_dir, folder)
+        os.makedirs(self.folder, exist_ok=True)
+
+    def raster_key(self, path, checksum):
+        """Key of a raster from its name and content checksum"""
+        return hashlib.sha1(f"{os.path.basename(path)}|{checksum}".encode()).hexdigest()
+
+    def _entry(self, path, checksum):
+        return os.path.join(self.folder, f"{self.raster_key(path, checksum)}.npy")
+
+    def get(self, path, checksum):
+        """Cached result array for a raster, or None on a miss"""
+        entry = self._entry(path, checksum)
+        if not os.path.exists(entry):
+            return None
+        try:
+            return np.load(entry)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, path, result, checksum):
+        entry = self._entry(path, checksum)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(result))
+        os.replace(tmp, entry)
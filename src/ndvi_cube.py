@@ -0,0 +1,263 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from seasons import SEASONS, SEASON_CODE_BY_MONTH
+
+
+# === Time axis: 24 fortnights per year (Jan 01to15, Jan 16to31, Feb 01to15, ...), whole years only ===
+FORTNIGHTS_PER_YEAR = 24
+VALUES_FILE = "values.npy"
+INDEX_FILE = "index.json"
+
+# === Month (1..12) and season code of each fortnight of the year ===
+FORTNIGHT_MONTH = np.repeat(np.arange(1, 13), 2)
+FORTNIGHT_SEASON = SEASON_CODE_BY_MONTH[FORTNIGHT_MONTH]
+
+
+def _nanmean(values, axis):
+    """Mean over an axis ignoring NaN; NaN (without a warning) where nothing is valid"""
+    valid = np.isfinite(values)
+    total = np.where(valid, values, 0).sum(axis=axis, dtype=np.float64)
+    count = valid.sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (total / count).astype(np.float32)
+
+
+def _rolling_nanmean(values, window):
+    """Trailing mean over the last window steps of the time (last) axis, ignoring NaN"""
+    valid = np.isfinite(values)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    total = np.pad(np.cumsum(np.where(valid, values, 0), axis=-1, dtype=np.float64), pad)
+    count = np.pad(np.cumsum(valid, axis=-1), pad)
+    hi = np.arange(1, values.shape[-1] + 1)
+    lo = np.maximum(hi - window, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ((total[..., hi] - total[..., lo]) / (count[..., hi] - count[..., lo])).astype(np.float32)
+
+
+def write_ndvi_cube(ndvi_df, cube_dir, variables=None):
+    """
+    Store per-district NDVI results as a dense (variable x district x fortnight) cube
+
+    The values are one float32 .npy file that NdviCube memory-maps, so queries only page in
+    the rows they touch. Rasters of the same district and fortnight are averaged; fortnights
+    without a raster are NaN.
+
+    Args:
+        ndvi_df: process_ndvi_folder(..., fortnight=True) output; a "state" column, when
+            present, becomes part of the district key
+        cube_dir: Folder of the cube (replaced as a whole)
+        variables: Statistic columns to store (default: every column besides the keys)
+
+    Returns:
+        NdviCube of the written folder
+    """
+    keys = ["district", "month", "fortnight", "year"] + (["state"] if "state" in ndvi_df.columns else [])
+    if variables is None:
+        variables = [c for c in ndvi_df.columns if c not in keys]
+    variables = list(variables)
+
+    states = ndvi_df["state"].astype(str).to_numpy() if "state" in ndvi_df.columns else np.full(len(ndvi_df), "")
+    districts = ndvi_df["district"].astype(str).str.strip().str.lower().to_numpy()
+    rows, labels = pd.MultiIndex.from_arrays([states, districts]).factorize()
+
+    years = ndvi_df["year"].to_numpy(dtype=np.int64)
+    start_year = int(years.min()) if len(years) else 0
+    n_years = int(years.max()) - start_year + 1 if len(years) else 0
+    n_times = n_years * FORTNIGHTS_PER_YEAR
+    times = (
+        (years - start_year) * FORTNIGHTS_PER_YEAR
+        + (ndvi_df["month"].to_numpy(dtype=np.int64) - 1) * 2
+        + ndvi_df["fortnight"].to_numpy(dtype=np.int64) - 1
+    )
+    cells = rows * n_times + times
+
+    os.makedirs(cube_dir, exist_ok=True)
+    values_path = os.path.join(cube_dir, VALUES_FILE)
+    tmp_path = os.path.join(cube_dir, f"values.{os.getpid()}.tmp.npy")
+    shape = (len(variables), len(labels), n_times)
+    cube = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=shape)
+    for k, variable in enumerate(variables):
+        # === Sum and count per cell in one bincount each, so duplicate rasters are averaged ===
+        x = ndvi_df[variable].to_numpy(dtype=np.float64)
+        valid = np.isfinite(x)
+        total = np.bincount(cells[valid], weights=x[valid], minlength=shape[1] * n_times)
+        count = np.bincount(cells[valid], minlength=shape[1] * n_times)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cube[k] = (total / count).reshape(shape[1:])
+    cube.flush()
+    del cube
+
+    index = {
+        "variables": variables,
+        "states": [state for state, _ in labels],
+        "districts": [district for _, district in labels],
+        "start_year": start_year,
+        "n_years": n_years,
+    }
+    index_tmp = os.path.join(cube_dir, f"index.{os.getpid()}.tmp")
+    with open(index_tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, values_path)
+    os.replace(index_tmp, os.path.join(cube_dir, INDEX_FILE))
+    return NdviCube(cube_dir)
+
+
+def update_ndvi_cube(ndvi_df, cube_dir):
+    """
+    write_ndvi_cube() of some states' results, keeping the other states already in the cube
+
+    The cube counterpart of write_analysis_store: ingesting one state replaces that state's
+    districts only. Variables only one side has are NaN for the other side's districts.
+
+    Args:
+        ndvi_df: process_ndvi_folder(..., fortnight=True) output with a "state" column
+        cube_dir: Folder of the cube
+
+    Returns:
+        NdviCube of the written folder
+    """
+    if "state" not in ndvi_df.columns or not os.path.exists(os.path.join(cube_dir, INDEX_FILE)):
+        return write_ndvi_cube(ndvi_df, cube_dir)
+    previous = NdviCube(cube_dir)
+    keep = np.flatnonzero(~np.isin(previous.states, ndvi_df["state"].astype(str).unique()))
+    if len(keep):
+        kept = previous.to_frame(previous.array(previous.variables[0])[keep], previous.variables[0], rows=keep)
+        for variable in previous.variables[1:]:
+            kept[variable] = np.asarray(previous.array(variable)[keep]).ravel()
+        ndvi_df = pd.concat([kept, ndvi_df], ignore_index=True)
+    del previous  # release the mapped file before it is replaced
+    return write_ndvi_cube(ndvi_df, cube_dir)
+
+
+class NdviCube:
+    """
+    Memory-mapped (variable x district x fortnight) NDVI cube written by write_ndvi_cube
+
+    Slices are views of the mapped file; climatologies, anomalies and seasonal aggregates
+    are array reductions over the (district, year, fortnight) reshape of the time axis.
+    """
+
+    def __init__(self, cube_dir):
+        with open(os.path.join(cube_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.values = np.load(os.path.join(cube_dir, VALUES_FILE), mmap_mode="r")
+        self.variables = index["variables"]
+        self.districts = index["districts"]
+        self.states = index["states"]
+        self.start_year = index["start_year"]
+        self.n_years = index["n_years"]
+        if self.values.shape != (len(self.variables), len(self.districts), self.n_years * FORTNIGHTS_PER_YEAR):
+            raise ValueError(f"NDVI cube {cube_dir} does not match its index")
+
+    @property
+    def years(self):
+        return np.arange(self.start_year, self.start_year + self.n_years)
+
+    def time_index(self, year, month=1, fortnight=1):
+        """Position of a fortnight on the time axis"""
+        return (year - self.start_year) * FORTNIGHTS_PER_YEAR + (month - 1) * 2 + fortnight - 1
+
+    def period(self, t):
+        """(year, month, fortnight) of a position on the time axis"""
+        year, f = divmod(int(t), FORTNIGHTS_PER_YEAR)
+        return self.start_year + year, f // 2 + 1, f % 2 + 1
+
+    def district_rows(self, districts, state=None):
+        """Row of each district name (normalized like the analysis store), optionally within one state"""
+        lookup = {}
+        for i, (s, d) in enumerate(zip(self.states, self.districts)):
+            if state is None or s == state:
+                lookup.setdefault(d, i)
+        try:
+            return np.array([lookup[d.strip().lower()] for d in districts], dtype=np.intp)
+        except KeyError as err:
+            raise KeyError(f"District {err.args[0]!r} is not in the NDVI cube") from None
+
+    def array(self, variable="mean_ndvi"):
+        """(district x fortnight) view of one variable"""
+        if variable not in self.variables:
+            raise KeyError(f"Variable {variable!r} is not in the NDVI cube, expected one of {self.variables}")
+        return self.values[self.variables.index(variable)]
+
+    def slice(self, variable="mean_ndvi", districts=None, state=None, start=None, end=None):
+        """
+        Values of some districts over a time range
+
+        Args:
+            variable: Stored statistic column (e.g. mean_ndvi)
+            districts: District names (None = every district, the result is then a view)
+            state: State code the district names are looked up in
+            start, end: Inclusive (year, month, fortnight) bounds, or a year for its whole span
+
+        Returns:
+            (districts x fortnights) array
+        """
+        values = self.array(variable)
+        t0 = 0 if start is None else self.time_index(start) if np.isscalar(start) else self.time_index(*start)
+        t1 = values.shape[1] if end is None else self.time_index(end + 1) if np.isscalar(end) else self.time_index(*end) + 1
+        values = values[:, max(t0, 0):max(t1, 0)]
+        if districts is not None:
+            values = values[self.district_rows(districts, state)]
+        elif state is not None:
+            values = values[np.asarray(self.states) == state]
+        return values
+
+    def by_year(self, variable="mean_ndvi"):
+        """(district x year x fortnight-of-year) view of one variable"""
+        values = self.array(variable)
+        return values.reshape(values.shape[0], self.n_years, FORTNIGHTS_PER_YEAR)
+
+    def climatology(self, variable="mean_ndvi"):
+        """Multi-year mean of each district and fortnight of the year, (district x 24)"""
+        return _nanmean(self.by_year(variable), axis=1)
+
+    def anomalies(self, variable="mean_ndvi", window=1):
+        """
+        Departure from the climatology of the same fortnight, (district x fortnight)
+
+        Args:
+            window: Trailing number of fortnights the departures are averaged over
+                (e.g. 6 for a three-month rolling anomaly)
+        """
+        departures = self.by_year(variable) - self.climatology(variable)[:, None, :]
+        departures = departures.reshape(departures.shape[0], -1)
+        return departures if window <= 1 else _rolling_nanmean(departures, window)
+
+    def seasonal(self, variable="mean_ndvi", how="mean"):
+        """
+        Aggregate of each district, year and season (calendar year, seasons as in seasons.SEASONS)
+
+        Args:
+            how: mean, min or max over the season's fortnights
+
+        Returns:
+            (district x year x season) array
+        """
+        reducers = {"mean": _nanmean, "min": lambda v, axis: np.fmin.reduce(v, axis=axis),
+                    "max": lambda v, axis: np.fmax.reduce(v, axis=axis)}
+        if how not in reducers:
+            raise ValueError(f"Unknown seasonal aggregation {how!r}, expected one of {list(reducers)}")
+        values = self.by_year(variable)
+        return np.stack(
+            [reducers[how](values[:, :, FORTNIGHT_SEASON == code], axis=2) for code in range(len(SEASONS))], axis=2
+        )
+
+    def to_frame(self, values, variable="mean_ndvi", rows=None):
+        """
+        Long DataFrame (state, district, year, month, fortnight, <variable>) of a full (district x fortnight) array
+
+        rows are the cube rows values holds (default: every district, in cube order).
+        """
+        n_districts, n_times = values.shape
+        rows = np.arange(len(self.districts)) if rows is None else np.asarray(rows)
+        t = np.arange(n_times)
+        return pd.DataFrame({
+            "state": np.repeat(np.asarray(self.states)[rows], n_times),
+            "district": np.repeat(np.asarray(self.districts)[rows], n_times),
+            "year": np.tile(self.start_year + t // FORTNIGHTS_PER_YEAR, n_districts).astype(np.int16),
+            "month": np.tile(FORTNIGHT_MONTH[t % FORTNIGHTS_PER_YEAR], n_districts).astype(np.int8),
+            "fortnight": np.tile(t % 2 + 1, n_districts).astype(np.int8),
+            variable: np.asarray(values).ravel(),
+        })
@@ -0,0 +1,180 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+import numpy as np
+from matplotlib.figure import Figure
+from analysis_store import load_analysis
+from district_geometry import SIMPLIFY_LEVELS, load_districts
+
+
+# === Colour scale shared by every map, so years are comparable ===
+GLOBAL_MIN = 0.0
+GLOBAL_MAX = 255
+# === stname of each state code in the district GeoJSON ===
+STATE_NAMES = {"MH": "MAHARASHTRA", "MP": "MADHYA PRADESH"}
+
+
+def prepare_districts(shape_file, state_name, crs=None, simplify_tolerance=None, cache_dir=None, level="map"):
+    """
+    District outlines of one state, projected and simplified once for every map
+
+    Args:
+        shape_file: District GeoJSON
+        state_name: Value of the stname column to keep (e.g. "MAHARASHTRA")
+        crs: Optional CRS to project to before simplifying (e.g. "EPSG:32643")
+        simplify_tolerance: In CRS units, applied to the exact outlines; None uses the
+            precomputed simplification level, 0 keeps full detail
+        cache_dir: Folder of the prepared district geometry cache (see district_geometry)
+        level: Precomputed simplification level used when crs and simplify_tolerance are None
+
+    Returns:
+        GeoDataFrame with district (normalized name) and geometry
+    """
+    custom = crs is not None or simplify_tolerance is not None
+    districts_gdf = load_districts(shape_file, "exact" if custom else level, cache_dir)
+    districts_gdf = districts_gdf[districts_gdf["stname"] == state_name][["district", "geometry"]]
+
+    if crs is not None:
+        districts_gdf = districts_gdf.to_crs(crs)
+    if custom and simplify_tolerance is None:
+        minx, miny, maxx, maxy = districts_gdf.total_bounds
+        simplify_tolerance = max(maxx - minx, maxy - miny) * SIMPLIFY_LEVELS[level]
+    if simplify_tolerance:
+        districts_gdf = districts_gdf.assign(geometry=districts_gdf.geometry.simplify(simplify_tolerance, preserve_topology=True))
+    return districts_gdf.reset_index(drop=True)
+
+
+def yearly_ndvi_table(input_folder, state_code, districts):
+    """
+    Mean NDVI (0-255) per year for the given district order, as (years, 2-D array years x districts)
+    """
+    df = load_analysis(input_folder, columns=["district", "year", "mean_ndvi"], states=[state_code])
+    df["district"] = df["district"].astype(str).str.strip().str.lower()
+
+    # === Aggregate NDVI by district and year in one pass, aligned to the map's district order ===
+    table = df.groupby(["year", "district"])["mean_ndvi"].mean().unstack("district") * 255
+    table = table.reindex(columns=list(districts))
+    return list(table.index), table.to_numpy()
+
+
+def draw_map(districts_gdf, values, title, path=None, dpi=300, fig=None):
+    """
+    Draw one NDVI choropleth; saved to path when given
+
+    Without a fig a standalone Agg figure is used, so no window is opened and nothing is
+    kept in pyplot's figure registry.
+    """
+    fig = fig if fig is not None else Figure(figsize=(10, 8))
+    ax = fig.subplots(1, 1)
+    districts_gdf.assign(mean_ndvi=values).plot(
+        column="mean_ndvi",
+        cmap="RdYlGn",
+        linewidth=0.8,
+        ax=ax,
+        edgecolor="0.8",
+        legend=True,
+        vmin=GLOBAL_MIN,
+        vmax=GLOBAL_MAX
+    )
+    ax.set_title(title, fontsize=14)
+    ax.axis("off")
+    fig.tight_layout()
+    if path is not None:
+        fig.savefig(path, dpi=dpi, bbox_inches="tight")
+    return fig
+
+
+# === Per-process state: the prepared outlines are shipped to each worker only once ===
+_worker_districts = None
+
+
+def _init_worker(districts_gdf, headless=False):
+    global _worker_districts
+    _worker_districts = districts_gdf
+    if headless:
+        # === Pool workers never open a window, whatever backend the parent selected ===
+        matplotlib.use("Agg")
+
+
+def _render_year(job):
+    year, values, path, dpi = job
+    draw_map(_worker_districts, values, f"Average NDVI - {year}", path, dpi)
+    return path
+
+
+def render_ndvi_maps(districts_gdf, input_folder, state_code, output_folder, workers=1, fmt="png", dpi=300):
+    """
+    Render one map per year headlessly, optionally in a process pool
+
+    Args:
+        districts_gdf: prepare_districts() output
+        input_folder: Analysis store or folder of per-year CSV files
+        state_code: State code of the data to map (e.g. "MH")
+        output_folder: Folder for the ndvi_map_<year>.<fmt> files
+        workers: Number of processes
+        fmt: Image format understood by matplotlib (png, svg, pdf, jpg, ...)
+        dpi: Resolution of raster formats
+
+    Returns:
+        List of written file paths, in year order
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    years, table = yearly_ndvi_table(input_folder, state_code, districts_gdf["district"])
+    jobs = [
+        (year, np.asarray(row), os.path.join(output_folder, f"ndvi_map_{year}.{fmt}"), dpi)
+        for year, row in zip(years, table)
+    ]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(districts_gdf, True)) as pool:
+            return list(pool.map(_render_year, jobs))
+
+    _init_worker(districts_gdf)
+    return [_render_year(job) for job in jobs]
+
+
+def draw_ndvi_map(shape_file, state, input_folder, output_folder, workers=1, fmt="png", dpi=300, crs=None,
+                  simplify_tolerance=None, show=False, geometry_cache=None):
+    """
+    Yearly NDVI maps of one state (the body of visualize_mh.py and visualize_mp.py)
+
+    Args:
+        shape_file: District GeoJSON
+        state: State code (see STATE_NAMES)
+        input_folder: Analysis store or folder of per-year CSV files
+        output_folder: Folder for the ndvi_map_<year>.<fmt> files
+        workers: Number of processes rendering headless maps
+        fmt: Image format understood by matplotlib (png, svg, pdf, jpg, ...)
+        dpi: Resolution of raster formats
+        crs: Optional CRS to project the outlines to
+        simplify_tolerance: Outline simplification tolerance (see prepare_districts)
+        show: Display every map through pyplot instead of rendering headless
+        geometry_cache: Folder of the prepared district geometry cache
+
+    Returns:
+        List of written file paths, in year order
+    """
+    # === Outlines are filtered to the state, projected and simplified once, then reused for every year ===
+    districts_gdf = prepare_districts(shape_file, STATE_NAMES[state], crs=crs, simplify_tolerance=simplify_tolerance, cache_dir=geometry_cache)
+
+    # Check if output folder exists, create it if it doesn't
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+        print(f"Created folder: {output_folder}")
+    else:
+        print(f"Folder already exists: {output_folder}")
+
+    if not show:
+        # === Headless batch rendering (Agg figures, one process per year with workers > 1) ===
+        return render_ndvi_maps(districts_gdf, input_folder, state, output_folder, workers=workers, fmt=fmt, dpi=dpi)
+
+    # === Interactive: draw through pyplot, show and close each year's figure ===
+    import matplotlib.pyplot as plt  # deferred, headless rendering never needs pyplot
+    years, table = yearly_ndvi_table(input_folder, state, districts_gdf["district"])
+    paths = []
+    for year, values in zip(years, table):
+        path = f"{output_folder}/ndvi_map_{year}.{fmt}"
+        fig = draw_map(districts_gdf, values, f"Average NDVI - {year}", path, dpi, fig=plt.figure(figsize=(10, 8)))
+        plt.show()
+        plt.close(fig)
+        paths.append(path)
+    return paths
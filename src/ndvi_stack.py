@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, transform as window_transform
+from config import Configuration
+from ndvi_cache import source_file
+from raster_windows import bounds_window
+
+
+STACK_FILE = "stack.npy"
+INDEX_FILE = "index.json"
+# === 2: bounds and per-layer nodata recorded; earlier stacks are never read ===
+STACK_VERSION = 2
+
+
+def raster_signature(path):
+    """(file name, size, mtime_ns) identifying one version of a raster"""
+    stat = os.stat(source_file(path))
+    return os.path.basename(path), stat.st_size, stat.st_mtime_ns
+
+
+def _read_onto_grid(src, transform, shape, crs, nodata):
+    """One raster band on the stack grid: a plain (or boundless) window read when the grids line up, else warped"""
+    height, width = shape
+    same_grid = (
+        src.crs == crs and np.allclose(src.res, (transform.a, -transform.e))
+        and src.transform.b == 0 and src.transform.d == 0
+    )
+    if same_grid:
+        col_off = (transform.c - src.transform.c) / src.transform.a
+        row_off = (transform.f - src.transform.f) / src.transform.e
+        if np.isclose(col_off, round(col_off)) and np.isclose(row_off, round(row_off)):
+            window = Window(round(col_off), round(row_off), width, height)
+            inside = window.col_off >= 0 and window.row_off >= 0 and \
+                window.col_off + width <= src.width and window.row_off + height <= src.height
+            return src.read(1, window=window, boundless=not inside, fill_value=nodata)
+    with WarpedVRT(src, crs=crs, transform=transform, width=width, height=height, nodata=nodata,
+                   resampling=Resampling.nearest) as vrt:
+        return vrt.read(1)
+
+
+def write_ndvi_stack(rasters, stack_dir, bounds):
+    """
+    Clip NDVI rasters to common bounds and store them as one memory-mappable uint8 array
+
+    The grid (CRS, pixel size and alignment) is the one of the first raster; rasters on the
+    same grid are copied pixel for pixel, others are resampled onto it (nearest). Pixels a
+    raster does not cover or marks as nodata are the stack's nodata (the first raster's, 255
+    when it has none). A raster without a nodata value keeps every pixel valid, as when its
+    file is read: its layer records nodata null, and is only usable when the raster covers
+    the whole stack grid. Every raster must be uint8.
+
+    Args:
+        rasters: List of (path, (month, year, fortnight)) in time order
+        stack_dir: Folder of the stack (replaced as a whole)
+        bounds: (minx, miny, maxx, maxy) in the rasters' CRS, e.g. the states' district extent
+
+    Returns:
+        NdviStack of the written folder
+    """
+    if not rasters:
+        raise ValueError("No NDVI rasters to stack")
+    with rasterio.open(rasters[0][0]) as src:
+        window = bounds_window(src, bounds)
+        if window is None:
+            raise ValueError(f"{rasters[0][0]} does not overlap the bounds {bounds}")
+        transform = src.window_transform(window)
+        crs = src.crs
+        nodata = 255 if src.nodata is None else src.nodata
+    shape = (int(window.height), int(window.width))
+    grid_bounds = rasterio.transform.array_bounds(*shape, transform)
+
+    os.makedirs(stack_dir, exist_ok=True)
+    tmp_path = os.path.join(stack_dir, f"stack.{os.getpid()}.tmp.npy")
+    data = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(rasters), *shape))
+    layers = []
+    for t, (path, period) in enumerate(rasters):
+        with rasterio.open(path) as src:
+            if src.dtypes[0] != "uint8":
+                raise ValueError(f"{path} is {src.dtypes[0]}, the NDVI stack holds uint8 rasters")
+            band = _read_onto_grid(src, transform, shape, crs, nodata)
+            # === Every raster's own nodata value becomes the stack's ===
+            if src.nodata is not None and src.nodata != nodata:
+                band[band == src.nodata] = nodata
+            data[t] = band
+            layer = {"nodata": nodata if src.nodata is not None else None, "complete": True}
+            if src.nodata is None:
+                # === Without a nodata value the fill of uncovered pixels cannot be told from data ===
+                minx, miny, maxx, maxy = transform_bounds(src.crs, crs, *src.bounds) if src.crs != crs else src.bounds
+                tolerance = 1e-9
+                layer["complete"] = minx <= grid_bounds[0] + tolerance and miny <= grid_bounds[1] + tolerance and \
+                    maxx >= grid_bounds[2] - tolerance and maxy >= grid_bounds[3] - tolerance
+        name, size, mtime_ns = raster_signature(path)
+        layers.append({"name": name, "size": size, "mtime_ns": mtime_ns, "period": list(period), **layer})
+    data.flush()
+    del data
+
+    index = {
+        "version": STACK_VERSION, "layers": layers, "transform": list(transform)[:6], "crs": crs.to_wkt(), "nodata": nodata,
+        "bounds": [float(b) for b in bounds],
+    }
+    index_tmp = os.path.join(stack_dir, f"index.{os.getpid()}.tmp")
+    with open(index_tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(stack_dir, STACK_FILE))
+    os.replace(index_tmp, os.path.join(stack_dir, INDEX_FILE))
+    return NdviStack(stack_dir)
+
+
+def is_ndvi_stack(stack_dir):
+    return stack_dir is not None and os.path.exists(os.path.join(stack_dir, INDEX_FILE))
+
+
+class NdviStack:
+    """
+    Memory-mapped (time x rows x cols) uint8 NDVI stack written by write_ndvi_stack
+
+    Has the transform / width / height of an open rasterio dataset, so bounds_window and
+    rasterize_zones work on it unchanged; read() returns views of the mapped file.
+    """
+
+    def __init__(self, stack_dir):
+        with open(os.path.join(stack_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.folder = stack_dir
+        self.data = np.load(os.path.join(stack_dir, STACK_FILE), mmap_mode="r")
+        self.transform = Affine(*index["transform"])
+        self.crs = CRS.from_wkt(index["crs"])
+        self.nodata = index["nodata"]
+        self.layers = index["layers"]
+        self.periods = [tuple(layer["period"]) for layer in self.layers]
+        self.height, self.width = self.data.shape[1:]
+        # === Stacks of an earlier version cover nothing (always read the files) ===
+        self.version = index.get("version", 1)
+        self.bounds = tuple(index["bounds"]) if self.version == STACK_VERSION else None
+        grid = [self.version, index["transform"], index["crs"], self.nodata, index.get("bounds"), self.height, self.width]
+        self.key = hashlib.sha1(json.dumps(grid).encode()).hexdigest()[:12]
+        self._by_name = {layer["name"]: t for t, layer in enumerate(self.layers)}
+
+    def __len__(self):
+        return len(self.layers)
+
+    def covers(self, bounds, tolerance=1e-9):
+        """True when bounds lie inside the bounds the stack was clipped to"""
+        if self.bounds is None:
+            return False
+        minx, miny, maxx, maxy = self.bounds
+        return bounds[0] >= minx - tolerance and bounds[1] >= miny - tolerance and \
+            bounds[2] <= maxx + tolerance and bounds[3] <= maxy + tolerance
+
+    def layer(self, path, bounds=None):
+        """
+        Index of a raster in the stack, or None if it is missing or changed since the stack was
+        built, if it has no nodata value and does not cover the stack, or when bounds are given
+        that the stack does not cover
+        """
+        if bounds is not None and not self.covers(bounds):
+            return None
+        t = self._by_name.get(os.path.basename(path))
+        if t is None:
+            return None
+        name, size, mtime_ns = raster_signature(path)
+        entry = self.layers[t]
+        if not entry.get("complete", False):
+            return None
+        return t if (entry["size"], entry["mtime_ns"]) == (size, mtime_ns) else None
+
+    def layer_nodata(self, t):
+        """Nodata value of one layer (None when its raster has none, so every pixel is valid)"""
+        return self.layers[t]["nodata"]
+
+    def window_transform(self, window):
+        return window_transform(window, self.transform)
+
+    def read(self, t, window=None):
+        """Pixels of one layer (within a window) as a view of the memory-mapped array"""
+        if window is None:
+            return self.data[t]
+        r0, c0 = int(window.row_off), int(window.col_off)
+        return self.data[t, r0:r0 + int(window.height), c0:c0 + int(window.width)]
+
+
+def main(argv=None, prog=None):
+    # === Imported here: ingest and ndvi read the stack, so they are not imported at module level ===
+    from ingest import STATE_REGISTRY, load_state_districts
+    from ndvi import build_ndvi_stack
+
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Clip every NDVI raster to the districts of the given states and store them as one memory-mapped stack')
+    parser.add_argument('--states', nargs='+', default=list(STATE_REGISTRY), choices=list(STATE_REGISTRY), help='State codes whose district extent is kept')
+    parser.add_argument('--ndvi', type=str, default=cfg.ndvi_folder, help='Path to folder with NDVI files')
+    parser.add_argument('--stack_dir', type=str, default=cfg.ndvi_stack_folder, help='Folder of the NDVI stack')
+    parser.add_argument('--geometry_cache', type=str, default=cfg.geometry_cache_folder, help='Folder of the prepared district geometry cache')
+    args = parser.parse_args(argv)
+
+    districts = load_state_districts([STATE_REGISTRY[code] for code in args.states], args.geometry_cache)
+    stack = build_ndvi_stack(args.ndvi, args.stack_dir, tuple(districts.total_bounds))
+    print(f"Stacked {len(stack)} rasters of {stack.height} x {stack.width} pixels in {args.stack_dir}")
+
+
+if __name__ == "__main__":
+    main()
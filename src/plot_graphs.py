@@ -1,26 +1,51 @@
-import os
-import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import argparse
-import numpy as np
+import os
+from functools import lru_cache
+from analysis_store import load_analysis, source_signature
+from climate_bins import BIN_FACETS, bin_ndvi, bin_width, cell_label, top_cells
+from config import Configuration
+
+
+# === Every column any of the plots needs, so one load serves all of them ===
+PLOT_COLUMNS = ['year', 'season', 'mean_ndvi', 'mean_temp', 'mean_rainfall(mm)']
+
+
+@lru_cache(maxsize=8)
+def _load_cached(folder_path, signature, states, years, districts, extra_columns):
+    df = load_analysis(folder_path, columns=PLOT_COLUMNS + list(extra_columns), states=states, years=years, districts=districts)
+    df['season'] = df['season'].astype('category')
+    if 'state' in df.columns:
+        df['state'] = df['state'].astype('category')
+    df['year'] = df['year'].astype('int16')
+    for column in ['mean_ndvi', 'mean_temp', 'mean_rainfall(mm)']:
+        df[column] = df[column].astype('float32')
+    return df
+
+
+def load_climate_frame(folder_path, states=None, years=None, districts=None, extra_columns=()):
+    """
+    Plot data of a folder, parsed once per process and reused until any of its files changes
 
+    The LRU cache is keyed on the folder path, the size/mtime of its files and the filters,
+    so the returned frame is shared between calls and must not be modified in place.
+    extra_columns are loaded on top of PLOT_COLUMNS (e.g. "state" for faceted bins).
+    """
+    as_key = lambda values: None if values is None else tuple(sorted(values))
+    extra_columns = tuple(c for c in extra_columns if c not in PLOT_COLUMNS)
+    return _load_cached(
+        os.path.abspath(folder_path), source_signature(folder_path), as_key(states), as_key(years), as_key(districts),
+        extra_columns
+    )
 
-def ndvi_vs_temp_n_rainfall(folder_path):
-    file_prefix = "climate_"
 
+def ndvi_vs_temp_n_rainfall(folder_path, states=None, years=None, districts=None):
     # -----------------------------
-    # STEP 1: Load all CSV files
+    # STEP 1: Load the columns we plot (analysis store or folder of CSV files)
     # -----------------------------
-    all_dfs = []
+    import seaborn as sns  # deferred: only plots 1 and 2 use seaborn, and it is slow to import
 
-    for file in os.listdir(folder_path):
-        if file.startswith(file_prefix) and file.endswith(".csv"):
-            file_path = os.path.join(folder_path, file)
-            df = pd.read_csv(file_path)
-            all_dfs.append(df)
-
-    climate_df = pd.concat(all_dfs, ignore_index=True)
+    climate_df = load_climate_frame(folder_path, states=states, years=years, districts=districts)
 
     # Drop rows with missing values
     climate_df = climate_df.dropna(subset=['mean_ndvi', 'mean_temp', 'mean_rainfall(mm)', 'year'])
@@ -52,54 +77,56 @@ def ndvi_vs_temp_n_rainfall(folder_path):
     plt.tight_layout()
     plt.show()
 
-def ndvi_conc_temp_n_rainfall(folder_path):
-    file_prefix = "climate_"
-    all_dfs = []
-
-    for file in os.listdir(folder_path):
-        if file.startswith(file_prefix) and file.endswith(".csv"):
-            df = pd.read_csv(os.path.join(folder_path, file))
-            all_dfs.append(df)
-
-    climate_df = pd.concat(all_dfs, ignore_index=True)
-
-    # Drop rows with missing critical values
-    climate_df = climate_df.dropna(subset=['mean_ndvi', 'mean_temp', 'mean_rainfall(mm)'])
-    temp_bins = np.arange(int(climate_df['mean_temp'].min()), int(climate_df['mean_temp'].max()) + 1, 1)
-    rain_bins = np.arange(0, int(climate_df['mean_rainfall(mm)'].max()) + 10, 10)  # 10mm intervals
-
-    climate_df['temp_bin'] = pd.cut(climate_df['mean_temp'], bins=temp_bins)
-    climate_df['rain_bin'] = pd.cut(climate_df['mean_rainfall(mm)'], bins=rain_bins)
-    binned_ndvi = climate_df.groupby(['temp_bin', 'rain_bin'])['mean_ndvi'].mean().reset_index()
-
-    # Drop NaNs
-    binned_ndvi = binned_ndvi.dropna(subset=['mean_ndvi'])
-    top_ndvi = binned_ndvi.sort_values(by='mean_ndvi', ascending=False).head(5)
-
-    print("\nTop 5 temperature and rainfall ranges with highest average NDVI:\n")
-    for _, row in top_ndvi.iterrows():
-        print(f"Temperature: {row['temp_bin']}, Rainfall: {row['rain_bin']}, Mean NDVI: {row['mean_ndvi']:.3f}")
-    pivot_table = binned_ndvi.pivot(index='temp_bin', columns='rain_bin', values='mean_ndvi')
-
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(pivot_table, cmap='RdYlGn', annot=True, fmt=".2f", cbar_kws={'label': 'Mean NDVI'})
-    plt.title('NDVI Concentration by Temperature and Rainfall Ranges')
-    plt.xlabel('Rainfall Range (mm)')
-    plt.ylabel('Temperature Range (°C)')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+def ndvi_conc_temp_n_rainfall(folder_path, states=None, years=None, districts=None, temp_bin=1.0, rain_bin=10.0,
+                              facet=None, top_k=5, min_count=1):
+    """
+    Heatmap of the mean NDVI per temperature x rainfall range, and the ranges with the highest NDVI
+
+    Args:
+        temp_bin: Temperature range size (deg C)
+        rain_bin: Rainfall range size (mm)
+        facet: Optional state, season or year; one heatmap and top list per value
+        top_k: Number of top ranges printed (per facet value)
+        min_count: Ignore ranges with fewer district-months than this in the top list
+    """
+    import seaborn as sns  # deferred, see ndvi_vs_temp_n_rainfall
+
+    climate_df = load_climate_frame(
+        folder_path, states=states, years=years, districts=districts, extra_columns=[facet] if facet else []
+    )
+
+    # === Only non-empty temperature x rainfall cells are computed and kept (see climate_bins.py) ===
+    binned_ndvi = bin_ndvi(climate_df, temp_width=temp_bin, rain_width=rain_bin, facet=facet)
+    top_ndvi = top_cells(binned_ndvi, k=top_k, min_count=min_count, facet=facet)
+
+    print(f"\nTop {top_k} temperature and rainfall ranges with highest average NDVI:\n")
+    for cell in top_ndvi.itertuples(index=False):
+        prefix = f"{facet.capitalize()}: {getattr(cell, facet)}, " if facet else ""
+        print(
+            f"{prefix}Temperature: {cell_label(cell.temp_low, cell.temp_high)}, "
+            f"Rainfall: {cell_label(cell.rain_low, cell.rain_high)}, Mean NDVI: {cell.mean_ndvi:.3f} (n={cell.count})"
+        )
+
+    # === One figure per facet value, so the figure size does not grow with the number of values ===
+    panels = binned_ndvi.groupby(facet, sort=True, observed=True) if facet else [(None, binned_ndvi)]
+    for label, panel in panels:
+        fig, ax = plt.subplots(figsize=(12, 8))
+        pivot_table = panel.pivot(index='temp_low', columns='rain_low', values='mean_ndvi')
+        pivot_table.index = [cell_label(t, t + temp_bin) for t in pivot_table.index]
+        pivot_table.columns = [cell_label(r, r + rain_bin) for r in pivot_table.columns]
+        # === Cell annotations only while they stay readable ===
+        sns.heatmap(pivot_table, cmap='RdYlGn', annot=pivot_table.size <= 400, fmt=".2f",
+                    cbar_kws={'label': 'Mean NDVI'}, ax=ax)
+        title = 'NDVI Concentration by Temperature and Rainfall Ranges'
+        ax.set_title(title if label is None else f'{title} - {label}')
+        ax.set_xlabel('Rainfall Range (mm)')
+        ax.set_ylabel('Temperature Range (°C)')
+        ax.tick_params(axis='x', rotation=45)
+        fig.tight_layout()
     plt.show()
 
-def temp_n_rainfall(folder_path):
-    file_prefix = "climate_"
-    all_dfs = []
-
-    for file in os.listdir(folder_path):
-        if file.startswith(file_prefix) and file.endswith(".csv"):
-            df = pd.read_csv(os.path.join(folder_path, file))
-            all_dfs.append(df)
-
-    df = pd.concat(all_dfs, ignore_index=True)
+def temp_n_rainfall(folder_path, states=None, years=None, districts=None):
+    df = load_climate_frame(folder_path, states=states, years=years, districts=districts)
     yearly_data = df.groupby('year').agg({
         'mean_temp': 'mean',
         'mean_rainfall(mm)': 'mean'
@@ -125,17 +152,42 @@ def temp_n_rainfall(folder_path):
     plt.tight_layout()
     plt.show()
 
-if __name__=="__main__":
-    parser = argparse.ArgumentParser(description='Draw NDVI State Map')
-    parser.add_argument('--plot_function', required=True, type=str, help='Which Plot you want?')
-    parser.add_argument('--input_folder', type=str, required=True,help='Path to folder with CSV files with per year data of State')
-    args = parser.parse_args()
-
+def plot_all(folder_path, states=None, years=None, districts=None, **binning):
+    # === All three figures from a single load of the data (binning options go to plot 2) ===
+    ndvi_vs_temp_n_rainfall(folder_path, states=states, years=years, districts=districts)
+    ndvi_conc_temp_n_rainfall(folder_path, states=states, years=years, districts=districts, **binning)
+    temp_n_rainfall(folder_path, states=states, years=years, districts=districts)
+
+
+def main(argv=None, prog=None):
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Draw NDVI State Map')
+    parser.add_argument('--plot_function', required=True, type=str, help='Which Plot you want? (1, 2, 3 or all)')
+    parser.add_argument('--input_folder', type=str, default=cfg.analysis_store, help='Analysis store, or path to folder with CSV files with per year data of State')
+    parser.add_argument('--states', nargs='+', default=None, help='State codes to include (analysis store only)')
+    parser.add_argument('--years', nargs='+', type=int, default=None, help='Years to include')
+    parser.add_argument('--districts', nargs='+', default=None, help='Districts to include (lower-case names)')
+    parser.add_argument('--temp_bin', type=bin_width, default=1.0, help='Temperature range size of plot 2 (deg C)')
+    parser.add_argument('--rain_bin', type=bin_width, default=10.0, help='Rainfall range size of plot 2 (mm)')
+    parser.add_argument('--facet', choices=BIN_FACETS, default=None, help='Split plot 2 by state, season or year')
+    parser.add_argument('--top_k', type=int, default=5, help='Number of top NDVI ranges printed by plot 2 (per facet value)')
+    parser.add_argument('--min_count', type=int, default=1, help='Ignore ranges with fewer district-months than this in the top list')
+    args = parser.parse_args(argv)
+
+    filters = dict(states=args.states, years=args.years, districts=args.districts)
+    binning = dict(temp_bin=args.temp_bin, rain_bin=args.rain_bin, facet=args.facet, top_k=args.top_k, min_count=args.min_count)
     if args.plot_function == "1":
-        ndvi_vs_temp_n_rainfall(folder_path=args.input_folder)
+        ndvi_vs_temp_n_rainfall(folder_path=args.input_folder, **filters)
     elif args.plot_function == "2":
-        ndvi_conc_temp_n_rainfall(folder_path=args.input_folder)
+        ndvi_conc_temp_n_rainfall(folder_path=args.input_folder, **filters, **binning)
     elif args.plot_function == "3":
-        temp_n_rainfall(folder_path=args.input_folder)
+        temp_n_rainfall(folder_path=args.input_folder, **filters)
+    elif args.plot_function == "all":
+        plot_all(folder_path=args.input_folder, **filters, **binning)
     else:
         print("enter valid choice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import os
+import zipfile
+import rasterio
+from config import Configuration
+from ndvi_cache import source_file, vsizip_parts
+
+
+CATALOG_FILE = "raster_catalog.json"
+CATALOG_VERSION = 1
+TIF_EXTENSIONS = (".tif", ".tiff")
+MONTH_NUMBERS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+FORTNIGHTS_PER_YEAR = 24
+
+
+def parse_ndvi_period(file):
+    """
+    Parse month, year and fortnight out of NDVI_<month>_<year>_<range>.tif
+
+    The range is the day span extractor.py encodes, e.g. 01to15 (fortnight 1) or
+    16to31 (fortnight 2); names without a range count as the first fortnight.
+
+    Returns:
+        (month_num, year, fortnight) or None if the name does not follow the convention
+    """
+    if not file.endswith(".tif"):
+        return None
+    parts = file[:-len(".tif")].split("_")
+    if len(parts) < 3 or parts[1].lower()[:3] not in MONTH_NUMBERS:
+        return None
+    try:
+        year = int(parts[2])
+    except ValueError:
+        return None
+    try:
+        first_day = int(parts[3].lower().split("to")[0])
+    except (IndexError, ValueError):
+        first_day = 1
+    return MONTH_NUMBERS[parts[1].lower()[:3]], year, 1 if first_day < 16 else 2
+
+
+def parse_ndvi_filename(file):
+    """
+    Parse month and year out of NDVI_<month>_<year>_<range>.tif
+
+    Returns:
+        (month_num, year) or None if the name does not follow the convention
+    """
+    parsed = parse_ndvi_period(file)
+    return None if parsed is None else parsed[:2]
+
+
+def list_ndvi_rasters(ndvi_folder):
+    """
+    Sorted (file name, path) of every raster in the NDVI folder
+
+    Rasters indexed by `extractor.py --mode vsizip` are read in place from their zip archive.
+    """
+    rasters = {}
+    index_path = os.path.join(ndvi_folder, "vsizip_index.json")
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            rasters.update(json.load(f))
+    for file in os.listdir(ndvi_folder):
+        rasters[file] = os.path.join(ndvi_folder, file)
+    return sorted(rasters.items())
+
+
+def file_checksum(path):
+    """SHA-1 of a raster's bytes (of the archive member for /vsizip/ paths)"""
+    digest = hashlib.sha1()
+    if path.startswith("/vsizip/"):
+        archive_path, member = vsizip_parts(path)
+        archive = zipfile.ZipFile(archive_path)
+        f = archive.open(member)
+    else:
+        archive, f = None, open(path, "rb")
+    with f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    if archive is not None:
+        archive.close()
+    return digest.hexdigest()
+
+
+def describe_raster(name, path, period, stat):
+    """Catalog entry of one raster: file identity, parsed period, grid and checksum"""
+    month, year, fortnight = period
+    entry = {
+        "name": name, "path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+        "month": month, "year": year, "fortnight": fortnight,
+    }
+    with rasterio.open(path) as src:
+        entry.update(
+            crs=src.crs.to_string() if src.crs is not None else None, bounds=list(src.bounds),
+            width=src.width, height=src.height,
+        )
+    entry["checksum"] = file_checksum(path)
+    return entry
+
+
+def period_index(year, month, fortnight):
+    """Position of a fortnight on a continuous time axis"""
+    return year * FORTNIGHTS_PER_YEAR + (month - 1) * 2 + fortnight - 1
+
+
+class RasterCatalog:
+    """
+    Persistent index of the NDVI rasters of a folder
+
+    One scan of the folder parses every name and records size, mtime, CRS, bounds and a
+    checksum; rasters whose size and mtime are unchanged since the last scan keep their
+    entry, so only new or changed files are opened and hashed. Names that do not parse,
+    rasters that cannot be opened, duplicated fortnights and fortnights missing between
+    the first and the last raster are reported instead of being skipped silently.
+
+    Use RasterCatalog.scan(ndvi_folder) to get an up-to-date catalog.
+    """
+
+    def __init__(self, entries, unparsed=(), unreadable=None, path=None):
+        self.entries = sorted(entries, key=lambda e: e["name"])
+        self.unparsed = list(unparsed)
+        self.unreadable = dict(unreadable or {})
+        self.path = path
+        self._by_path = {e["path"]: e for e in self.entries}
+
+    @classmethod
+    def load(cls, path):
+        """Catalog stored at path, or None when there is none (or of another version)"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CATALOG_VERSION:
+            return None
+        return cls(data["rasters"], data["unparsed"], data["unreadable"], path)
+
+    @classmethod
+    def scan(cls, ndvi_folder, path=None):
+        """
+        Bring the catalog of a folder up to date and store it
+
+        Args:
+            ndvi_folder: Folder with NDVI_<month>_<year>_<range>.tif files
+            path: Catalog file (default: raster_catalog.json in the folder); a catalog that
+                cannot be written is still returned
+
+        Returns:
+            RasterCatalog
+        """
+        path = path or os.path.join(ndvi_folder, CATALOG_FILE)
+        previous = cls.load(path)
+        known = {} if previous is None else {e["name"]: e for e in previous.entries}
+        failed = {} if previous is None else previous.unreadable
+
+        entries, unparsed, unreadable = [], [], {}
+        for name, raster_path in list_ndvi_rasters(ndvi_folder):
+            period = parse_ndvi_period(name)
+            if period is None:
+                if name.lower().endswith(TIF_EXTENSIONS):
+                    unparsed.append(name)
+                continue
+            try:
+                stat = os.stat(source_file(raster_path))
+            except (OSError, ValueError) as err:
+                # === e.g. a vsizip_index.json entry whose archive was moved or deleted ===
+                unreadable[name] = {"path": raster_path, "size": None, "mtime_ns": None, "error": str(err)}
+                continue
+            identity = (raster_path, stat.st_size, stat.st_mtime_ns)
+            # === Unchanged files keep their entry (or their error) without being opened again ===
+            if name in failed and (failed[name]["path"], failed[name]["size"], failed[name]["mtime_ns"]) == identity:
+                unreadable[name] = failed[name]
+                continue
+            entry = known.get(name)
+            if entry is None or (entry["path"], entry["size"], entry["mtime_ns"]) != identity:
+                try:
+                    entry = describe_raster(name, raster_path, period, stat)
+                except (rasterio.errors.RasterioIOError, OSError, KeyError, zipfile.BadZipFile) as err:
+                    unreadable[name] = {"path": raster_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "error": str(err)}
+                    continue
+            entries.append(entry)
+
+        catalog = cls(entries, unparsed, unreadable, path)
+        if previous is None or (previous.entries, previous.unparsed, previous.unreadable) != \
+                (catalog.entries, catalog.unparsed, catalog.unreadable):
+            catalog.save()
+        return catalog
+
+    def save(self):
+        data = {"version": CATALOG_VERSION, "rasters": self.entries, "unparsed": self.unparsed, "unreadable": self.unreadable}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # read-only folder: the catalog is rebuilt on every scan
+
+    def __len__(self):
+        return len(self.entries)
+
+    def entry(self, path):
+        """Catalog entry of a raster path, None when the raster is not catalogued"""
+        return self._by_path.get(path)
+
+    def rasters(self, duplicates=False):
+        """
+        (path, (month, year, fortnight)) of the catalogued rasters, in file name order
+
+        Args:
+            duplicates: Keep byte-identical copies of a fortnight's raster (e.g. the _1 files
+                extractor.py writes on name collisions); by default only the first is listed
+        """
+        seen, rasters = set(), []
+        for e in self.entries:
+            key = (e["year"], e["month"], e["fortnight"], e["checksum"])
+            if duplicates or key not in seen:
+                seen.add(key)
+                rasters.append((e["path"], (e["month"], e["year"], e["fortnight"])))
+        return rasters
+
+    def duplicates(self):
+        """{(year, month, fortnight): [file names]} of the fortnights with more than one raster"""
+        groups = {}
+        for e in self.entries:
+            groups.setdefault((e["year"], e["month"], e["fortnight"]), []).append(e["name"])
+        return {period: names for period, names in sorted(groups.items()) if len(names) > 1}
+
+    def missing_periods(self):
+        """(year, month, fortnight) of every fortnight without a raster between the first and the last one"""
+        present = {period_index(e["year"], e["month"], e["fortnight"]) for e in self.entries}
+        if not present:
+            return []
+        missing = []
+        for t in range(min(present), max(present) + 1):
+            if t not in present:
+                year, f = divmod(t, FORTNIGHTS_PER_YEAR)
+                missing.append((year, f // 2 + 1, f % 2 + 1))
+        return missing
+
+    def report(self):
+        """One line per problem found in the folder (empty when there is none)"""
+        checksums = {e["name"]: e["checksum"] for e in self.entries}
+        lines = [f"not an NDVI_<month>_<year>_<range>.tif name, skipped: {name}" for name in self.unparsed]
+        lines += [f"cannot be read, skipped: {name} ({failure['error']})" for name, failure in sorted(self.unreadable.items())]
+        for (year, month, fortnight), names in self.duplicates().items():
+            kind = "identical copies, using the first" if len({checksums[n] for n in names}) == 1 else "different contents, using all"
+            lines.append(f"{year}-{month:02d} fortnight {fortnight} has {len(names)} rasters ({kind}): {', '.join(names)}")
+        missing = self.missing_periods()
+        if missing:
+            lines.append(f"{len(missing)} fortnights without a raster: {', '.join(f'{y}-{m:02d}/{f}' for y, m, f in missing)}")
+        crs = sorted({str(e["crs"]) for e in self.entries})
+        if len(crs) > 1:
+            lines.append(f"rasters in {len(crs)} different CRSs: {', '.join(crs)}")
+        return lines
+
+
+def main(argv=None, prog=None):
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Catalog the NDVI rasters of a folder and report skipped, duplicate and missing fortnights')
+    parser.add_argument('--ndvi', type=str, default=cfg.ndvi_folder, help='Path to folder with NDVI files')
+    parser.add_argument('--strict', action='store_true', help='Exit with status 1 when a problem is found')
+    args = parser.parse_args(argv)
+
+    catalog = RasterCatalog.scan(args.ndvi)
+    periods = {(e["year"], e["month"], e["fortnight"]) for e in catalog.entries}
+    print(f"{len(catalog)} rasters, {len(periods)} fortnights catalogued in {catalog.path}")
+    problems = catalog.report()
+    for line in problems:
+        print(f"  {line}")
+    if args.strict and problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
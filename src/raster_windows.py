@@ -0,0 +1,54 @@
+import math
+from rasterio.windows import Window
+
+
+def bounds_window(src, bounds):
+    """
+    Smallest pixel window of an open raster that covers the given bounds
+
+    Args:
+        src: Open rasterio dataset
+        bounds: (minx, miny, maxx, maxy) in the raster CRS
+
+    Returns:
+        rasterio Window clipped to the raster, or None if the bounds do not overlap it
+    """
+    minx, miny, maxx, maxy = bounds
+    inverse = ~src.transform
+    cols, rows = zip(*(inverse * (x, y) for x, y in [(minx, miny), (minx, maxy), (maxx, miny), (maxx, maxy)]))
+
+    col_start = max(0, math.floor(min(cols)))
+    row_start = max(0, math.floor(min(rows)))
+    col_stop = min(src.width, math.ceil(max(cols)))
+    row_stop = min(src.height, math.ceil(max(rows)))
+    if col_stop <= col_start or row_stop <= row_start:
+        return None
+    return Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+
+def iter_block_windows(src, window, band=1, min_rows=256):
+    """
+    Split a window into read windows aligned to the file's internal tiling
+
+    Striped files (one or a few rows per block) are grouped into blocks of at least
+    `min_rows` rows so that reads stay reasonably large.
+
+    Yields:
+        (read_window, row_offset, col_offset) where the offsets are relative to `window`
+    """
+    block_rows, block_cols = src.block_shapes[band - 1]
+    row_step = block_rows * max(1, min_rows // block_rows)
+    col_step = block_cols
+
+    row_start, col_start = int(window.row_off), int(window.col_off)
+    row_stop, col_stop = row_start + int(window.height), col_start + int(window.width)
+
+    row = (row_start // row_step) * row_step
+    while row < row_stop:
+        r0, r1 = max(row, row_start), min(row + row_step, row_stop)
+        col = (col_start // col_step) * col_step
+        while col < col_stop:
+            c0, c1 = max(col, col_start), min(col + col_step, col_stop)
+            yield Window(c0, r0, c1 - c0, r1 - r0), r0 - row_start, c0 - col_start
+            col += col_step
+        row += row_step
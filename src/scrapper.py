@@ -1,11 +1,26 @@
 import os
+import re
+import json
+import time
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 
 base_url = "https://bhuvan-app3.nrsc.gov.in/isroeodatadownloadutility/tiledownloadnew_cfr_new.php?f=ocm2_ndvi_filt_"
 times = ["01to15", "16to30", "16to31", "16to28"]
 months = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
 years = ["2012", "2013", "2014", "2015", "2016", "2017", "2018", "2019", "2020", "2021"]
 
+# === Download tuning ===
+CHUNK_SIZE = 1 << 20          # 1 MB reads/writes instead of 1 KB
+RETRIES = 4
+BACKOFF = 1.0                 # seconds, doubled after every failed attempt
+TIMEOUT = 60
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MANIFEST_FILE = "manifest.json"
+
 def is_leap_year(year):
     year = int(year)
     if (year%4 == 0):
@@ -13,40 +28,190 @@ def is_leap_year(year):
             return True
     return False
 
+# === Default download folder, created by download_all when the first download starts ===
 folder = "data/downloads"
-os.makedirs(folder, exist_ok=True)
 
-def scrapper_req(time_list, month, years_list=None):
+
+def month_times(month):
+    """Fortnight ranges published for a month (February's second half depends on the year)"""
+    if month in ["jan", "mar", "may", "jul", "aug", "oct", "dec"]:
+        return ["01to15", "16to31"]
+    elif month in ["apr", "jun", "sep", "nov"]:
+        return ["01to15", "16to30"]
+    else:  # Only "feb"
+        return ["01to15", "16to28"]
+
+
+def download_tasks(time_list, month, years_list=None):
+    """(url, filename) of every tile of a month over the given years"""
     if years_list is None:
         years_list = years
+    tasks = []
     for year in years_list:
         current_times = time_list.copy()
         if is_leap_year(year) and month == "feb":
             current_times = ["01to15", "16to29"]  # Only February changes for leap years
-        for time in current_times:
-            url = f"{base_url}{time}_{month}{year}_v01_01.zip&se=OCM2&u=Arush01"
-            response = requests.get(url, stream=True)
-            filename = f"{time}+{month}_{year}.zip"
-            filepath = os.path.join(folder, filename)
-            if response.status_code == 200:
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=1024):
-                        if chunk:
-                            f.write(chunk)
-                print(f"Download completed: {filepath}")
-            else:
-                print(f"Failed to download. Status code: {response.status_code}")
+        for time_range in current_times:
+            url = f"{base_url}{time_range}_{month}{year}_v01_01.zip&se=OCM2&u=Arush01"
+            tasks.append((url, f"{time_range}+{month}_{year}.zip"))
+    return tasks
 
-if __name__ == "__main__":
-    for month in months:
-        if month in ["jan", "mar", "may", "jul", "aug", "oct", "dec"]:
-            scrapper_req(["01to15", "16to31"], month)
-        elif month in ["apr", "jun", "sep", "nov"]:
-            scrapper_req(["01to15", "16to30"], month)
-        else:  # Only "feb"
-            scrapper_req(["01to15", "16to28"], month)
 
+class DownloadManifest:
+    """
+    JSON record of completed downloads (filename -> url and size), shared by the download threads
+
+    A file counts as complete only if it is in the manifest and still has the recorded size.
+    """
+
+    def __init__(self, download_folder):
+        self.path = os.path.join(download_folder, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def is_complete(self, filepath):
+        entry = self.entries.get(os.path.basename(filepath))
+        return entry is not None and os.path.exists(filepath) and os.path.getsize(filepath) == entry["size"]
+
+    def record(self, filepath, url):
+        with self.lock:
+            self.entries[os.path.basename(filepath)] = {"url": url, "size": os.path.getsize(filepath)}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp, self.path)
+
+
+def build_session(pool_size=8):
+    """requests.Session with a connection pool large enough for pool_size concurrent downloads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def download_file(session, url, filepath, retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+    """
+    Download url to filepath, resuming a partial <filepath>.part with an HTTP Range request
+
+    Connection errors and 429/5xx responses are retried with exponential backoff; other
+    error statuses fail immediately.
+
+    Returns:
+        (ok, status_code) where status_code is None if the server was never reached
+    """
+    partial = f"{filepath}.part"
+    status = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            response = session.get(url, stream=True, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            continue
+
+        try:
+            status = response.status_code
+            if status == 416 and offset:
+                # === Range starts at the end of the file: complete if the partial has the announced size ===
+                if _unsatisfiable_range_total(response) == offset:
+                    os.replace(partial, filepath)
+                    return True, status
+                # === Larger than the remote file (or size unknown): restart from zero ===
+                os.remove(partial)
+                continue
+            if status not in (200, 206):
+                if status in RETRY_STATUS:
+                    continue
+                return False, status
 
+            # === 206 continues the partial file, 200 means the server ignored the range ===
+            mode = "ab" if status == 206 else "wb"
+            with open(partial, mode, buffering=CHUNK_SIZE) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+        except requests.RequestException:
+            continue
+        finally:
+            response.close()
 
-        
-    
+        expected = _expected_size(response, offset if status == 206 else 0)
+        if expected is not None and os.path.getsize(partial) != expected:
+            continue
+        os.replace(partial, filepath)
+        return True, status
+    return False, status
+
+
+def _unsatisfiable_range_total(response):
+    """Remote file size from the Content-Range: bytes */<size> header of a 416 response, or None"""
+    match = re.fullmatch(r"bytes \*/(\d+)", response.headers.get("Content-Range", "").strip())
+    return int(match.group(1)) if match else None
+
+
+def _expected_size(response, offset):
+    """Final file size announced by the server, or None if it cannot be checked"""
+    length = response.headers.get("Content-Length")
+    if response.headers.get("Content-Encoding") or not str(length).isdigit():
+        return None
+    return offset + int(length)
+
+
+def download_all(tasks, download_folder=None, workers=4, session=None, retries=RETRIES, backoff=BACKOFF):
+    """
+    Download (url, filename) tasks with bounded concurrency, skipping files the manifest marks complete
+
+    Returns:
+        dict filename -> (ok, status_code); skipped files report (True, None)
+    """
+    download_folder = folder if download_folder is None else download_folder
+    os.makedirs(download_folder, exist_ok=True)
+    manifest = DownloadManifest(download_folder)
+    session = build_session(pool_size=workers) if session is None else session
+
+    def run(task):
+        url, filename = task
+        filepath = os.path.join(download_folder, filename)
+        if manifest.is_complete(filepath):
+            print(f"Already downloaded: {filepath}")
+            return filename, (True, None)
+        ok, status = download_file(session, url, filepath, retries=retries, backoff=backoff)
+        if ok:
+            manifest.record(filepath, url)
+            print(f"Download completed: {filepath}")
+        else:
+            print(f"Failed to download. Status code: {status}")
+        return filename, (ok, status)
+
+    if workers <= 1:
+        return dict(run(task) for task in tasks)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(run, tasks))
+
+
+def scrapper_req(time_list, month, years_list=None, download_folder=None, workers=1, session=None):
+    return download_all(download_tasks(time_list, month, years_list), download_folder, workers=workers, session=session)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Download OCM2 NDVI tiles')
+    parser.add_argument('--workers', type=int, default=4, help='Number of concurrent downloads')
+    parser.add_argument('--output', type=str, default=folder, help='Download folder')
+    args = parser.parse_args(argv)
+
+    all_tasks = []
+    for month in months:
+        all_tasks.extend(download_tasks(month_times(month), month))
+    download_all(all_tasks, args.output, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
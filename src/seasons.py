@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+
+# === Seasons, in the (alphabetical) order the yearly CSVs have always been sorted by ===
+SEASONS = ["Kharif", "Other", "Rabi"]
+SEASON_DTYPE = pd.CategoricalDtype(SEASONS)
+
+# === Season code per month: index 0 is unused, 1..12 are Jan..Dec ===
+#     Kharif: Jun-Oct, Rabi: Nov-Apr, Other: May
+SEASON_CODE_BY_MONTH = np.array([1, 2, 2, 2, 2, 1, 0, 0, 0, 0, 0, 2, 2], dtype=np.int8)
+
+
+def get_season(month):
+    return SEASONS[SEASON_CODE_BY_MONTH[month]]
+
+
+def season_of(months):
+    """
+    Vectorized get_season: lookup-table mapping of a month column to a categorical season column
+    """
+    codes = SEASON_CODE_BY_MONTH[np.asarray(months, dtype=np.intp)]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, dtype=SEASON_DTYPE),
+        index=getattr(months, "index", None)
+    )
+
+
+def crops_column(seasons, season_crops):
+    """
+    Categorical crop column for a season column
+
+    Args:
+        seasons: Season column (categorical or plain strings)
+        season_crops: {season: [crop codes]} of one state
+
+    Returns:
+        Categorical of the crop lists as they are written to CSV, e.g. "['CO', 'SB']"
+    """
+    seasons = seasons.astype(SEASON_DTYPE)
+    labels = [str(list(season_crops.get(season, []))) for season in SEASONS]
+    categories = list(dict.fromkeys(labels))
+    lookup = np.array([categories.index(label) for label in labels] + [-1], dtype=np.int8)
+    codes = lookup[seasons.cat.codes.to_numpy()]  # code -1 (missing season) maps to -1
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=seasons.index)
@@ -0,0 +1,466 @@
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from analysis_store import load_analysis, source_signature
+from climate_bins import BIN_FACETS, bin_ndvi, bin_width, top_cells
+from config import Configuration
+from district_geometry import load_districts
+from ingest import STATE_REGISTRY, ingest_states
+from instrumentation import enable, read_trace
+from ndvi import ndvi_rasters
+from ndvi_cube import INDEX_FILE as CUBE_INDEX_FILE, NdviCube
+from ndvi_maps import draw_map
+
+
+# === Options an ingestion job may set (everything else comes from the service) ===
+JOB_OPTIONS = {
+    "ndvi", "workers", "cache_dir", "parquet_dir", "streaming", "degree_day_base", "heat_threshold",
+    "write_csv", "ndvi_stats", "stress_threshold",
+}
+# === Stages reported by the job progress endpoint, in pipeline order ===
+JOB_STAGES = ["ingest.load_districts", "ndvi.reduce", "ingest.write_cube", "ingest.merge", "ingest.write_store", "ingest.write_csv"]
+# === /map.png resolution bounds: the dpi query value is clamped to them ===
+MAP_DPI_RANGE = (10, 300)
+STATUS_TEXT = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _param(query, name, cast=str, default=None, required=False):
+    """Single query string value converted with cast; HttpError 400 when missing or malformed"""
+    if name not in query:
+        if required:
+            raise HttpError(400, f"Missing query parameter {name!r}")
+        return default
+    try:
+        return cast(query[name][-1])
+    except ValueError:
+        raise HttpError(400, f"Invalid value for {name!r}: {query[name][-1]!r}") from None
+
+
+def _list_param(query, name, cast=str):
+    """Comma separated and / or repeated query parameter as a list, None when absent"""
+    if name not in query:
+        return None
+    try:
+        return [cast(v) for value in query[name] for v in value.split(",") if v]
+    except ValueError:
+        raise HttpError(400, f"Invalid value for {name!r}") from None
+
+
+def _records(df):
+    """JSON-ready list of row dicts (NaN -> null, numpy scalars -> Python)"""
+    return json.loads(df.to_json(orient="records"))
+
+
+class AnalysisService:
+    """
+    Warm, in-memory view of the pipeline output shared by all requests
+
+    The analysis store, the district outlines and the NDVI cube are loaded once and
+    reloaded only when their files change; rendered responses are kept in an LRU cache
+    keyed on the request and the data signature.
+
+    Args:
+        store_dir: Analysis store written by ingestion
+        states: {code: StateSpec} the service knows (default: ingest.STATE_REGISTRY)
+        cube_dir: Fortnight NDVI cube (optional, /cube answers 404 without it)
+        geometry_cache: Folder of the prepared district geometry cache
+        cache_size: Number of responses kept
+    """
+
+    def __init__(self, store_dir, states=None, cube_dir=None, geometry_cache=None, cache_size=256):
+        self.store_dir = store_dir
+        self.states = dict(STATE_REGISTRY) if states is None else dict(states)
+        self.cube_dir = cube_dir
+        self.geometry_cache = geometry_cache
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._frame = (None, None)
+        self._cube = (None, None)
+        self._districts = {}
+        self._responses = OrderedDict()
+
+    # === Warm data ===
+
+    def _cube_signature(self):
+        path = os.path.join(self.cube_dir, CUBE_INDEX_FILE) if self.cube_dir else None
+        return os.stat(path).st_mtime_ns if path and os.path.exists(path) else None
+
+    def signature(self):
+        """Changes whenever the store or the cube is rewritten"""
+        store = source_signature(self.store_dir) if os.path.isdir(self.store_dir) else ()
+        return store, self._cube_signature()
+
+    def analysis(self):
+        with self._lock:
+            signature = source_signature(self.store_dir) if os.path.isdir(self.store_dir) else ()
+            if self._frame[0] != signature:
+                if not signature:
+                    raise HttpError(404, f"No analysis store at {self.store_dir}")
+                df = load_analysis(self.store_dir)
+                for column in ("state", "district", "season"):
+                    df[column] = df[column].astype("category")
+                self._frame = (signature, df)
+            return self._frame[1]
+
+    def cube(self):
+        with self._lock:
+            signature = self._cube_signature()
+            if signature is None:
+                raise HttpError(404, "No NDVI cube")
+            if self._cube[0] != signature:
+                self._cube = (signature, NdviCube(self.cube_dir))
+            return self._cube[1]
+
+    def districts(self, code):
+        with self._lock:
+            if code not in self.states:
+                raise HttpError(404, f"Unknown state {code!r}")
+            if code not in self._districts:
+                gdf = load_districts(self.states[code].shape_file, "map", self.geometry_cache)
+                self._districts[code] = gdf[["district", "geometry"]].reset_index(drop=True)
+            return self._districts[code]
+
+    # === Response cache ===
+
+    def cached(self, route, query, render):
+        """(content_type, body) of a GET request, rendered once per request and data version"""
+        key = (route, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+        signature = self.signature()
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None and entry[0] == signature:
+                self._responses.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        response = render(query)
+        with self._lock:
+            self._responses[key] = (signature, response)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.cache_size:
+                self._responses.popitem(last=False)
+        return response
+
+    def clear_cache(self):
+        with self._lock:
+            self._responses.clear()
+
+    # === Queries ===
+
+    def _filtered(self, query):
+        df = self.analysis()
+        for column, values in [
+            ("state", _list_param(query, "state")), ("district", _list_param(query, "district", str.lower)),
+            ("season", _list_param(query, "season")), ("year", _list_param(query, "year", int)),
+        ]:
+            if values is not None:
+                df = df[df[column].isin(values)]
+        return df
+
+    def timeseries(self, query):
+        """Monthly rows of the selected districts / seasons / years, sorted by district and time"""
+        columns = _list_param(query, "column") or ["mean_ndvi"]
+        df = self._filtered(query)
+        unknown = [c for c in columns if c not in df.columns]
+        if unknown:
+            raise HttpError(400, f"Unknown columns {unknown}")
+        df = df[["state", "district", "season", "year", "month", *columns]]
+        df = df.sort_values(["state", "district", "year", "month"])
+        return "application/json", json.dumps({"rows": _records(df.astype({"state": str, "district": str, "season": str}))})
+
+    def bins(self, query):
+        """Mean NDVI per temperature x rainfall cell plus the top cells (see climate_bins)"""
+        facet = _param(query, "facet")
+        if facet is not None and facet not in BIN_FACETS:
+            raise HttpError(400, f"facet must be one of {list(BIN_FACETS)}")
+        df = self._filtered(query)
+        cells = bin_ndvi(
+            df.astype({"state": str, "season": str}), temp_width=_param(query, "temp_bin", bin_width, 1.0),
+            rain_width=_param(query, "rain_bin", bin_width, 10.0), facet=facet
+        )
+        top = top_cells(cells, k=_param(query, "top_k", int, 5), min_count=_param(query, "min_count", int, 1), facet=facet)
+        return "application/json", json.dumps({"cells": _records(cells), "top": _records(top)})
+
+    def map_png(self, query):
+        """PNG choropleth of the mean NDVI of one state and year"""
+        code = _param(query, "state", required=True)
+        year = _param(query, "year", int, required=True)
+        districts = self.districts(code)
+        df = self.analysis()
+        df = df[(df["state"] == code) & (df["year"] == year)]
+        if df.empty:
+            raise HttpError(404, f"No data for {code} {year}")
+        values = df.groupby("district", observed=True)["mean_ndvi"].mean().reindex(districts["district"]) * 255
+        fig = draw_map(districts, values.to_numpy(), f"Average NDVI - {year}")
+        dpi = min(max(_param(query, "dpi", int, 100), MAP_DPI_RANGE[0]), MAP_DPI_RANGE[1])
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        return "image/png", buffer.getvalue()
+
+    def cube_series(self, query):
+        """Fortnight NDVI series of one district with its rolling anomaly"""
+        cube = self.cube()
+        variable = _param(query, "variable", default="mean_ndvi")
+        try:
+            row = cube.district_rows([_param(query, "district", required=True)], _param(query, "state"))[0]
+            values = cube.array(variable)[row]
+        except KeyError as err:
+            raise HttpError(404, str(err.args[0])) from None
+        anomalies = cube.anomalies(variable, window=_param(query, "window", int, 1))[row]
+        periods = [cube.period(t) for t in range(values.shape[0])]
+        as_list = lambda a: [None if np.isnan(v) else round(float(v), 6) for v in a]
+        return "application/json", json.dumps({"periods": periods, variable: as_list(values), "anomaly": as_list(anomalies)})
+
+
+def _run_ingest_job(trace_file, specs, options, store_dir, cube_dir, geometry_cache):
+    """Ingestion job body, run in a pool process; progress is read back from its trace file"""
+    enable(trace_file)
+    options = dict(options)
+    ndvi = options.pop("ndvi")
+    ingest_states(specs, ndvi, store_dir=store_dir, cube_dir=cube_dir, geometry_cache=geometry_cache,
+                  write_csv=options.pop("write_csv", False), **options)
+
+
+class JobManager:
+    """
+    Ingestion jobs in a background process pool
+
+    Every job traces to its own JSON-lines file (see instrumentation), which the status
+    endpoint reads to report the finished stages and the number of rasters reduced. The
+    pool processes are spawned, not forked: the server already runs the event loop and the
+    asyncio.to_thread workers when the first job starts.
+    """
+
+    def __init__(self, service, workers=1, jobs_dir=None, ndvi_folder=None):
+        self.service = service
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.jobs_dir = jobs_dir or tempfile.mkdtemp(prefix="agri-jobs-")
+        self.ndvi_folder = ndvi_folder or Configuration().ndvi_folder
+        self.jobs = {}
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    async def submit(self, request):
+        if not isinstance(request, dict) or not isinstance(request.get("states", []), list) \
+                or not all(isinstance(code, str) for code in request.get("states", [])) \
+                or not isinstance(request.get("options", {}), dict):
+            raise HttpError(400, 'Expected {"states": [...], "options": {...}}')
+        states = request.get("states") or list(self.service.states)
+        unknown_states = [code for code in states if code not in self.service.states]
+        unknown_options = set(request.get("options", {})) - JOB_OPTIONS
+        if unknown_states or unknown_options:
+            raise HttpError(400, f"Unknown states {unknown_states} / options {sorted(unknown_options)}")
+        options = {"ndvi": self.ndvi_folder, **request.get("options", {})}
+        if not isinstance(options["ndvi"], str) or not os.path.isdir(options["ndvi"]):
+            raise HttpError(400, f"No NDVI folder {options['ndvi']!r}")
+        # === The first scan of a folder checksums every raster: off the event loop ===
+        rasters_total = len(await asyncio.to_thread(ndvi_rasters, options["ndvi"]))
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id, "kind": "ingest", "states": states, "status": "queued", "error": None,
+            "submitted": time.time(), "finished": None, "rasters_total": rasters_total,
+            "trace": os.path.join(self.jobs_dir, f"{job_id}.jsonl"),
+        }
+        self.jobs[job_id] = job
+        future = asyncio.get_running_loop().run_in_executor(
+            self.pool, _run_ingest_job, job["trace"], [self.service.states[code] for code in states], options,
+            self.service.store_dir, self.service.cube_dir, self.service.geometry_cache
+        )
+        future.add_done_callback(lambda f: self._finished(job, f))
+        return self.status(job_id)
+
+    def _finished(self, job, future):
+        job["finished"] = time.time()
+        error = future.exception()
+        job["status"] = "failed" if error is not None else "done"
+        job["error"] = None if error is None else f"{type(error).__name__}: {error}"
+        self.service.clear_cache()
+
+    def status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HttpError(404, f"Unknown job {job_id!r}")
+        events = read_trace(job["trace"]) if os.path.exists(job["trace"]) else []
+        names = [event["name"] for event in events]
+        status = job["status"]
+        if status == "queued" and events:
+            status = "running"
+        rasters_done = job["rasters_total"] if "ndvi.reduce" in names else \
+            sum(name in ("ndvi.raster", "ndvi.stack") for name in names)
+        return {
+            "id": job["id"], "kind": job["kind"], "states": job["states"], "status": status, "error": job["error"],
+            "stages": [stage for stage in JOB_STAGES if stage in names],
+            "rasters_done": rasters_done, "rasters_total": job["rasters_total"],
+            "states_written": names.count("ingest.write_store"),
+            "seconds": round((job["finished"] or time.time()) - job["submitted"], 3),
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class JobServer:
+    """
+    Minimal asyncio HTTP/1.1 server (one request per connection) in front of the service
+
+    GET  /health, /stats
+    GET  /timeseries?state=&district=&season=&year=&column=
+    GET  /bins?temp_bin=&rain_bin=&facet=&top_k=&min_count= (+ the /timeseries filters)
+    GET  /map.png?state=&year=&dpi=
+    GET  /cube?district=&state=&variable=&window=
+    POST /jobs/ingest  {"states": [...], "options": {...}}
+    GET  /jobs, /jobs/<id>
+
+    Queries run in a thread so the event loop keeps accepting connections; ingestion runs
+    in the JobManager's process pool.
+    """
+
+    def __init__(self, service, jobs, host="127.0.0.1", port=8765):
+        self.service = service
+        self.jobs = jobs
+        self.host = host
+        self.port = port
+        self._server = None
+        self._routes = {
+            "/timeseries": service.timeseries, "/bins": service.bins,
+            "/map.png": service.map_png, "/cube": service.cube_series,
+        }
+
+    async def start(self):
+        """Start listening; port 0 picks a free port. Returns the (host, port) bound"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        if path == "/health":
+            return 200, "application/json", json.dumps({"status": "ok"})
+        if path == "/stats":
+            stats = {"cache_hits": self.service.hits, "cache_misses": self.service.misses, "jobs": len(self.jobs.jobs)}
+            return 200, "application/json", json.dumps(stats)
+        if path in self._routes:
+            if method != "GET":
+                raise HttpError(405, f"{method} not allowed on {path}")
+            render = self._routes[path]
+            content_type, payload = await asyncio.to_thread(self.service.cached, path, query, render)
+            return 200, content_type, payload
+        if path == "/jobs/ingest":
+            if method != "POST":
+                raise HttpError(405, "Submit ingestion jobs with POST")
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "Request body is not JSON") from None
+            return 202, "application/json", json.dumps(await self.jobs.submit(request))
+        if path == "/jobs":
+            return 200, "application/json", json.dumps([self.jobs.status(job_id) for job_id in self.jobs.jobs])
+        if path.startswith("/jobs/"):
+            return 200, "application/json", json.dumps(self.jobs.status(path[len("/jobs/"):]))
+        raise HttpError(404, f"No route {path}")
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                length = int(headers.get("content-length") or 0)
+                if length < 0:
+                    raise ValueError(length)
+                body = await reader.readexactly(length)
+            except ValueError:
+                raise HttpError(400, f"Invalid Content-Length {headers['content-length']!r}") from None
+            except asyncio.IncompleteReadError as err:
+                raise HttpError(400, f"Body shorter than its Content-Length ({len(err.partial)} of {length} bytes)") from None
+            try:
+                method, target, _ = request_line.split(" ", 2)
+            except ValueError:
+                raise HttpError(400, f"Malformed request line {request_line!r}") from None
+            status, content_type, payload = await self._dispatch(method, target, body)
+        except HttpError as err:
+            status, content_type, payload = err.status, "application/json", json.dumps({"error": err.message})
+        except Exception as err:
+            status, content_type, payload = 500, "application/json", json.dumps({"error": f"{type(err).__name__}: {err}"})
+
+        payload = payload.encode() if isinstance(payload, str) else payload
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def main(argv=None, prog=None):
+    cfg = Configuration()
+
+    parser = argparse.ArgumentParser(prog=prog, description='Local HTTP service for queries on the ingested data and background ingestion jobs')
+    parser.add_argument('--host', type=str, default="127.0.0.1", help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=1, help='Processes running ingestion jobs')
+    parser.add_argument('--store_dir', type=str, default=cfg.analysis_store, help='Analysis store to serve and to ingest into')
+    parser.add_argument('--cube_dir', type=str, default=cfg.ndvi_cube_folder, help='Fortnight NDVI cube to serve and to write')
+    parser.add_argument('--ndvi', type=str, default=cfg.ndvi_folder, help='Default NDVI folder of ingestion jobs')
+    parser.add_argument('--geometry_cache', type=str, default=cfg.geometry_cache_folder, help='Folder of the prepared district geometry cache')
+    args = parser.parse_args(argv)
+
+    service = AnalysisService(args.store_dir, cube_dir=args.cube_dir, geometry_cache=args.geometry_cache)
+    jobs = JobManager(service, workers=args.workers, ndvi_folder=args.ndvi)
+    server = JobServer(service, jobs, args.host, args.port)
+
+    async def run():
+        host, port = await server.start()
+        print(f"Serving on http://{host}:{port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        jobs.shutdown()
+
+
+if __name__ == "__main__":
+    main()
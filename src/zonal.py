@@ -0,0 +1,210 @@
+import hashlib
+import numpy as np
+from rasterio import features
+
+
+# === Label grids are cached per (geometries, transform, shape, crs) ===
+_label_cache = {}
+
+
+def geometry_key(geometries):
+    """
+    Stable hash of a sequence of shapely geometries (used as a cache key)
+
+    Args:
+        geometries: GeoSeries / iterable of shapely geometries
+    """
+    digest = hashlib.sha1()
+    for geom in geometries:
+        digest.update(b"" if geom is None else geom.wkb)
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+def rasterize_zones(geometries, transform, shape, crs=None, geom_key=None):
+    """
+    Rasterize district polygons once into an integer label grid
+
+    Pixel value 0 means "outside every district" and i + 1 means the i-th geometry.
+    Like rasterstats, a pixel belongs to a polygon when its centre falls inside it.
+
+    Args:
+        geometries: GeoSeries / list of shapely geometries (one per district)
+        transform: Affine transform of the raster grid
+        shape: (rows, cols) of the raster grid
+        crs: CRS of the raster, only used as part of the cache key
+        geom_key: Precomputed geometry_key(geometries), avoids rehashing per raster
+    """
+    geometries = list(geometries)
+    if geom_key is None:
+        geom_key = geometry_key(geometries)
+    key = (geom_key, _transform_key(transform), tuple(shape), str(crs))
+
+    labels = _label_cache.get(key)
+    if labels is None:
+        dtype = "uint16" if len(geometries) < np.iinfo(np.uint16).max else "int32"
+        shapes = [
+            (geom, i + 1) for i, geom in enumerate(geometries)
+            if geom is not None and not geom.is_empty
+        ]
+        if shapes:
+            labels = features.rasterize(
+                shapes, out_shape=tuple(shape), transform=transform, fill=0, dtype=dtype
+            )
+        else:
+            labels = np.zeros(tuple(shape), dtype=dtype)
+        labels.setflags(write=False)
+        _label_cache[key] = labels
+    return labels
+
+
+def _transform_key(transform):
+    return (transform.a, transform.b, transform.c, transform.d, transform.e, transform.f)
+
+
+def clear_label_cache():
+    _label_cache.clear()
+
+
+class ZonalAccumulator:
+    """
+    Running per-zone count / sum / min / max that can be fed a raster block by block
+
+    Args:
+        n_zones: Number of zones (districts)
+        extended: Also track sums of squares and in-zone pixel counts (std, valid_fraction)
+        histogram_bins: Also keep a fixed-bin histogram per zone (percentiles, share_below)
+        histogram_range: (low, high) value range of the histogram; values outside go to the end bins
+    """
+
+    def __init__(self, n_zones, extended=False, histogram_bins=None, histogram_range=None):
+        self.n_zones = n_zones
+        self.count = np.zeros(n_zones + 1, dtype=np.int64)
+        self.total = np.zeros(n_zones + 1, dtype=np.float64)
+        self.vmin = np.full(n_zones + 1, np.inf)
+        self.vmax = np.full(n_zones + 1, -np.inf)
+
+        self.extended = extended
+        if extended:
+            self.total_sq = np.zeros(n_zones + 1, dtype=np.float64)
+            self.zone_pixels = np.zeros(n_zones + 1, dtype=np.int64)
+
+        self.hist = None
+        if histogram_bins:
+            low, high = histogram_range
+            self.bins = int(histogram_bins)
+            self.edges = np.linspace(low, high, self.bins + 1)
+            self._bin_scale = self.bins / (high - low)
+            self.hist = np.zeros((n_zones + 1) * self.bins, dtype=np.int64)
+
+    def update(self, values, labels, nodata=None):
+        """
+        Add one block of pixels; values and labels must have the same shape
+
+        Only the valid, in-zone pixels are ever converted to float64, so the block itself
+        can stay in its native dtype (e.g. uint8 for OCM2 NDVI).
+        """
+        in_zone = labels > 0
+        mask = in_zone.copy() if self.extended else in_zone
+        if nodata is not None:
+            mask &= values != nodata
+        if values.dtype.kind == "f":
+            mask &= ~np.isnan(values)
+
+        size = self.n_zones + 1
+        if self.extended:
+            self.zone_pixels += np.bincount(labels[in_zone].astype(np.intp), minlength=size)
+
+        idx = labels[mask].astype(np.intp)
+        if idx.size == 0:
+            return
+        vals = values[mask].astype(np.float64)
+
+        self.count += np.bincount(idx, minlength=size)
+        self.total += np.bincount(idx, weights=vals, minlength=size)
+        np.minimum.at(self.vmin, idx, vals)
+        np.maximum.at(self.vmax, idx, vals)
+        if self.extended:
+            self.total_sq += np.bincount(idx, weights=vals * vals, minlength=size)
+        if self.hist is not None:
+            # === 2-D (zone, bin) histogram as one flat bincount ===
+            bin_idx = np.clip(((vals - self.edges[0]) * self._bin_scale).astype(np.intp), 0, self.bins - 1)
+            self.hist += np.bincount(idx * self.bins + bin_idx, minlength=size * self.bins)
+
+    def result(self):
+        """
+        Returns:
+            dict of 1D float64 arrays of length n_zones; zones without valid pixels get NaN
+            (count is 0 for them). With extended=True also std (population) and
+            valid_fraction (valid / all in-zone pixels).
+        """
+        count = self.count[1:].copy()
+        empty = count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.total[1:] / count
+        vmin = self.vmin[1:].copy()
+        vmax = self.vmax[1:].copy()
+        mean[empty] = np.nan
+        vmin[empty] = np.nan
+        vmax[empty] = np.nan
+        result = {"count": count, "sum": self.total[1:].copy(), "mean": mean, "min": vmin, "max": vmax}
+
+        if self.extended:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                variance = np.maximum(self.total_sq[1:] / count - mean * mean, 0.0)
+                valid_fraction = count / self.zone_pixels[1:]
+            result["std"] = np.sqrt(variance)
+            result["valid_fraction"] = np.where(self.zone_pixels[1:] > 0, valid_fraction, np.nan)
+        return result
+
+    def _histogram(self):
+        if self.hist is None:
+            raise ValueError("ZonalAccumulator was created without histogram_bins")
+        return self.hist.reshape(self.n_zones + 1, self.bins)[1:]
+
+    def percentile(self, q):
+        """
+        Per-zone q-th percentile (0-100) read from the histogram, without sorting any pixels
+
+        With one bin per integer value (e.g. 256 bins over [0, 256) for uint8 data) this
+        equals numpy.percentile's default linear interpolation exactly; with wider bins each
+        value is represented by its bin's lower edge.
+        """
+        hist = self._histogram()
+        cumulative = np.cumsum(hist, axis=1)
+        count = cumulative[:, -1]
+        rank = q / 100.0 * np.maximum(count - 1, 0)
+        lower = np.floor(rank)
+        # === Bin holding the k-th smallest pixel: number of bins whose cumulative count is <= k ===
+        lower_bin = np.minimum((cumulative <= lower[:, None]).sum(axis=1), self.bins - 1)
+        upper_bin = np.minimum((cumulative <= np.minimum(lower + 1, np.maximum(count - 1, 0))[:, None]).sum(axis=1), self.bins - 1)
+        lower_value = self.edges[lower_bin]
+        value = lower_value + (rank - lower) * (self.edges[upper_bin] - lower_value)
+        return np.where(count > 0, value, np.nan)
+
+    def share_below(self, threshold):
+        """Per-zone share of valid pixels in bins that start below threshold (exact for one bin per integer value)"""
+        hist = self._histogram()
+        count = hist.sum(axis=1)
+        below = hist[:, self.edges[:-1] < threshold].sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, below / count, np.nan)
+
+
+def zonal_reduce(values, labels, n_zones, nodata=None):
+    """
+    Per-zone count / sum / mean / min / max of a raster in one vectorized pass
+
+    Args:
+        values: 2D array of pixel values
+        labels: Label grid from rasterize_zones (same shape as values)
+        n_zones: Number of zones (districts)
+        nodata: Pixel value to ignore (NaNs are always ignored)
+
+    Returns:
+        dict of 1D float64 arrays of length n_zones; zones without valid pixels get NaN
+        (count is 0 for them)
+    """
+    accumulator = ZonalAccumulator(n_zones)
+    accumulator.update(values, labels, nodata=nodata)
+    return accumulator.result()
@@ -0,0 +1,75 @@
+# test_analysis_store.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from analysis_store import is_analysis_store, load_analysis, write_analysis_store
+
+
+def merged_table(districts, years):
+    rows = [(d, m, y) for y in years for d in districts for m in (1, 7)]
+    df = pd.DataFrame(rows, columns=["district", "month", "year"])
+    df["district"] = df["district"].astype("category")
+    df["year"] = df["year"].astype("int16")
+    df["mean_ndvi"] = np.linspace(0.1, 0.9, len(df))
+    df["mean_temp"] = 25.0
+    df["state"] = "Maharashtra"
+    return df
+
+
+class TestAnalysisStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = os.path.join(self.test_dir, "analysis")
+        self.mh = merged_table(["pune", "nashik"], [2016, 2017])
+        self.mp = merged_table(["bhopal"], [2016])
+        write_analysis_store(self.mh, self.store, "MH")
+        write_analysis_store(self.mp, self.store, "MP")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_partitions_and_filters(self):
+        self.assertTrue(is_analysis_store(self.store))
+        self.assertTrue(os.path.exists(os.path.join(self.store, "state=MH", "year=2017", "part-0.parquet")))
+
+        df = load_analysis(self.store)
+        self.assertEqual(len(df), len(self.mh) + len(self.mp))
+        self.assertEqual(set(df["state"]), {"MH", "MP"})
+
+        df = load_analysis(self.store, columns=["district", "mean_ndvi"], states=["MH"], years=[2017], districts=["pune"])
+        self.assertEqual(list(df.columns), ["district", "mean_ndvi"])
+        expected = self.mh[(self.mh["year"] == 2017) & (self.mh["district"] == "pune")]["mean_ndvi"]
+        np.testing.assert_allclose(df["mean_ndvi"], expected)
+
+    def test_rewrite_replaces_state(self):
+        write_analysis_store(self.mh[self.mh["year"] == 2016], self.store, "MH")
+        df = load_analysis(self.store, columns=["year"], states=["MH"])
+        self.assertEqual(set(df["year"]), {2016})
+        self.assertEqual(len(load_analysis(self.store, states=["MP"])), len(self.mp))
+
+    def test_csv_folder_fallback(self):
+        folder = os.path.join(self.test_dir, "analysis_MH")
+        os.makedirs(folder)
+        for year, yearly_df in self.mh.groupby("year"):
+            yearly_df.to_csv(os.path.join(folder, f"climate_{year}.csv"), index=False)
+        self.assertFalse(is_analysis_store(folder))
+
+        df = load_analysis(folder, columns=["mean_ndvi"], years=[2016], districts=["nashik"])
+        self.assertEqual(list(df.columns), ["mean_ndvi"])
+        self.assertEqual(len(df), 2)
+
+    def test_missing_data_asks_for_ingestion(self):
+        for source in [os.path.join(self.test_dir, "nothing"), self.test_dir]:
+            with self.assertRaisesRegex(FileNotFoundError, "run the ingestion first"):
+                load_analysis(source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# test_cli.py
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+import agri
+
+
+def run_python(code, cwd):
+    """Run code in a fresh interpreter (so sys.modules starts empty), returning its stdout"""
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(SRC))
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True).stdout
+
+
+class TestAgriCli(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_no_heavy_imports_or_side_effects(self):
+        out = run_python(
+            "import sys, agri, scrapper, plot_graphs, visualize_mh\n"
+            "print(sorted(m for m in ('seaborn', 'matplotlib.pyplot', 'rasterio') if m in sys.modules))",
+            self.test_dir
+        )
+        self.assertEqual(out.strip(), "['matplotlib.pyplot']")  # plot_graphs itself needs pyplot
+        self.assertEqual(os.listdir(self.test_dir), [])  # no data/downloads folder on import
+
+        out = run_python("import sys, agri; print(sorted(m for m in ('pandas', 'numpy') if m in sys.modules))", self.test_dir)
+        self.assertEqual(out.strip(), "[]")
+
+        out = run_python(
+            "import sys, district_geometry, visualize_mh, visualize_mp\n"
+            "print(sorted(m for m in ('geopandas', 'pandas', 'matplotlib') if m in sys.modules))",
+            self.test_dir
+        )
+        self.assertEqual(out.strip(), "[]")
+
+    def test_usage_names_the_subcommand(self):
+        argv0, usage = sys.argv[0], StringIO()
+        with redirect_stdout(usage), self.assertRaises(SystemExit):
+            agri.main(["catalog", "--help"])
+        self.assertTrue(usage.getvalue().startswith("usage: agri catalog "))
+        self.assertEqual(sys.argv[0], argv0)
+
+    def test_dispatch_with_import_time(self):
+        source, target = os.path.join(self.test_dir, "downloads"), os.path.join(self.test_dir, "tif_files")
+        os.makedirs(source)
+        result = subprocess.run(
+            [sys.executable, os.path.join(SRC, "agri.py"), "--import_time", "extract", "--source", source, "--target", target],
+            capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("agri extract: startup", result.stderr)
+        self.assertIn("import extractor", result.stderr)
+        self.assertTrue(os.path.isdir(target))
+
+        with self.assertRaises(SystemExit):
+            agri.main(["unknown"])
+
+
+if __name__ == "__main__":
+    unittest.main()
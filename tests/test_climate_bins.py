@@ -0,0 +1,59 @@
+# test_climate_bins.py
+import os
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from climate_bins import bin_ndvi, top_cells
+
+
+class TestClimateBins(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        self.df = pd.DataFrame({
+            "state": rng.choice(["MH", "MP"], n),
+            "season": rng.choice(["Kharif", "Other", "Rabi"], n),
+            "year": rng.integers(2000, 2020, n),
+            "mean_ndvi": rng.random(n),
+            "mean_temp": rng.uniform(15, 40, n),
+            "mean_rainfall(mm)": rng.exponential(60, n),
+        })
+        self.df.loc[::50, "mean_temp"] = np.nan
+
+    def test_matches_groupby_on_floor_bins(self):
+        bins = bin_ndvi(self.df, temp_width=2.0, rain_width=25.0, facet="season")
+        df = self.df.dropna()
+        expected = df.groupby([
+            df["season"], np.floor(df["mean_temp"] / 2) * 2, np.floor(df["mean_rainfall(mm)"] / 25) * 25
+        ])["mean_ndvi"].agg(["mean", "size"])
+        self.assertEqual(len(bins), len(expected))  # only non-empty cells
+        np.testing.assert_allclose(bins["mean_ndvi"], expected["mean"])
+        np.testing.assert_array_equal(bins["count"], expected["size"])
+        np.testing.assert_allclose(bins["temp_high"] - bins["temp_low"], 2.0)
+        self.assertEqual(bins["count"].sum(), len(df))
+
+    def test_non_positive_widths_are_rejected(self):
+        for widths in [(0, 10.0), (1.0, -5), (float("nan"), 10.0)]:
+            with self.assertRaisesRegex(ValueError, "positive"):
+                bin_ndvi(self.df, *widths)
+
+    def test_top_cells_per_facet(self):
+        bins = bin_ndvi(self.df, facet="state")
+        top = top_cells(bins, k=3, min_count=2, facet="state")
+        self.assertEqual(list(top["state"]), ["MH"] * 3 + ["MP"] * 3)
+        self.assertTrue((top["count"] >= 2).all())
+        mh = bins[(bins["state"] == "MH") & (bins["count"] >= 2)]["mean_ndvi"].nlargest(3)
+        np.testing.assert_allclose(top["mean_ndvi"][:3], mh)
+
+        self.assertEqual(len(top_cells(bin_ndvi(self.df), k=5)), 5)
+        self.assertTrue(bin_ndvi(self.df.iloc[:0]).empty)
+        with self.assertRaises(ValueError):
+            bin_ndvi(self.df, facet="district")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# test_climate_data.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from climate_data import (
+    convert_climate_csv,
+    load_climate_table,
+    parquet_is_fresh,
+    read_climate_csv,
+    rename_districts
+)
+
+
+class TestClimateData(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        dates = pd.date_range("2015-12-25", "2016-01-05")
+        self.csv = os.path.join(self.test_dir, "MH_temperature.csv")
+        pd.DataFrame({
+            "date": np.tile(dates.strftime("%Y-%m-%d"), 2),
+            "District": ["PUNE"] * len(dates) + ["NASIK"] * len(dates),
+            "min": np.linspace(10, 20, 2 * len(dates)),
+            "max": np.linspace(30, 40, 2 * len(dates)),
+            "mean": np.linspace(20, 30, 2 * len(dates)),
+        }).to_csv(self.csv, index=False)
+        self.dataset = os.path.join(self.test_dir, "parquet", "temperature")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _sorted(self, df):
+        df = df.assign(District=df["District"].astype(str))
+        return df.sort_values(["District", "date"]).reset_index(drop=True)
+
+    def test_compact_dtypes(self):
+        df = read_climate_csv(self.csv)
+        self.assertIsInstance(df["District"].dtype, pd.CategoricalDtype)
+        self.assertEqual(df["month"].dtype, np.int8)
+        self.assertEqual(df["year"].dtype, np.int16)
+        self.assertEqual(df["mean"].dtype, np.float32)
+
+    def test_parquet_round_trip(self):
+        self.assertFalse(parquet_is_fresh(self.csv, self.dataset, "MH"))
+        convert_climate_csv(self.csv, self.dataset, "MH")
+        self.assertTrue(parquet_is_fresh(self.csv, self.dataset, "MH"))
+        self.assertTrue(os.path.isdir(os.path.join(self.dataset, "state=MH", "year=2016")))
+
+        from_parquet = load_climate_table(self.csv, self.dataset, "MH")
+        from_csv = load_climate_table(self.csv)
+        pd.testing.assert_frame_equal(self._sorted(from_parquet), self._sorted(from_csv))
+
+    def test_column_and_year_pushdown(self):
+        convert_climate_csv(self.csv, self.dataset, "MH")
+        df = load_climate_table(self.csv, self.dataset, "MH", columns=["mean"], years=[2016])
+        self.assertEqual(list(df.columns), ["date", "District", "mean", "month", "year"])
+        self.assertEqual(set(df["year"]), {2016})
+        self.assertEqual(len(df), 10)
+
+    def test_stale_parquet_falls_back_to_csv(self):
+        convert_climate_csv(self.csv, self.dataset, "MH")
+        with open(self.csv, "a") as f:
+            f.write("2016-01-06,PUNE,1.0,2.0,1.5\n")
+        self.assertFalse(parquet_is_fresh(self.csv, self.dataset, "MH"))
+        self.assertEqual(len(load_climate_table(self.csv, self.dataset, "MH")), 25)
+
+    def test_rename_districts_on_categories(self):
+        districts = read_climate_csv(self.csv)["District"]
+        renamed = rename_districts(districts, {"NASIK": "NASHIK"})
+        self.assertIn("NASHIK", renamed.cat.categories)
+        self.assertNotIn("NASIK", set(renamed))
+
+
+if __name__ == "__main__":
+    unittest.main()
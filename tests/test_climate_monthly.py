@@ -0,0 +1,71 @@
+# test_climate_monthly.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from climate_data import convert_climate_csv, read_climate_csv, rename_districts
+from climate_monthly import stream_monthly
+
+AGGREGATIONS = {"mean_temp": ("mean", "mean"), "min_temp": ("min", "min"), "max_temp": ("max", "max"), "days": ("mean", "count")}
+
+
+class TestStreamingMonthly(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        dates = pd.date_range("2015-11-20", "2016-02-10")
+        rng = np.random.default_rng(1)
+        n = 3 * len(dates)
+        mean = rng.random(n) * 10 + 20
+        mean[5] = np.nan
+        self.csv = os.path.join(self.test_dir, "MH_temperature.csv")
+        pd.DataFrame({
+            "date": np.tile(dates.strftime("%Y-%m-%d"), 3),
+            "District": np.repeat(["PUNE", "NASIK", "BEED"], len(dates)),
+            "min": mean - rng.random(n) * 5,
+            "max": mean + rng.random(n) * 5,
+            "mean": mean,
+        }).to_csv(self.csv, index=False)
+
+        daily = read_climate_csv(self.csv)
+        self.expected = daily.groupby(["District", "year", "month"], observed=True).agg(
+            mean_temp=("mean", "mean"), min_temp=("min", "min"), max_temp=("max", "max"), days=("mean", "count")
+        ).reset_index()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def assert_matches_in_memory(self, monthly):
+        monthly = monthly.assign(District=monthly["District"].astype(str))
+        expected = self.expected.assign(District=self.expected["District"].astype(str))
+        expected = expected.sort_values(["District", "year", "month"]).reset_index(drop=True)
+        self.assertEqual(len(monthly), 3 * 4)
+        pd.testing.assert_frame_equal(monthly, expected, check_dtype=False, rtol=1e-6)
+
+    def test_csv_chunks(self):
+        monthly = stream_monthly(self.csv, AGGREGATIONS, chunksize=17)
+        self.assertEqual(monthly["month"].dtype, np.int8)
+        self.assert_matches_in_memory(monthly)
+
+    def test_parquet_batches(self):
+        dataset = os.path.join(self.test_dir, "parquet", "temperature")
+        convert_climate_csv(self.csv, dataset, "MH")
+        self.assert_matches_in_memory(stream_monthly(self.csv, AGGREGATIONS, dataset, "MH", chunksize=25))
+
+    def test_prepare_merges_renamed_districts(self):
+        def prepare(chunk):
+            chunk["District"] = rename_districts(chunk["District"], {"NASIK": "PUNE"})
+            return chunk
+
+        monthly = stream_monthly(self.csv, {"days": ("mean", "count")}, prepare=prepare, chunksize=50)
+        self.assertEqual(set(monthly["District"]), {"PUNE", "BEED"})
+        self.assertEqual(monthly.loc[(monthly["District"] == "PUNE") & (monthly["month"] == 12), "days"].item(), 62)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# test_district_geometry.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import geopandas as gpd
+import shapely
+from shapely.geometry import Point
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from district_geometry import load_districts
+from zonal import geometry_key
+
+
+class TestDistrictGeometry(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.test_dir, "cache")
+        self.shape_file = os.path.join(self.test_dir, "MAHARASHTRA_DISTRICTS.geojson")
+        # === Detailed outlines: circles with many vertices ===
+        gpd.GeoDataFrame(
+            {"dtname": [" Pune ", "NASHIK"], "stname": ["Maharashtra ", "MAHARASHTRA"]},
+            geometry=[Point(73.5, 18.5).buffer(0.5, 256), Point(74.5, 19.5).buffer(0.5, 256)], crs="EPSG:4326"
+        ).to_file(self.shape_file, driver="GeoJSON")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_normalized_keys_and_levels(self):
+        exact = load_districts(self.shape_file)
+        self.assertEqual(list(exact["district"]), ["pune", "nashik"])
+        self.assertEqual(set(exact["stname"]), {"MAHARASHTRA"})
+        self.assertEqual(list(exact["dtname"]), [" Pune ", "NASHIK"])
+
+        vertices = {
+            level: shapely.get_num_coordinates(load_districts(self.shape_file, level).geometry.values).sum()
+            for level in ["exact", "map", "overview"]
+        }
+        self.assertGreater(vertices["exact"], vertices["map"])
+        self.assertGreater(vertices["map"], vertices["overview"])
+        with self.assertRaises(ValueError):
+            load_districts(self.shape_file, "tiny")
+
+    def test_cache_reuse_and_invalidation(self):
+        first = load_districts(self.shape_file, "map", self.cache)
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+
+        with patch.object(gpd, "read_file") as read_mock:
+            cached = load_districts(self.shape_file, "map", self.cache)
+            exact = load_districts(self.shape_file, "exact", self.cache)
+        read_mock.assert_not_called()
+        self.assertTrue(first.geometry.geom_equals_exact(cached.geometry, 0).all())
+        self.assertEqual(cached.crs, first.crs)
+
+        # === Exact outlines are bit-identical, so NDVI result cache keys stay valid ===
+        self.assertEqual(geometry_key(list(exact.geometry)), geometry_key(list(gpd.read_file(self.shape_file).geometry)))
+
+        # === A changed GeoJSON is prepared again and replaces its earlier entry; other GeoJSONs keep theirs ===
+        other = os.path.join(self.test_dir, "other", os.path.basename(self.shape_file))
+        os.makedirs(os.path.dirname(other))
+        shutil.copy(self.shape_file, other)
+        load_districts(other, "map", self.cache)
+        before = set(os.listdir(self.cache))
+        os.utime(self.shape_file, ns=(0, 0))
+        with patch.object(gpd, "read_file", wraps=gpd.read_file) as read_mock:
+            load_districts(self.shape_file, "map", self.cache)
+        self.assertEqual(read_mock.call_count, 1)
+        after = set(os.listdir(self.cache))
+        self.assertEqual(len(after), 2)
+        self.assertEqual(len(after - before), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# test_extractor.py
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import zipfile
+import numpy as np
+import geopandas as gpd
+import rasterio
+from affine import Affine
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from extractor import extract_tif_files, parse_source_name
+from ndvi import process_ndvi_folder
+from ndvi_cache import source_file
+from raster_catalog import RasterCatalog, list_ndvi_rasters
+
+
+def write_tif(path, value):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=20, width=20, count=1, dtype="uint8",
+        crs="EPSG:4326", transform=Affine(0.1, 0, 73.0, 0, -0.1, 19.0), nodata=255
+    ) as dst:
+        dst.write(np.full((20, 20), value, dtype="uint8"), 1)
+
+
+class TestExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.test_dir, "downloads")
+        self.target = os.path.join(self.test_dir, "tif_files")
+        os.makedirs(os.path.join(self.source, "16to31+jan_2016", "nested"))
+
+        tif = os.path.join(self.test_dir, "tile.tif")
+        write_tif(tif, 51)
+        for stem in ["01to15+jan_2016", "16to29+feb_2016"]:
+            with zipfile.ZipFile(os.path.join(self.source, f"{stem}.zip"), "w") as archive:
+                archive.write(tif, "ocm2/tile.tif")
+                archive.writestr("readme.txt", "not a raster")
+        with zipfile.ZipFile(os.path.join(self.source, "01to15+mar_2016.zip"), "w") as archive:
+            archive.write(tif, "a.tif")
+            write_tif(tif, 102)
+            archive.write(tif, "b.TIF")
+        write_tif(os.path.join(self.source, "16to31+jan_2016", "nested", "x.tif"), 153)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_source_name(self):
+        self.assertEqual(parse_source_name("01to15+apr_2019"), ("01to15", "apr", "2019"))
+        self.assertEqual(parse_source_name("01to15_apr2019"), ("01to15", "apr", "2019"))
+        self.assertIsNone(parse_source_name("misc"))
+
+    def test_extract_from_archives_and_folders(self):
+        extract_tif_files(self.source, self.target, workers=2)
+        self.assertEqual(sorted(os.listdir(self.target)), [
+            "NDVI_feb_2016_16to29.tif",
+            "NDVI_jan_2016_01to15.tif",
+            "NDVI_jan_2016_16to31.tif",
+            "NDVI_mar_2016_01to15.TIF",
+            "NDVI_mar_2016_01to15.tif",
+        ])
+        linked = os.path.join(self.target, "NDVI_jan_2016_16to31.tif")
+        self.assertTrue(os.path.samefile(linked, os.path.join(self.source, "16to31+jan_2016", "nested", "x.tif")))
+
+        # === A rerun finds everything already in place ===
+        extract_tif_files(self.source, self.target, workers=2)
+        self.assertEqual(len(os.listdir(self.target)), 5)
+
+    def test_duplicate_names_get_suffixes(self):
+        with zipfile.ZipFile(os.path.join(self.source, "01to15+apr_2016.zip"), "w") as archive:
+            archive.write(os.path.join(self.source, "16to31+jan_2016", "nested", "x.tif"), "one.tif")
+            archive.write(os.path.join(self.test_dir, "tile.tif"), "two.tif")
+        extract_tif_files(self.source, self.target)
+        self.assertIn("NDVI_apr_2016_01to15_1.tif", os.listdir(self.target))
+        listing = sorted(os.listdir(self.target))
+        extract_tif_files(self.source, self.target)
+        self.assertEqual(sorted(os.listdir(self.target)), listing)
+
+    def test_new_download_replaces_the_extracted_raster(self):
+        extract_tif_files(self.source, self.target)
+        target = os.path.join(self.target, "NDVI_jan_2016_01to15.tif")
+        tif = os.path.join(self.test_dir, "tile.tif")
+        write_tif(tif, 204)  # same size, new content
+        archive_path = os.path.join(self.source, "01to15+jan_2016.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(tif, "ocm2/tile.tif")
+        later = os.path.getmtime(target) + 60
+        os.utime(archive_path, (later, later))
+
+        extract_tif_files(self.source, self.target)
+        self.assertEqual(len(os.listdir(self.target)), 5)
+        with rasterio.open(target) as src:
+            self.assertEqual(int(src.read(1)[0, 0]), 204)
+
+    def test_vsizip_mode_reads_in_place(self):
+        extract_tif_files(self.source, self.target, mode="vsizip")
+        with open(os.path.join(self.target, "vsizip_index.json")) as f:
+            index = json.load(f)
+        self.assertEqual(len(index), 4)
+        self.assertTrue(all(path.startswith("/vsizip/") for path in index.values()))
+        self.assertEqual(sorted(os.listdir(self.target)), ["NDVI_jan_2016_16to31.tif", "vsizip_index.json"])
+
+        gdf = gpd.GeoDataFrame({"dtname": ["PUNE"]}, geometry=[box(73.2, 17.2, 74.8, 18.8)], crs="EPSG:4326")
+        df = process_ndvi_folder(gdf, self.target)
+        self.assertEqual(len(df), 4)  # ingestion only picks up lower-case .tif names
+        np.testing.assert_allclose(sorted(df["mean_ndvi"]), [0.2, 0.2, 0.2, 0.6])
+
+    def test_vsizip_mode_with_upper_case_archive_extension(self):
+        os.rename(os.path.join(self.source, "01to15+jan_2016.zip"), os.path.join(self.source, "01to15+jan_2016.ZIP"))
+        extract_tif_files(self.source, self.target, mode="vsizip")
+        catalog = RasterCatalog.scan(self.target)
+        self.assertEqual(catalog.unreadable, {})
+        path = dict(list_ndvi_rasters(self.target))["NDVI_jan_2016_01to15.tif"]
+        self.assertEqual(source_file(path), os.path.join(os.path.abspath(self.source), "01to15+jan_2016.ZIP"))
+        self.assertIsNotNone(catalog.entry(path)["checksum"])
+
+
+if __name__ == "__main__":
+    unittest.main()
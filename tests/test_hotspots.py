@@ -0,0 +1,90 @@
+# test_hotspots.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import geopandas as gpd
+import rasterio
+from affine import Affine
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from hotspots import HotspotIndex, find_hotspots, hotspot_table
+from ndvi import build_ndvi_stack
+
+
+class TestHotspots(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_patches_split_at_district_boundaries(self):
+        # === 10 x 10 grid of 100 m pixels, district 1 = left half, district 2 = right half ===
+        labels = np.zeros((10, 10), dtype=np.uint16)
+        labels[:, :5], labels[:, 5:] = 1, 2
+        data = np.full((10, 10), 200, dtype=np.uint8)
+        data[1:3, 3:7] = 10          # crosses the boundary: one patch on each side
+        data[6, 1] = data[7, 2] = 20  # diagonal neighbours: one patch
+        data[8, 8] = 255              # nodata, not a patch
+        transform = Affine(100, 0, 500000, 0, -100, 2000000)
+
+        patches = find_hotspots(data, labels, transform, crs="EPSG:32643", threshold=0.2, nodata=255)
+        self.assertEqual(list(patches["zone"]), [1, 1, 2])
+        self.assertEqual(list(patches["pixels"]), [4, 2, 4])
+        np.testing.assert_allclose(patches["area_km2"], [0.04, 0.02, 0.04])
+        first = patches.iloc[0]
+        self.assertEqual((first["minx"], first["maxx"], first["miny"], first["maxy"]), (500300, 500500, 1999700, 1999900))
+        self.assertEqual((first["centroid_x"], first["centroid_y"]), (500400, 1999800))
+        self.assertAlmostEqual(patches.iloc[1]["mean_ndvi"], 20 / 255)
+
+        self.assertEqual(len(find_hotspots(data, labels, transform, threshold=0.2, nodata=255, min_pixels=3)), 2)
+        self.assertTrue(find_hotspots(data, labels, transform, threshold=0.01).empty)
+
+    def test_table_and_spatial_index(self):
+        ndvi = os.path.join(self.test_dir, "tif")
+        os.makedirs(ndvi)
+        gdf = gpd.GeoDataFrame(
+            {"dtname": ["PUNE", "NASHIK"], "state": ["MH", "MH"]},
+            geometry=[box(73, 18, 74, 19), box(74, 18, 75, 19)], crs="EPSG:4326"
+        )
+        rng = np.random.default_rng(0)
+        for name in ["NDVI_jan_2016_01to15.tif", "NDVI_jan_2016_16to31.tif"]:
+            data = rng.integers(100, 255, size=(50, 100)).astype("uint8")
+            data[10:20, 10:20] = 5  # 0.2 x 0.2 degree patch in Pune (lon 73.2-73.4, lat 18.6-18.8)
+            with rasterio.open(
+                os.path.join(ndvi, name), "w", driver="GTiff", height=50, width=100, count=1,
+                dtype="uint8", crs="EPSG:4326", transform=Affine(0.02, 0, 73, 0, -0.02, 19), nodata=255
+            ) as dst:
+                dst.write(data, 1)
+
+        table = hotspot_table(gdf, ndvi, threshold=0.1, min_pixels=10)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(list(table["district"]), ["pune", "pune"])
+        self.assertEqual(list(table["fortnight"]), [1, 2])
+        self.assertAlmostEqual(table.loc[0, "area_km2"], 0.04 * 111.32 ** 2 * np.cos(np.radians(18.7)), delta=5)
+
+        build_ndvi_stack(ndvi, os.path.join(self.test_dir, "stack"), tuple(gdf.total_bounds))
+        from_stack = hotspot_table(gdf, ndvi, threshold=0.1, min_pixels=10, stack_dir=os.path.join(self.test_dir, "stack"))
+        self.assertTrue(table.equals(from_stack))
+
+        # === A stack of Nashik alone does not cover Pune, so the rasters are read from their files ===
+        build_ndvi_stack(ndvi, os.path.join(self.test_dir, "stack"), (74, 18, 75, 19))
+        partial_stack = hotspot_table(gdf, ndvi, threshold=0.1, min_pixels=10, stack_dir=os.path.join(self.test_dir, "stack"))
+        self.assertTrue(table.equals(partial_stack))
+
+        path = os.path.join(self.test_dir, "hotspots.parquet")
+        table.to_parquet(path, index=False)
+        index = HotspotIndex(path)
+        self.assertEqual(len(index.at_point(73.3, 18.7)), 2)
+        self.assertEqual(len(index.at_point(74.5, 18.5)), 0)
+        self.assertEqual(list(index.in_bbox(73.0, 18.0, 73.25, 18.65, month=1)["fortnight"]), [1, 2])
+        self.assertTrue(index.in_bbox(73, 18, 74, 19, year=2017).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
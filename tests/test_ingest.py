@@ -0,0 +1,150 @@
+# test_ingest.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+import rasterio
+from affine import Affine
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import ndvi
+from analysis_store import load_analysis
+from ingest import ingest_states, state_with_paths
+from ndvi_cube import NdviCube
+
+
+def write_state_fixture(folder, code, dtnames, csv_names, x0):
+    """District geojson + daily rain/temperature CSVs for one small synthetic state"""
+    geoms = [box(x0 + i, 18, x0 + i + 1, 19) for i in range(len(dtnames))]
+    shape_file = os.path.join(folder, f"{code}.geojson")
+    gpd.GeoDataFrame({"dtname": dtnames}, geometry=geoms, crs="EPSG:4326").to_file(shape_file, driver="GeoJSON")
+
+    dates = pd.date_range("2016-01-01", "2016-07-31").strftime("%Y-%m-%d")
+    rng = np.random.default_rng(len(code))
+    n = len(dates) * len(csv_names)
+    daily = pd.DataFrame({"date": np.tile(dates, len(csv_names)), "District": np.repeat(csv_names, len(dates))})
+    rain_csv = os.path.join(folder, f"{code}_precipitation.csv")
+    temp_csv = os.path.join(folder, f"{code}_temperature.csv")
+    daily.assign(rainfall_mm=rng.random(n) * 20).to_csv(rain_csv, index=False)
+    mean = rng.random(n) * 10 + 20
+    daily.assign(min=mean - 5, max=mean + 5, mean=mean).to_csv(temp_csv, index=False)
+    return shape_file, rain_csv, temp_csv
+
+
+def write_ndvi_fixture(folder):
+    os.makedirs(folder)
+    rng = np.random.default_rng(0)
+    transform = Affine(0.05, 0, 72.0, 0, -0.05, 20.0)
+    for name in ["NDVI_jan_2016_01to15.tif", "NDVI_jan_2016_16to31.tif", "NDVI_jul_2016_01to15.tif"]:
+        with rasterio.open(
+            os.path.join(folder, name), "w", driver="GTiff", height=60, width=120, count=1,
+            dtype="uint8", crs="EPSG:4326", transform=transform, nodata=255
+        ) as dst:
+            dst.write(rng.integers(0, 256, size=(60, 120)).astype("uint8"), 1)
+
+
+class TestIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ndvi = os.path.join(self.test_dir, "tif")
+        write_ndvi_fixture(self.ndvi)
+        mh_files = write_state_fixture(self.test_dir, "MH", ["PUNE", "NASHIK"], ["PUNE", "NASIK"], 73)
+        mp_files = write_state_fixture(self.test_dir, "MP", ["BHOPAL", "NARSIMHAPUR"], ["BHOPAL", "NARSINGPUR"], 76)
+        self.mh = state_with_paths("MH", *mh_files, output=os.path.join(self.test_dir, "analysis_MH"))
+        self.mp = state_with_paths("MP", *mp_files, output=os.path.join(self.test_dir, "analysis_MP"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def ingest(self, states, **options):
+        """ingest_states writing the CSVs and the store into the test folder instead of ./data"""
+        options = {"store_dir": os.path.join(self.test_dir, "analysis"), "cube_dir": None, "write_csv": True, **options}
+        ingest_states(states, self.ndvi, **options)
+
+    def read_output(self, folder):
+        return pd.read_csv(os.path.join(folder, "climate_2016.csv"))
+
+    def test_single_state_output(self):
+        self.ingest([self.mh])
+        df = self.read_output(self.mh.output_folder)
+        self.assertEqual(list(df.columns), [
+            "district", "season", "month", "year", "mean_ndvi", "min_temp", "max_temp",
+            "mean_temp", "mean_rainfall(mm)", "state", "crops"
+        ])
+        self.assertEqual(set(df["district"]), {"pune", "nashik"})
+        self.assertFalse(df["mean_temp"].isna().any())
+        self.assertEqual(set(df.loc[df["season"] == "Kharif", "crops"]), {"['CO', 'SB']"})
+
+    def test_analysis_store_matches_csv(self):
+        store = os.path.join(self.test_dir, "analysis")
+        self.ingest([self.mh, self.mp], store_dir=store)
+        df = load_analysis(store, states=["MH"])
+        csv = self.read_output(self.mh.output_folder)
+        self.assertEqual(len(df), len(csv))
+        np.testing.assert_allclose(df["mean_ndvi"], csv["mean_ndvi"])
+        self.assertEqual(set(load_analysis(store, columns=["district"], states=["MP"])["district"]), {"bhopal", "narsimhapur"})
+
+    def test_fortnight_cube(self):
+        cube_dir = os.path.join(self.test_dir, "cube")
+        self.ingest([self.mh, self.mp], cube_dir=cube_dir)
+        cube = NdviCube(cube_dir)
+        self.assertEqual(cube.states, ["MH", "MH", "MP", "MP"])
+        jan = cube.slice(start=(2016, 1, 1), end=(2016, 1, 2))
+        self.assertFalse(np.isnan(jan).any())
+
+        # === The CSV's January mean is the mean of the two January fortnights ===
+        csv = self.read_output(self.mh.output_folder).set_index(["district", "month"])
+        pune = cube.district_rows(["pune"], "MH")[0]
+        self.assertAlmostEqual(csv.loc[("pune", 1), "mean_ndvi"], jan[pune].mean(), places=6)
+
+    def test_cube_keeps_other_states(self):
+        cube_dir = os.path.join(self.test_dir, "cube")
+        self.ingest([self.mh, self.mp], cube_dir=cube_dir)
+        together = NdviCube(cube_dir).slice(state="MH").copy()
+
+        self.ingest([self.mh], cube_dir=cube_dir)
+        self.ingest([self.mp], cube_dir=cube_dir)
+        cube = NdviCube(cube_dir)
+        self.assertEqual(sorted(zip(cube.states, cube.districts)), [
+            ("MH", "nashik"), ("MH", "pune"), ("MP", "bhopal"), ("MP", "narsimhapur")
+        ])
+        np.testing.assert_array_equal(cube.slice(state="MH"), together)
+
+    def test_one_row_per_district_month(self):
+        self.ingest([self.mh], degree_day_base=25.0, heat_threshold=30.0)
+        df = self.read_output(self.mh.output_folder)
+        self.assertFalse(df.duplicated(["district", "month", "year"]).any())
+        self.assertEqual(len(df), 2 * 2)  # jan and jul for both districts
+        self.assertTrue((df["min_temp"] <= df["mean_temp"]).all() and (df["mean_temp"] <= df["max_temp"]).all())
+        self.assertTrue((df["degree_days"] >= 0).all())
+        self.assertTrue(df["heat_stress_days"].between(0, 31).all())
+
+        in_memory = df
+        self.ingest([self.mh], streaming=True, degree_day_base=25.0, heat_threshold=30.0)
+        pd.testing.assert_frame_equal(in_memory, self.read_output(self.mh.output_folder), rtol=1e-5)
+
+    def test_all_states_in_one_raster_pass(self):
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as reduce_mock:
+            self.ingest([self.mh, self.mp])
+        self.assertEqual(reduce_mock.call_count, 3)
+
+        mh_together = self.read_output(self.mh.output_folder)
+        mp_together = self.read_output(self.mp.output_folder)
+        self.assertEqual(set(mp_together["district"]), {"bhopal", "narsimhapur"})
+        self.assertEqual(set(mp_together["state"]), {"Madhya Pradesh"})
+
+        self.ingest([self.mh])
+        self.ingest([self.mp])
+        pd.testing.assert_frame_equal(mh_together, self.read_output(self.mh.output_folder))
+        pd.testing.assert_frame_equal(mp_together, self.read_output(self.mp.output_folder))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# test_instrumentation.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import instrumentation
+from ingest import ingest_states, state_with_paths
+from test_ingest import write_ndvi_fixture, write_state_fixture
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.trace = os.path.join(self.test_dir, "trace.jsonl")
+        self.saved = (instrumentation._tracer, os.environ.get(instrumentation.TRACE_ENV), os.environ.get(instrumentation.TRACE_RUN_ENV))
+
+    def tearDown(self):
+        instrumentation._tracer = self.saved[0]
+        for name, value in [(instrumentation.TRACE_ENV, self.saved[1]), (instrumentation.TRACE_RUN_ENV, self.saved[2])]:
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+        shutil.rmtree(self.test_dir)
+
+    def test_disabled_spans_are_shared_noops(self):
+        instrumentation._tracer = None
+        with instrumentation.span("a", x=1) as s:
+            s.set(rows=3)
+        self.assertIs(instrumentation.span("b"), instrumentation._NULL_SPAN)
+        self.assertIsNone(instrumentation.trace_path())
+
+    def test_runs_sharing_a_trace_file_are_summarized_apart(self):
+        for rows in (1, 2):
+            instrumentation.enable(self.trace)
+            with instrumentation.span("stage") as s:
+                s.set(rows=rows)
+        self.assertEqual(len(instrumentation.read_trace(self.trace)), 2)
+        events = instrumentation.read_trace(self.trace, instrumentation._tracer.run)
+        self.assertEqual(instrumentation.summarize(events)["stage"]["rows"], 2)
+        self.assertEqual(os.environ[instrumentation.TRACE_RUN_ENV], instrumentation._tracer.run)
+
+    def test_ingestion_trace(self):
+        ndvi = os.path.join(self.test_dir, "tif")
+        write_ndvi_fixture(ndvi)
+        files = write_state_fixture(self.test_dir, "MH", ["PUNE", "NASHIK"], ["PUNE", "NASIK"], 73)
+        state = state_with_paths("MH", *files, output=os.path.join(self.test_dir, "analysis_MH"))
+
+        instrumentation.enable(self.trace)
+        ingest_states([state], ndvi, store_dir=os.path.join(self.test_dir, "store"), cube_dir=None, write_csv=True)
+
+        events = instrumentation.read_trace(self.trace)
+        summary = instrumentation.summarize(events)
+        for name in ["ingest.load_districts", "ndvi.raster", "ndvi.reduce", "climate.load",
+                     "climate.monthly", "ingest.merge", "ingest.write_csv"]:
+            self.assertIn(name, summary)
+        self.assertEqual(summary["ndvi.raster"]["count"], 3)
+        self.assertEqual(summary["climate.load"]["count"], 2)
+
+        raster = next(e for e in events if e["name"] == "ndvi.raster")
+        self.assertEqual(raster["bytes_decoded"], raster["pixels"])  # uint8 tiles
+        self.assertGreater(raster["valid_pixels"], 0)
+        self.assertLessEqual(raster["valid_pixels"], raster["pixels"])
+        self.assertGreater(raster["max_rss_mb"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# test_maps.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import matplotlib.pyplot as plt
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from analysis_store import write_analysis_store
+from ndvi_maps import prepare_districts
+from visualize_mh import draw_ndvi_map
+import visualize_mp
+
+
+class TestNdviMaps(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.shape_file = os.path.join(self.test_dir, "districts.geojson")
+        gpd.GeoDataFrame(
+            {"dtname": [" PUNE", "NASHIK", "BHOPAL"], "stname": ["MAHARASHTRA", "MAHARASHTRA", "MADHYA PRADESH"]},
+            geometry=[box(73, 18, 74, 19), box(74, 18, 75, 19), box(77, 23, 78, 24)], crs="EPSG:4326"
+        ).to_file(self.shape_file, driver="GeoJSON")
+
+        self.store = os.path.join(self.test_dir, "analysis")
+        merged = pd.DataFrame({
+            "district": ["pune", "nashik"] * 3,
+            "month": 1,
+            "year": np.repeat([2016, 2017, 2018], 2).astype("int16"),
+            "mean_ndvi": np.linspace(0.2, 0.7, 6),
+        })
+        write_analysis_store(merged, self.store, "MH")
+        self.output = os.path.join(self.test_dir, "maps")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_prepare_districts(self):
+        gdf = prepare_districts(self.shape_file, "MAHARASHTRA", crs="EPSG:32643")
+        self.assertEqual(list(gdf["district"]), ["pune", "nashik"])
+        self.assertEqual(gdf.crs.to_epsg(), 32643)
+
+    def test_batch_render_in_pool(self):
+        paths = draw_ndvi_map(self.shape_file, self.store, self.output, workers=2, fmt="svg", dpi=50)
+        self.assertEqual([os.path.basename(p) for p in paths], [f"ndvi_map_{y}.svg" for y in (2016, 2017, 2018)])
+        self.assertTrue(all(os.path.getsize(p) > 0 for p in paths))
+
+    def test_serial_render_leaves_no_open_figures(self):
+        plt.close("all")
+        draw_ndvi_map(self.shape_file, self.store, self.output, dpi=20)
+        self.assertEqual(len(os.listdir(self.output)), 3)
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_state_wrappers_share_one_body(self):
+        write_analysis_store(pd.DataFrame({
+            "district": ["bhopal"], "month": 1, "year": np.array([2016], dtype="int16"), "mean_ndvi": [0.5],
+        }), self.store, "MP")
+        paths = visualize_mp.draw_ndvi_map(self.shape_file, self.store, os.path.join(self.test_dir, "maps_mp"), dpi=20)
+        self.assertEqual([os.path.basename(p) for p in paths], ["ndvi_map_2016.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# test_ndvi.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+import rasterio
+from affine import Affine
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import ndvi
+from ndvi import parse_ndvi_filename, parse_ndvi_period, process_ndvi_folder
+
+
+class TestNdviProcessing(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.gdf = gpd.GeoDataFrame(
+            {"dtname": ["PUNE", "NASHIK"]},
+            geometry=[box(73, 18, 74, 19), box(74, 18, 75, 19)],
+            crs="EPSG:4326"
+        )
+        rng = np.random.default_rng(0)
+        transform = Affine(0.02, 0, 72.5, 0, -0.02, 19.5)
+        for name in ["NDVI_jan_2016_01to15.tif", "NDVI_feb_2016_16to29_1.tif", "NDVI_jul_2017_16to31.tif"]:
+            data = rng.integers(0, 256, size=(60, 150)).astype("uint8")
+            with rasterio.open(
+                os.path.join(self.test_dir, name), "w", driver="GTiff", height=60, width=150, count=1,
+                dtype="uint8", crs="EPSG:4326", transform=transform, nodata=255
+            ) as dst:
+                dst.write(data, 1)
+        open(os.path.join(self.test_dir, "notes.txt"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_ndvi_filename(self):
+        self.assertEqual(parse_ndvi_filename("NDVI_feb_2016_16to29_1.tif"), (2, 2016))
+        self.assertEqual(parse_ndvi_filename("NDVI_September_2019_01to15.tif"), (9, 2019))
+        self.assertIsNone(parse_ndvi_filename("NDVI_xyz_2016_01to15.tif"))
+        self.assertIsNone(parse_ndvi_filename("notes.txt"))
+
+    def test_parse_ndvi_period(self):
+        self.assertEqual(parse_ndvi_period("NDVI_feb_2016_16to29_1.tif"), (2, 2016, 2))
+        self.assertEqual(parse_ndvi_period("NDVI_jan_2016_01to15.tif"), (1, 2016, 1))
+        self.assertEqual(parse_ndvi_period("NDVI_jan_2016.tif"), (1, 2016, 1))
+        df = process_ndvi_folder(self.gdf, self.test_dir, fortnight=True)
+        self.assertEqual(list(df.columns), ["district", "month", "fortnight", "year", "mean_ndvi"])
+        self.assertEqual(list(df["fortnight"]), [2, 2, 1, 1, 2, 2])  # feb 16to29, jan 01to15, jul 16to31
+
+    def test_process_ndvi_folder(self):
+        df = process_ndvi_folder(self.gdf, self.test_dir)
+        self.assertEqual(len(df), 6)
+        self.assertEqual(list(df.columns), ["district", "month", "year", "mean_ndvi"])
+        self.assertTrue(df["mean_ndvi"].between(0, 1).all())
+
+    def test_statistics_in_one_pass(self):
+        from rasterstats import zonal_stats
+
+        stats = ["mean", "median", "std", "p90", "valid_fraction", "stress_share"]
+        df = process_ndvi_folder(self.gdf, self.test_dir, stats=stats, stress_threshold=0.3)
+        self.assertEqual(list(df.columns), [
+            "district", "month", "year", "mean_ndvi", "median_ndvi", "std_ndvi", "p90_ndvi", "valid_fraction", "stress_share"
+        ])
+        pd.testing.assert_series_equal(df["mean_ndvi"], process_ndvi_folder(self.gdf, self.test_dir)["mean_ndvi"])
+
+        path = os.path.join(self.test_dir, "NDVI_jan_2016_01to15.tif")
+        expected = zonal_stats(list(self.gdf.geometry), path, stats=["median", "std", "percentile_90"])
+        first = df[(df["month"] == 1)].reset_index(drop=True)
+        np.testing.assert_allclose(first["median_ndvi"] * 255, [e["median"] for e in expected])
+        np.testing.assert_allclose(first["std_ndvi"] * 255, [e["std"] for e in expected])
+        np.testing.assert_allclose(first["p90_ndvi"] * 255, [e["percentile_90"] for e in expected])
+
+        with rasterio.open(path) as src:
+            pune = src.read(1)[25:75, 25:75]  # lat 19 .. 18, lon 73 .. 74
+        valid = pune[pune != 255]
+        self.assertAlmostEqual(first.loc[0, "valid_fraction"], valid.size / pune.size)
+        self.assertAlmostEqual(first.loc[0, "stress_share"], np.mean(valid / 255 < 0.3))
+
+        with self.assertRaises(ValueError):
+            process_ndvi_folder(self.gdf, self.test_dir, stats=["mode"])
+
+    def test_parallel_matches_serial(self):
+        serial = process_ndvi_folder(self.gdf, self.test_dir, workers=1)
+        parallel = process_ndvi_folder(self.gdf, self.test_dir, workers=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_cache_only_processes_new_rasters(self):
+        cache_dir = os.path.join(self.test_dir, "cache")
+        first = process_ndvi_folder(self.gdf, self.test_dir, cache_dir=cache_dir)
+
+        shutil.copy(
+            os.path.join(self.test_dir, "NDVI_jan_2016_01to15.tif"),
+            os.path.join(self.test_dir, "NDVI_mar_2016_01to15.tif")
+        )
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as reduce_mock:
+            second = process_ndvi_folder(self.gdf, self.test_dir, cache_dir=cache_dir)
+        self.assertEqual(reduce_mock.call_count, 1)
+        self.assertEqual(len(second), len(first) + 2)
+
+        uncached = process_ndvi_folder(self.gdf, self.test_dir)
+        pd.testing.assert_frame_equal(second, uncached)
+
+    def test_interrupted_run_keeps_finished_rasters_cached(self):
+        cache_dir = os.path.join(self.test_dir, "cache")
+        calls = []
+
+        def fail_on_second(*args, **kwargs):
+            calls.append(args[0])
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return reduce(*args, **kwargs)
+
+        reduce = ndvi.district_ndvi_stats
+        with patch.object(ndvi, "district_ndvi_stats", side_effect=fail_on_second):
+            with self.assertRaises(KeyboardInterrupt):
+                process_ndvi_folder(self.gdf, self.test_dir, cache_dir=cache_dir)
+        with patch.object(ndvi, "district_ndvi_stats", wraps=reduce) as reduce_mock:
+            result = process_ndvi_folder(self.gdf, self.test_dir, cache_dir=cache_dir)
+        self.assertEqual(reduce_mock.call_count, 2)
+        pd.testing.assert_frame_equal(result, process_ndvi_folder(self.gdf, self.test_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# test_ndvi_cube.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from ndvi_cube import NdviCube, write_ndvi_cube
+
+
+class TestNdviCube(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        # === Two districts, every fortnight of 2016-2018; value = year offset + month / 100 + fortnight / 1000 ===
+        years, months, fortnights = np.meshgrid([2016, 2017, 2018], np.arange(1, 13), [1, 2], indexing="ij")
+        periods = pd.DataFrame({"month": months.ravel(), "fortnight": fortnights.ravel(), "year": years.ravel()})
+        frames = []
+        for state, district, offset in [("MH", "Pune", 0.0), ("MP", "Bhopal", 0.5)]:
+            frame = periods.assign(district=district, state=state)
+            frame["mean_ndvi"] = offset + (frame["year"] - 2016) * 0.1 + frame["month"] / 100 + frame["fortnight"] / 1000
+            frames.append(frame)
+        self.df = pd.concat(frames, ignore_index=True)
+        self.cube_dir = os.path.join(self.test_dir, "cube")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_layout_and_slicing(self):
+        cube = write_ndvi_cube(self.df.sample(frac=1, random_state=0), self.cube_dir)
+        reopened = NdviCube(self.cube_dir)
+        self.assertIsInstance(reopened.values, np.memmap)
+        self.assertEqual(reopened.values.shape, (1, 2, 72))
+        self.assertEqual(list(zip(cube.states, cube.districts)), [("MH", "pune"), ("MP", "bhopal")])
+
+        pune = reopened.slice(districts=["Pune"], start=(2017, 6, 2), end=(2017, 7, 1))[0]
+        np.testing.assert_allclose(pune, [0.162, 0.171], rtol=1e-6)
+        self.assertEqual(reopened.slice(start=2018).shape, (2, 24))
+        self.assertEqual(reopened.slice(state="MP", end=2016).shape, (1, 24))
+        self.assertEqual(reopened.period(reopened.time_index(2017, 6, 2)), (2017, 6, 2))
+        with self.assertRaises(KeyError):
+            reopened.slice(districts=["nagpur"])
+
+    def test_duplicates_averaged_and_gaps_nan(self):
+        df = self.df[~((self.df["year"] == 2017) & (self.df["month"] == 3))]
+        extra = df[(df["year"] == 2016) & (df["month"] == 1) & (df["fortnight"] == 1)].assign(mean_ndvi=1.0)
+        cube = write_ndvi_cube(pd.concat([df, extra]), self.cube_dir)
+        values = cube.array()
+        self.assertAlmostEqual(values[0, 0], (0.011 + 1.0) / 2, places=6)
+        self.assertTrue(np.isnan(values[:, cube.time_index(2017, 3, 1):cube.time_index(2017, 4, 1)]).all())
+
+    def test_climatology_anomalies_and_seasons(self):
+        cube = write_ndvi_cube(self.df, self.cube_dir)
+        climatology = cube.climatology()
+        self.assertEqual(climatology.shape, (2, 24))
+        np.testing.assert_allclose(climatology[0, :2], [0.111, 0.112], rtol=1e-5)
+
+        anomalies = cube.anomalies()
+        np.testing.assert_allclose(anomalies[:, :24], -0.1, atol=1e-6)
+        np.testing.assert_allclose(anomalies[:, 48:], 0.1, atol=1e-6)
+        rolling = cube.anomalies(window=30)
+        self.assertAlmostEqual(rolling[0, 29], (24 * -0.1 + 6 * 0.0) / 30, places=6)
+
+        seasonal = cube.seasonal()
+        self.assertEqual(seasonal.shape, (2, 3, 3))  # districts x years x (Kharif, Other, Rabi)
+        expected = cube.to_frame(cube.array()).query("district == 'pune' and year == 2016 and month in [6, 7, 8, 9, 10]")
+        self.assertAlmostEqual(seasonal[0, 0, 0], expected["mean_ndvi"].mean(), places=6)
+        self.assertAlmostEqual(cube.seasonal(how="max")[1, 2, 1], 0.5 + 0.2 + 0.05 + 0.002, places=6)
+        with self.assertRaises(ValueError):
+            cube.seasonal(how="median")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+# test_ndvi_stack.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import geopandas as gpd
+import pandas as pd
+import rasterio
+from affine import Affine
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import ndvi
+from ndvi import build_ndvi_stack, process_ndvi_folder
+from ndvi_stack import NdviStack
+
+
+def write_tif(path, data, transform, nodata=255):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1,
+        dtype=data.dtype, crs="EPSG:4326", transform=transform, nodata=nodata
+    ) as dst:
+        dst.write(data, 1)
+
+
+class TestNdviStack(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ndvi = os.path.join(self.test_dir, "tif")
+        os.makedirs(self.ndvi)
+        self.stack_dir = os.path.join(self.test_dir, "stack")
+        self.gdf = gpd.GeoDataFrame(
+            {"dtname": ["PUNE", "NASHIK"]}, geometry=[box(73, 18, 74, 19), box(74, 18, 75, 19)], crs="EPSG:4326"
+        )
+        rng = np.random.default_rng(0)
+        self.transform = Affine(0.02, 0, 72.5, 0, -0.02, 19.5)
+        for name in ["NDVI_jul_2017_16to31.tif", "NDVI_jan_2016_01to15.tif", "NDVI_jan_2016_16to31.tif"]:
+            write_tif(os.path.join(self.ndvi, name), rng.integers(0, 256, size=(60, 150)).astype("uint8"), self.transform)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_stack_is_clipped_and_time_ordered(self):
+        stack = build_ndvi_stack(self.ndvi, self.stack_dir, (73, 18, 75, 19))
+        reopened = NdviStack(self.stack_dir)
+        self.assertIsInstance(reopened.data, np.memmap)
+        self.assertEqual(reopened.data.shape, (3, 35, 100))  # the rasters end at lat 18.3
+        self.assertEqual(reopened.periods, [(1, 2016, 1), (1, 2016, 2), (7, 2017, 2)])
+        self.assertEqual(tuple(reopened.transform)[:6], (0.02, 0, 73.0, 0, -0.02, 19.0))
+
+        with rasterio.open(os.path.join(self.ndvi, "NDVI_jul_2017_16to31.tif")) as src:
+            np.testing.assert_array_equal(stack.read(2), src.read(1)[25:60, 25:125])
+
+    def test_statistics_from_stack_match_files(self):
+        stats = ["mean", "median", "std", "valid_fraction", "stress_share"]
+        from_files = process_ndvi_folder(self.gdf, self.ndvi, stats=stats)
+        build_ndvi_stack(self.ndvi, self.stack_dir, tuple(self.gdf.total_bounds))
+
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as decode_mock:
+            from_stack = process_ndvi_folder(self.gdf, self.ndvi, stats=stats, stack_dir=self.stack_dir)
+        decode_mock.assert_not_called()
+        pd.testing.assert_frame_equal(from_files, from_stack)
+        pd.testing.assert_frame_equal(from_files, process_ndvi_folder(self.gdf, self.ndvi, workers=2, stats=stats, stack_dir=self.stack_dir))
+
+        # === A raster changed after the stack was built is read from its file again ===
+        os.utime(os.path.join(self.ndvi, "NDVI_jan_2016_16to31.tif"), ns=(0, 0))
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as decode_mock:
+            process_ndvi_folder(self.gdf, self.ndvi, stack_dir=self.stack_dir)
+        self.assertEqual(decode_mock.call_count, 1)
+
+    def test_stack_not_covering_the_districts_is_ignored(self):
+        from_files = process_ndvi_folder(self.gdf, self.ndvi)
+        build_ndvi_stack(self.ndvi, self.stack_dir, tuple(self.gdf.total_bounds[:2]) + (74, 19))
+        cache_dir = os.path.join(self.test_dir, "cache")
+
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as decode_mock:
+            result = process_ndvi_folder(self.gdf, self.ndvi, cache_dir=cache_dir, stack_dir=self.stack_dir)
+        self.assertEqual(decode_mock.call_count, 3)
+        pd.testing.assert_frame_equal(result, from_files)
+        pd.testing.assert_frame_equal(process_ndvi_folder(self.gdf, self.ndvi, cache_dir=cache_dir), from_files)
+
+    def test_stack_results_are_cached_apart_from_file_results(self):
+        cache_dir = os.path.join(self.test_dir, "cache")
+        build_ndvi_stack(self.ndvi, self.stack_dir, tuple(self.gdf.total_bounds))
+        process_ndvi_folder(self.gdf, self.ndvi, cache_dir=cache_dir, stack_dir=self.stack_dir)
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as decode_mock:
+            process_ndvi_folder(self.gdf, self.ndvi, cache_dir=cache_dir)
+        self.assertEqual(decode_mock.call_count, 3)
+
+    def test_nodata_is_remapped_and_dtypes_checked(self):
+        data = np.full((60, 150), 100, dtype=np.uint8)
+        data[30:, :] = 0
+        write_tif(os.path.join(self.ndvi, "NDVI_feb_2016_01to15.tif"), data, self.transform, nodata=0)
+        stack = build_ndvi_stack(self.ndvi, self.stack_dir, (73, 18, 75, 19))
+        layer = stack.read(2)
+        self.assertEqual(stack.nodata, 255)
+        self.assertTrue((layer[:5] == 100).all() and (layer[5:] == 255).all())
+
+        write_tif(os.path.join(self.ndvi, "NDVI_mar_2016_01to15.tif"), data.astype(np.int16), self.transform)
+        with self.assertRaises(ValueError):
+            build_ndvi_stack(self.ndvi, self.stack_dir, (73, 18, 75, 19))
+
+    def test_rasters_without_nodata_keep_every_pixel(self):
+        shutil.rmtree(self.ndvi)
+        os.makedirs(self.ndvi)
+        rng = np.random.default_rng(1)
+        for name in ["NDVI_jan_2016_01to15.tif", "NDVI_jan_2016_16to31.tif"]:
+            data = rng.integers(0, 256, size=(60, 150)).astype("uint8")
+            data[::3] = 255
+            write_tif(os.path.join(self.ndvi, name), data, self.transform, nodata=None)
+        # === Ends east of the districts: the stack cannot tell its fill from 255 pixels ===
+        write_tif(os.path.join(self.ndvi, "NDVI_feb_2016_01to15.tif"), np.full((60, 100), 255, np.uint8), self.transform, nodata=None)
+        from_files = process_ndvi_folder(self.gdf, self.ndvi)
+        stack = build_ndvi_stack(self.ndvi, self.stack_dir, tuple(self.gdf.total_bounds))
+        self.assertEqual([stack.layer_nodata(t) for t in range(3)], [None, None, None])
+        self.assertIsNone(stack.layer(os.path.join(self.ndvi, "NDVI_feb_2016_01to15.tif")))
+
+        with patch.object(ndvi, "district_ndvi_stats", wraps=ndvi.district_ndvi_stats) as decode_mock:
+            from_stack = process_ndvi_folder(self.gdf, self.ndvi, stack_dir=self.stack_dir)
+        self.assertEqual(decode_mock.call_count, 1)
+        pd.testing.assert_frame_equal(from_files, from_stack)
+
+    def test_other_grids_are_resampled(self):
+        # === Same pixels at half the resolution and a shifted origin: nearest resampling recovers them ===
+        with rasterio.open(os.path.join(self.ndvi, "NDVI_jan_2016_01to15.tif")) as src:
+            data = src.read(1)
+        fine = np.repeat(np.repeat(data, 2, axis=0), 2, axis=1)[1:, 1:]
+        write_tif(os.path.join(self.ndvi, "NDVI_feb_2016_01to15.tif"), fine, Affine(0.01, 0, 72.51, 0, -0.01, 19.49))
+        stack = build_ndvi_stack(self.ndvi, self.stack_dir, (73, 18, 75, 19))
+        np.testing.assert_array_equal(stack.read(2), stack.read(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,12 +4,17 @@ import unittest
 import tempfile
 import shutil
 import os
+import sys
 import pandas as pd
 from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import src.plot_graphs as plot_graphs
 from src.plot_graphs import (
     ndvi_vs_temp_n_rainfall,
     ndvi_conc_temp_n_rainfall,
-    temp_n_rainfall
+    temp_n_rainfall,
+    plot_all
 )
 
 class TestPlottingFunctions(unittest.TestCase):
@@ -46,6 +51,19 @@ class TestPlottingFunctions(unittest.TestCase):
         except Exception as e:
             self.fail(f"ndvi_conc_temp_n_rainfall raised an exception: {e}")
 
+    @patch("matplotlib.pyplot.show")
+    def test_ndvi_conc_faceted(self, mock_show):
+        plot_graphs.plt.close("all")
+        with patch("builtins.print") as mock_print:
+            ndvi_conc_temp_n_rainfall(self.test_dir, temp_bin=5, rain_bin=50, facet="year", top_k=1)
+        mock_print.assert_any_call("Year: 2014, Temperature: [25, 30), Rainfall: [200, 250), Mean NDVI: 0.600 (n=1)")
+
+        # === One fixed-size figure per year ===
+        figures = [plot_graphs.plt.figure(n) for n in plot_graphs.plt.get_fignums()]
+        self.assertEqual(len(figures), 3)
+        self.assertTrue(all(tuple(fig.get_size_inches()) == (12, 8) for fig in figures))
+        plot_graphs.plt.close("all")
+
     @patch("matplotlib.pyplot.show")
     def test_temp_n_rainfall(self, mock_show):
         try:
@@ -54,5 +72,20 @@ class TestPlottingFunctions(unittest.TestCase):
             self.fail(f"temp_n_rainfall raised an exception: {e}")
 
 
+    @patch("matplotlib.pyplot.show")
+    def test_plot_all_loads_once(self, mock_show):
+        plot_graphs._load_cached.cache_clear()
+        with patch.object(plot_graphs, "load_analysis", wraps=plot_graphs.load_analysis) as load_mock, patch("builtins.print"):
+            plot_all(self.test_dir)
+            self.assertEqual(load_mock.call_count, 1)
+
+            # === A rewritten file invalidates the cached frame ===
+            self.mock_df.assign(mean_temp=[26.0, 31.0, 29.0]).to_csv(self.mock_file, index=False)
+            os.utime(self.mock_file, ns=(0, 0))
+            df = plot_graphs.load_climate_frame(self.test_dir)
+            self.assertEqual(load_mock.call_count, 2)
+        self.assertEqual(list(df["mean_temp"]), [26.0, 31.0, 29.0])
+        self.assertEqual(df["mean_temp"].dtype, "float32")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+# test_raster_catalog.py
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import rasterio
+from affine import Affine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import raster_catalog
+from raster_catalog import CATALOG_FILE, RasterCatalog, parse_ndvi_period
+
+
+class TestRasterCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.rng = np.random.default_rng(0)
+        for name in ["NDVI_jan_2016_01to15.tif", "NDVI_feb_2016_16to29.tif", "NDVI_mar_2016_01to15.tif"]:
+            self.write_raster(name)
+        shutil.copy(self.file("NDVI_feb_2016_16to29.tif"), self.file("NDVI_feb_2016_16to29_1.tif"))
+        self.write_raster("NDVI_feb_2016_16to29_2.tif")
+        self.write_raster("NDVI_xyz_2016_01to15.tif")
+        open(self.file("NDVI_apr_2016_01to15.tif"), "w").close()
+        open(self.file("notes.txt"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def file(self, name):
+        return os.path.join(self.test_dir, name)
+
+    def write_raster(self, name):
+        with rasterio.open(
+            self.file(name), "w", driver="GTiff", height=20, width=30, count=1, dtype="uint8",
+            crs="EPSG:4326", transform=Affine(0.1, 0, 72.0, 0, -0.1, 20.0), nodata=255
+        ) as dst:
+            dst.write(self.rng.integers(0, 256, size=(20, 30)).astype("uint8"), 1)
+
+    def test_parse_without_strptime(self):
+        self.assertEqual(parse_ndvi_period("NDVI_September_2019_16to30.tif"), (9, 2019, 2))
+        self.assertIsNone(parse_ndvi_period("NDVI_jan_20x6_01to15.tif"))
+        self.assertIsNone(parse_ndvi_period("NDVI.tif"))
+
+    def test_scan(self):
+        catalog = RasterCatalog.scan(self.test_dir)
+        self.assertTrue(os.path.exists(self.file(CATALOG_FILE)))
+        self.assertEqual(len(catalog), 5)
+        entry = catalog.entry(self.file("NDVI_mar_2016_01to15.tif"))
+        self.assertEqual((entry["month"], entry["year"], entry["fortnight"]), (3, 2016, 1))
+        self.assertEqual((entry["crs"], entry["width"], entry["height"]), ("EPSG:4326", 30, 20))
+        np.testing.assert_allclose(entry["bounds"], [72.0, 18.0, 75.0, 20.0])
+        self.assertEqual(entry["size"], os.path.getsize(self.file("NDVI_mar_2016_01to15.tif")))
+        self.assertEqual(catalog.unparsed, ["NDVI_xyz_2016_01to15.tif"])
+        self.assertEqual(list(catalog.unreadable), ["NDVI_apr_2016_01to15.tif"])
+
+        # === The byte-identical _1 copy is listed once, the different _2 raster is kept ===
+        names = [os.path.basename(path) for path, _ in catalog.rasters()]
+        self.assertEqual(names, [
+            "NDVI_feb_2016_16to29.tif", "NDVI_feb_2016_16to29_2.tif", "NDVI_jan_2016_01to15.tif", "NDVI_mar_2016_01to15.tif"
+        ])
+        self.assertEqual(len(catalog.rasters(duplicates=True)), 5)
+        self.assertEqual(catalog.duplicates(), {
+            (2016, 2, 2): ["NDVI_feb_2016_16to29.tif", "NDVI_feb_2016_16to29_1.tif", "NDVI_feb_2016_16to29_2.tif"]
+        })
+        self.assertEqual(catalog.missing_periods(), [(2016, 1, 2), (2016, 2, 1)])
+
+        report = catalog.report()
+        self.assertEqual(len(report), 4)
+        self.assertIn("NDVI_xyz_2016_01to15.tif", report[0])
+        self.assertIn("NDVI_apr_2016_01to15.tif", report[1])
+        self.assertIn("different contents", report[2])
+        self.assertIn("2016-01/2, 2016-02/1", report[3])
+
+    def test_incremental_scan_only_reads_changed_rasters(self):
+        first = RasterCatalog.scan(self.test_dir)
+        with patch.object(raster_catalog, "describe_raster", wraps=raster_catalog.describe_raster) as describe:
+            second = RasterCatalog.scan(self.test_dir)
+            self.assertEqual(describe.call_count, 0)
+            self.assertEqual(second.entries, first.entries)
+
+            self.write_raster("NDVI_jan_2016_01to15.tif")
+            os.remove(self.file("NDVI_mar_2016_01to15.tif"))
+            third = RasterCatalog.scan(self.test_dir)
+        self.assertEqual(describe.call_count, 1)
+        self.assertEqual(len(third), 4)
+        self.assertNotEqual(
+            third.entry(self.file("NDVI_jan_2016_01to15.tif"))["checksum"],
+            first.entry(self.file("NDVI_jan_2016_01to15.tif"))["checksum"]
+        )
+        self.assertEqual(RasterCatalog.load(self.file(CATALOG_FILE)).entries, third.entries)
+
+    def test_missing_archive_is_reported(self):
+        with open(self.file("vsizip_index.json"), "w") as f:
+            json.dump({"NDVI_may_2016_01to15.tif": f"/vsizip/{self.file('gone.zip')}/tile.tif"}, f)
+        catalog = RasterCatalog.scan(self.test_dir)
+        self.assertIn("NDVI_may_2016_01to15.tif", catalog.unreadable)
+        self.assertEqual(len(catalog), 5)
+        self.assertTrue(any("NDVI_may_2016_01to15.tif" in line for line in catalog.report()))
+
+
+if __name__ == "__main__":
+    unittest.main()
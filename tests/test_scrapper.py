@@ -1,39 +1,160 @@
 # test_scrapper.py
+import os
+import re
+import shutil
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
-from src.scrapper import is_leap_year, scrapper_req
+from src.scrapper import is_leap_year, scrapper_req, download_all, download_file, build_session
 
 class TestScrapper(unittest.TestCase):
 
+    def setUp(self):
+        self.download_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.download_dir)
+
     def test_is_leap_year(self):
         self.assertTrue(is_leap_year("2016"))
         self.assertFalse(is_leap_year("2015"))
 
-    @patch("src.scrapper.requests.get")
-    def test_scrapper_req_download_success(self, mock_get):
+    @patch("src.scrapper.requests.Session")
+    def test_scrapper_req_download_success(self, mock_session):
+        mock_get = mock_session.return_value.get
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.iter_content = lambda chunk_size: [b'data']
         mock_get.return_value = mock_response
 
-        scrapper_req(["01to15"], "jan", years_list=["2016"])
+        scrapper_req(["01to15"], "jan", years_list=["2016"], download_folder=self.download_dir)
 
         mock_get.assert_called_once()
         called_url = mock_get.call_args[0][0]
         self.assertIn("ocm2_ndvi_filt_01to15_jan2016", called_url)
 
 
-    @patch("src.scrapper.requests.get")
-    def test_scrapper_req_download_failure(self, mock_get):
+    @patch("src.scrapper.requests.Session")
+    def test_scrapper_req_download_failure(self, mock_session):
+        mock_get = mock_session.return_value.get
         mock_response = MagicMock()
         mock_response.status_code = 404
         mock_get.return_value = mock_response
 
-        scrapper_req(["01to15"], "jan")
+        scrapper_req(["01to15"], "jan", download_folder=self.download_dir)
 
         mock_get.assert_called()
         called_url = mock_get.call_args[0][0]
         self.assertIn("ocm2_ndvi_filt_01to15_jan", called_url)
 
+
+class TileHandler(BaseHTTPRequestHandler):
+    """Stand-in tile server: serves PAYLOAD with Range support, fails the first `fail_first` requests"""
+    payload = bytes(range(256)) * 4096
+    fail_first = 0
+    requests_seen = []
+
+    def do_GET(self):
+        TileHandler.requests_seen.append((self.path, self.headers.get("Range")))
+        if TileHandler.fail_first > 0:
+            TileHandler.fail_first -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        start = int(match.group(1)) if match else 0
+        if start >= len(self.payload):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(self.payload)}")
+            self.end_headers()
+            return
+        body = self.payload[start:]
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDownloaderAgainstLocalServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), TileHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.download_dir = tempfile.mkdtemp()
+        TileHandler.fail_first = 0
+        TileHandler.requests_seen = []
+        self.session = build_session(pool_size=4)
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.download_dir)
+
+    def read(self, name):
+        with open(os.path.join(self.download_dir, name), "rb") as f:
+            return f.read()
+
+    def test_concurrent_download_and_manifest_skip(self):
+        tasks = [(f"{self.base}/tile{i}.zip", f"tile{i}.zip") for i in range(6)]
+        results = download_all(tasks, self.download_dir, workers=3, session=self.session)
+        self.assertTrue(all(ok for ok, _ in results.values()))
+        for _, name in tasks:
+            self.assertEqual(self.read(name), TileHandler.payload)
+        self.assertEqual(len(TileHandler.requests_seen), 6)
+
+        results = download_all(tasks, self.download_dir, workers=3, session=self.session)
+        self.assertEqual(len(TileHandler.requests_seen), 6)
+        self.assertTrue(all(status is None for _, status in results.values()))
+
+    def test_resume_partial_download(self):
+        target = os.path.join(self.download_dir, "tile.zip")
+        with open(f"{target}.part", "wb") as f:
+            f.write(TileHandler.payload[:1000])
+
+        ok, status = download_file(self.session, f"{self.base}/tile.zip", target, backoff=0)
+        self.assertTrue(ok)
+        self.assertEqual(status, 206)
+        self.assertEqual(TileHandler.requests_seen, [("/tile.zip", "bytes=1000-")])
+        self.assertEqual(self.read("tile.zip"), TileHandler.payload)
+        self.assertFalse(os.path.exists(f"{target}.part"))
+
+    def test_unsatisfiable_range(self):
+        # === A complete partial is moved into place, an oversized one is downloaded again ===
+        target = os.path.join(self.download_dir, "tile.zip")
+        with open(f"{target}.part", "wb") as f:
+            f.write(TileHandler.payload)
+        self.assertEqual(download_file(self.session, f"{self.base}/tile.zip", target, backoff=0), (True, 416))
+        self.assertEqual(self.read("tile.zip"), TileHandler.payload)
+
+        os.remove(target)
+        with open(f"{target}.part", "wb") as f:
+            f.write(TileHandler.payload + b"garbage")
+        self.assertEqual(download_file(self.session, f"{self.base}/tile.zip", target, backoff=0), (True, 200))
+        self.assertEqual(self.read("tile.zip"), TileHandler.payload)
+        self.assertEqual([r for _, r in TileHandler.requests_seen][-2:], [f"bytes={len(TileHandler.payload) + 7}-", None])
+
+    def test_retry_with_backoff(self):
+        TileHandler.fail_first = 2
+        ok, status = download_file(self.session, f"{self.base}/tile.zip", os.path.join(self.download_dir, "tile.zip"), backoff=0)
+        self.assertTrue(ok)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(TileHandler.requests_seen), 3)
+
+
 if __name__ == "__main__":
     unittest.main()
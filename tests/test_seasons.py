@@ -0,0 +1,30 @@
+# test_seasons.py
+import os
+import sys
+import unittest
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from seasons import crops_column, get_season, season_of
+
+
+class TestSeasons(unittest.TestCase):
+
+    def test_season_lookup(self):
+        expected = {6: "Kharif", 10: "Kharif", 11: "Rabi", 4: "Rabi", 5: "Other"}
+        for month, season in expected.items():
+            self.assertEqual(get_season(month), season)
+
+        months = pd.Series(range(1, 13), index=range(10, 22))
+        seasons = season_of(months)
+        self.assertEqual(list(seasons.index), list(months.index))
+        self.assertEqual(list(seasons.astype(str)), [get_season(m) for m in range(1, 13)])
+
+    def test_crops_column(self):
+        seasons = season_of(pd.Series([6, 1, 5]))
+        crops = crops_column(seasons, {"Kharif": ["CO", "SB"], "Rabi": ["WH", "GM"]})
+        self.assertEqual(list(crops.astype(str)), ["['CO', 'SB']", "['WH', 'GM']", "[]"])
+
+
+if __name__ == "__main__":
+    unittest.main()
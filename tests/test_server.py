@@ -0,0 +1,167 @@
+# test_server.py
+import asyncio
+import json
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from analysis_store import load_analysis
+from ingest import state_with_paths
+from server import AnalysisService, JobManager, JobServer
+from test_ingest import write_ndvi_fixture, write_state_fixture
+
+
+def fetch(base, path, body=None):
+    """(status, content type, body bytes) of a GET, or of a POST when a JSON body is given"""
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(base + path, data=data), timeout=60) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except urllib.error.HTTPError as err:
+        return err.code, err.headers["Content-Type"], err.read()
+
+
+def send_raw(base, request):
+    """Status code of the response to raw request bytes (the write side is closed after them)"""
+    host, port = base[len("http://"):].split(":")
+    with socket.create_connection((host, int(port)), timeout=60) as conn:
+        conn.sendall(request)
+        conn.shutdown(socket.SHUT_WR)
+        response = b"".join(iter(lambda: conn.recv(65536), b""))
+    return int(response.split(b" ", 2)[1])
+
+
+class TestJobServer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ndvi = os.path.join(self.test_dir, "tif")
+        write_ndvi_fixture(self.ndvi)
+        mh_files = write_state_fixture(self.test_dir, "MH", ["PUNE", "NASHIK"], ["PUNE", "NASIK"], 73)
+        mp_files = write_state_fixture(self.test_dir, "MP", ["BHOPAL", "NARSIMHAPUR"], ["BHOPAL", "NARSINGPUR"], 76)
+        states = {"MH": state_with_paths("MH", *mh_files), "MP": state_with_paths("MP", *mp_files)}
+        self.store = os.path.join(self.test_dir, "store")
+        self.service = AnalysisService(self.store, states, cube_dir=os.path.join(self.test_dir, "cube"))
+        self.jobs = JobManager(self.service, jobs_dir=os.path.join(self.test_dir, "jobs"), ndvi_folder=self.ndvi)
+
+    def tearDown(self):
+        self.jobs.shutdown()
+        shutil.rmtree(self.test_dir)
+
+    def run_client(self, client):
+        """Serve on a free port while client(base_url) runs in a thread"""
+        async def scenario():
+            server = JobServer(self.service, self.jobs, port=0)
+            host, port = await server.start()
+            try:
+                return await asyncio.to_thread(client, f"http://{host}:{port}")
+            finally:
+                await server.close()
+        return asyncio.run(scenario())
+
+    def test_ingest_job_then_queries(self):
+        def client(base):
+            status, _, body = fetch(base, "/jobs/ingest", {"states": ["MH", "MP"], "options": {"write_csv": False}})
+            self.assertEqual(status, 202)
+            job_id = json.loads(body)["id"]
+            deadline = time.time() + 120
+            while True:
+                job = json.loads(fetch(base, f"/jobs/{job_id}")[2])
+                if job["status"] in ("done", "failed") or time.time() > deadline:
+                    break
+                time.sleep(0.2)
+            responses = {
+                "job": job,
+                "jobs": json.loads(fetch(base, "/jobs")[2]),
+                "series": fetch(base, "/timeseries?state=MH&district=Pune&column=mean_ndvi,mean_temp"),
+                "again": fetch(base, "/timeseries?district=Pune&column=mean_ndvi,mean_temp&state=MH"),
+                "bins": fetch(base, "/bins?facet=state&temp_bin=2&top_k=1"),
+                "map": fetch(base, "/map.png?state=MP&year=2016&dpi=40"),
+                "huge_map": fetch(base, "/map.png?state=MP&year=2016&dpi=100000"),
+                "max_map": fetch(base, "/map.png?state=MP&year=2016&dpi=300"),
+                "cube": fetch(base, "/cube?state=MH&district=pune&window=2"),
+                "bad_facet": fetch(base, "/bins?facet=district"),
+                "zero_bin": fetch(base, "/bins?temp_bin=0"),
+                "negative_bin": fetch(base, "/bins?rain_bin=-1"),
+                "no_route": fetch(base, "/nothing"),
+                "stats": json.loads(fetch(base, "/stats")[2]),
+            }
+            return responses
+
+        r = self.run_client(client)
+        job = r["job"]
+        self.assertEqual(job["status"], "done", job["error"])
+        self.assertEqual(job["stages"], ["ingest.load_districts", "ndvi.reduce", "ingest.write_cube", "ingest.merge", "ingest.write_store"])
+        self.assertEqual((job["rasters_done"], job["rasters_total"], job["states_written"]), (3, 3, 2))
+        self.assertEqual([j["id"] for j in r["jobs"]], [job["id"]])
+
+        # === Time series match the store the job wrote; the repeated query is a cache hit ===
+        status, content_type, body = r["series"]
+        self.assertEqual((status, content_type), (200, "application/json"))
+        rows = json.loads(body)["rows"]
+        expected = load_analysis(self.store, states=["MH"], districts=["pune"]).sort_values(["year", "month"])
+        self.assertEqual([row["month"] for row in rows], expected["month"].tolist())
+        for row, value in zip(rows, expected["mean_ndvi"]):
+            self.assertAlmostEqual(row["mean_ndvi"], value)
+        self.assertEqual(r["again"][2], body)
+        self.assertEqual(r["stats"]["cache_hits"], 1)
+
+        bins = json.loads(r["bins"][2])
+        self.assertEqual({cell["state"] for cell in bins["cells"]}, {"MH", "MP"})
+        self.assertEqual(len(bins["top"]), 2)
+        self.assertEqual(sum(cell["count"] for cell in bins["cells"]), len(load_analysis(self.store)))
+
+        status, content_type, png = r["map"]
+        self.assertEqual((status, content_type), (200, "image/png"))
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertEqual(r["huge_map"], r["max_map"])
+
+        cube = json.loads(r["cube"][2])
+        self.assertEqual(len(cube["periods"]), 24)
+        self.assertEqual(cube["periods"][1], [2016, 1, 2])
+        self.assertIsNotNone(cube["mean_ndvi"][0])
+        self.assertIsNone(cube["mean_ndvi"][2])
+
+        self.assertEqual(r["bad_facet"][0], 400)
+        self.assertNotIn("request line", json.loads(r["zero_bin"][2])["error"])  # handler errors keep their own message
+        self.assertEqual((r["zero_bin"][0], r["negative_bin"][0]), (400, 400))
+        self.assertEqual(r["no_route"][0], 404)
+        self.assertIn("error", json.loads(r["no_route"][2]))
+
+    def test_errors_before_ingestion(self):
+        def client(base):
+            return (
+                fetch(base, "/timeseries?state=MH"),
+                fetch(base, "/jobs/ingest", {"states": ["XX"]}),
+                fetch(base, "/jobs/ingest", {"options": {"store_dir": "elsewhere"}}),
+                fetch(base, "/jobs/unknown"),
+                fetch(base, "/map.png?state=MH"),
+                send_raw(base, b"POST /jobs/ingest HTTP/1.1\r\nContent-Length: lots\r\n\r\n{}"),
+                send_raw(base, b"POST /jobs/ingest HTTP/1.1\r\nContent-Length: 100\r\n\r\n{}"),
+                send_raw(base, b"GET\r\n\r\n"),
+                fetch(base, "/jobs/ingest", []),
+                fetch(base, "/jobs/ingest", {"options": {"ndvi": os.path.join(self.test_dir, "missing")}}),
+            )
+
+        no_store, bad_state, bad_option, no_job, no_year, bad_length, short_body, bad_line, not_object, no_ndvi = \
+            self.run_client(client)
+        self.assertEqual(no_store[0], 404)
+        self.assertEqual(bad_state[0], 400)
+        self.assertEqual(bad_option[0], 400)
+        self.assertEqual(no_job[0], 404)
+        self.assertEqual(no_year[0], 400)
+        self.assertEqual((bad_length, short_body, bad_line), (400, 400, 400))
+        self.assertEqual((not_object[0], no_ndvi[0]), (400, 400))
+        self.assertEqual(self.jobs.jobs, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
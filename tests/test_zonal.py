@@ -0,0 +1,73 @@
+# test_zonal.py
+import os
+import sys
+import unittest
+import numpy as np
+from affine import Affine
+from shapely.geometry import box, Polygon
+from rasterstats import zonal_stats
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from zonal import ZonalAccumulator, clear_label_cache, rasterize_zones, zonal_reduce
+
+
+class TestZonalEngine(unittest.TestCase):
+
+    def setUp(self):
+        clear_label_cache()
+        rng = np.random.default_rng(0)
+        self.data = rng.integers(0, 256, size=(60, 80)).astype("uint8")
+        self.data[10:20, 10:20] = 255  # nodata patch
+        self.transform = Affine(0.1, 0, 70.0, 0, -0.1, 22.0)
+        self.geoms = [
+            box(70.5, 19.0, 73.0, 21.5),
+            Polygon([(73.2, 17.0), (77.5, 17.5), (76.0, 21.0)]),
+            box(60.0, 0.0, 61.0, 1.0),  # outside the raster
+        ]
+
+    def test_matches_rasterstats(self):
+        labels = rasterize_zones(self.geoms, self.transform, self.data.shape)
+        stats = zonal_reduce(self.data, labels, len(self.geoms), nodata=255)
+
+        expected = zonal_stats(
+            self.geoms, self.data, affine=self.transform, nodata=255,
+            stats=["count", "mean", "min", "max"]
+        )
+        for i, exp in enumerate(expected[:2]):
+            self.assertEqual(stats["count"][i], exp["count"])
+            self.assertAlmostEqual(stats["mean"][i], exp["mean"])
+            self.assertEqual(stats["min"][i], exp["min"])
+            self.assertEqual(stats["max"][i], exp["max"])
+
+        self.assertEqual(stats["count"][2], 0)
+        self.assertTrue(np.isnan(stats["mean"][2]))
+
+    def test_nan_values_are_ignored(self):
+        values = self.data.astype("float32")
+        values[values == 255] = np.nan
+        labels = rasterize_zones(self.geoms, self.transform, self.data.shape)
+        from_float = zonal_reduce(values, labels, len(self.geoms))
+        from_int = zonal_reduce(self.data, labels, len(self.geoms), nodata=255)
+        np.testing.assert_array_equal(from_float["count"], from_int["count"])
+        np.testing.assert_allclose(from_float["mean"][:2], from_int["mean"][:2])
+
+    def test_blockwise_accumulation_matches_single_pass(self):
+        labels = rasterize_zones(self.geoms, self.transform, self.data.shape)
+        accumulator = ZonalAccumulator(len(self.geoms))
+        for r in range(0, 60, 16):
+            for c in range(0, 80, 32):
+                accumulator.update(self.data[r:r + 16, c:c + 32], labels[r:r + 16, c:c + 32], nodata=255)
+        blockwise = accumulator.result()
+        whole = zonal_reduce(self.data, labels, len(self.geoms), nodata=255)
+        for stat in ["count", "sum", "mean", "min", "max"]:
+            np.testing.assert_allclose(blockwise[stat], whole[stat])
+
+    def test_label_grid_is_cached(self):
+        first = rasterize_zones(self.geoms, self.transform, self.data.shape)
+        second = rasterize_zones(self.geoms, self.transform, self.data.shape)
+        self.assertIs(first, second)
+        self.assertFalse(first.flags.writeable)
+
+
+if __name__ == "__main__":
+    unittest.main()